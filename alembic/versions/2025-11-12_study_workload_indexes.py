@@ -0,0 +1,55 @@
+"""Study workload indexes.
+
+Revision ID: 5c7e2f1d9a43
+Revises: 1a8a8c8672f0
+Create Date: 2025-11-12 10:41:12.318204
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7e2f1d9a43'
+down_revision: Union[str, Sequence[str], None] = '1a8a8c8672f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не работает внутри транзакции, таблица study при этом не блокируется на запись
+    with op.get_context().autocommit_block():
+        # Частичный индекс очереди NEW строится сразу по project_id в 8d3b6a0e4f17:
+        # промежуточный study_batch_id_id_new_idx только строился бы и удалялся следующей миграцией
+        op.create_index(
+            op.f('study_annotator_id_status_idx'),
+            'study',
+            ['annotator_id', 'status'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('study_expert_id_status_idx'),
+            'study',
+            ['expert_id', 'status'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # Одиночные индексы покрываются префиксом составных
+        op.drop_index(op.f('study_annotator_id_idx'), table_name='study', postgresql_concurrently=True)
+        op.drop_index(op.f('study_expert_id_idx'), table_name='study', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('study_expert_id_idx'), 'study', ['expert_id'], unique=False, postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('study_annotator_id_idx'), 'study', ['annotator_id'], unique=False, postgresql_concurrently=True,
+        )
+        op.drop_index(op.f('study_expert_id_status_idx'), table_name='study', postgresql_concurrently=True)
+        op.drop_index(op.f('study_annotator_id_status_idx'), table_name='study', postgresql_concurrently=True)
@@ -0,0 +1,71 @@
+"""Study project_id.
+
+Revision ID: 8d3b6a0e4f17
+Revises: 5c7e2f1d9a43
+Create Date: 2025-11-13 12:05:48.902617
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3b6a0e4f17'
+down_revision: Union[str, Sequence[str], None] = '5c7e2f1d9a43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('study', sa.Column('project_id', sa.Integer(), nullable=True))
+    op.execute(
+        """
+        UPDATE study AS s
+        SET project_id = b.project_id
+        FROM batch AS b
+        WHERE b.id = s.batch_id
+        """
+    )
+    op.alter_column('study', 'project_id', existing_type=sa.Integer(), nullable=False)
+
+    # study (batch_id, project_id) -> batch (id, project_id): project_id не может разойтись с партией
+    op.create_unique_constraint('batch_id_project_id_key', 'batch', ['id', 'project_id'])
+    op.drop_constraint(op.f('study_batch_id_fkey'), 'study', type_='foreignkey')
+    op.create_foreign_key(
+        'study_batch_id_project_id_fkey',
+        'study',
+        'batch',
+        ['batch_id', 'project_id'],
+        ['id', 'project_id'],
+        ondelete='RESTRICT',
+        onupdate='CASCADE',
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('study_project_id_id_new_idx'),
+            'study',
+            ['project_id', 'id'],
+            unique=False,
+            postgresql_where=sa.text("status = 'NEW'"),
+            postgresql_concurrently=True,
+        )
+        # Есть только в базах, где 5c7e2f1d9a43 применили до того, как из неё убрали этот индекс
+        op.drop_index(
+            op.f('study_batch_id_id_new_idx'), table_name='study', postgresql_concurrently=True, if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('study_project_id_id_new_idx'), table_name='study', postgresql_concurrently=True)
+
+    op.drop_constraint('study_batch_id_project_id_fkey', 'study', type_='foreignkey')
+    op.create_foreign_key(
+        op.f('study_batch_id_fkey'), 'study', 'batch', ['batch_id'], ['id'], ondelete='RESTRICT',
+    )
+    op.drop_constraint('batch_id_project_id_key', 'batch', type_='unique')
+    op.drop_column('study', 'project_id')
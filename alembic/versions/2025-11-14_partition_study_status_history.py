@@ -0,0 +1,191 @@
+"""Partition study status history.
+
+Revision ID: 2f9c4e7b1a65
+Revises: 8d3b6a0e4f17
+Create Date: 2025-11-14 09:12:33.407215
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as psql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f9c4e7b1a65'
+down_revision: Union[str, Sequence[str], None] = '8d3b6a0e4f17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Старая таблица уходит в сторону вместе с именами ограничений и индексов, последовательность id переезжает
+    op.rename_table('study_status_history', 'study_status_history_legacy')
+    op.execute('ALTER TABLE study_status_history_legacy RENAME CONSTRAINT study_status_history_pkey TO study_status_history_legacy_pkey')
+    op.execute('ALTER TABLE study_status_history_legacy RENAME CONSTRAINT study_status_history_study_id_fkey TO study_status_history_legacy_study_id_fkey')
+    op.execute('ALTER INDEX study_status_history_study_id_idx RENAME TO study_status_history_legacy_study_id_idx')
+    op.execute('ALTER INDEX study_status_history_to_status_idx RENAME TO study_status_history_legacy_to_status_idx')
+    op.execute('ALTER SEQUENCE study_status_history_id_seq OWNED BY NONE')
+
+    op.execute(
+        """
+        CREATE TABLE study_status_history (
+          id integer NOT NULL DEFAULT nextval('study_status_history_id_seq'),
+          study_id integer NOT NULL,
+          from_status study_status,
+          to_status study_status NOT NULL,
+          changed_at timestamptz NOT NULL DEFAULT now(),
+          iteration_count smallint NOT NULL,
+          CONSTRAINT study_status_history_pkey PRIMARY KEY (id, changed_at),
+          CONSTRAINT study_status_history_study_id_fkey
+            FOREIGN KEY (study_id) REFERENCES study (id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (changed_at);
+        """,
+    )
+    op.execute('ALTER SEQUENCE study_status_history_id_seq OWNED BY study_status_history.id')
+    op.create_index(op.f('study_status_history_study_id_idx'), 'study_status_history', ['study_id'], unique=False)
+    op.create_index(op.f('study_status_history_to_status_idx'), 'study_status_history', ['to_status'], unique=False)
+    op.create_index(
+        op.f('study_status_history_changed_at_idx'),
+        'study_status_history',
+        ['changed_at'],
+        unique=False,
+        postgresql_using='brin',
+    )
+    # Подстраховка: строка вне созданных месяцев не должна ронять транзакцию со сменой статуса
+    op.execute('CREATE TABLE study_status_history_default PARTITION OF study_status_history DEFAULT')
+
+    # Месячная партиция study_status_history_yYYYYmMM, границы в UTC
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION study_status_history_create_partition(p_month date)
+        RETURNS void
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+          v_month date := date_trunc('month', p_month)::date;
+        BEGIN
+          EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF study_status_history FOR VALUES FROM (%L) TO (%L)',
+            'study_status_history_' || to_char(v_month, '"y"YYYY"m"MM'),
+            v_month::timestamp AT TIME ZONE 'UTC',
+            (v_month + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+          );
+        END;
+        $$;
+        """,
+    )
+    # Создаёт партиции на p_months_ahead месяцев вперёд и применяет срок хранения:
+    # партиции старше p_retention_months отсоединяются (p_archive) или удаляются.
+    # NULL в p_retention_months - хранить всё.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION study_status_history_maintain(
+          p_months_ahead integer,
+          p_retention_months integer,
+          p_archive boolean
+        )
+        RETURNS integer
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+          v_current date := date_trunc('month', now() AT TIME ZONE 'UTC')::date;
+          v_cutoff date;
+          v_partition record;
+          v_removed integer := 0;
+        BEGIN
+          FOR i IN 0..p_months_ahead LOOP
+            PERFORM study_status_history_create_partition((v_current + make_interval(months => i))::date);
+          END LOOP;
+
+          IF p_retention_months IS NULL THEN
+            RETURN 0;
+          END IF;
+
+          v_cutoff := (v_current - make_interval(months => p_retention_months))::date;
+          FOR v_partition IN
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'study_status_history'::regclass
+              AND c.relname ~ '^study_status_history_y[0-9]{4}m[0-9]{2}$'
+              AND to_date(substring(c.relname FROM 'y([0-9]{4}m[0-9]{2})$'), 'YYYY"m"MM') < v_cutoff
+          LOOP
+            IF p_archive THEN
+              EXECUTE format('ALTER TABLE study_status_history DETACH PARTITION %I', v_partition.relname);
+              EXECUTE format('ALTER TABLE %I RENAME TO %I', v_partition.relname, 'archived_' || v_partition.relname);
+            ELSE
+              EXECUTE format('DROP TABLE %I', v_partition.relname);
+            END IF;
+            v_removed := v_removed + 1;
+          END LOOP;
+          RETURN v_removed;
+        END;
+        $$;
+        """,
+    )
+
+    # Партиции под уже накопленную историю и на три месяца вперёд, затем перенос данных
+    op.execute(
+        """
+        DO $$
+        DECLARE
+          v_month date := date_trunc(
+            'month',
+            coalesce((SELECT min(changed_at) FROM study_status_history_legacy), now()) AT TIME ZONE 'UTC'
+          )::date;
+        BEGIN
+          WHILE v_month < date_trunc('month', now() AT TIME ZONE 'UTC')::date LOOP
+            PERFORM study_status_history_create_partition(v_month);
+            v_month := (v_month + interval '1 month')::date;
+          END LOOP;
+          PERFORM study_status_history_maintain(3, NULL, true);
+        END;
+        $$;
+        """,
+    )
+    op.execute(
+        """
+        INSERT INTO study_status_history (id, study_id, from_status, to_status, changed_at, iteration_count)
+        SELECT id, study_id, from_status, to_status, changed_at, iteration_count
+        FROM study_status_history_legacy
+        """,
+    )
+    op.drop_table('study_status_history_legacy')
+    # trg_log_study_status пишет в study_status_history по имени - вставка теперь маршрутизируется в партицию
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('study_status_history', 'study_status_history_partitioned')
+    op.execute('ALTER TABLE study_status_history_partitioned RENAME CONSTRAINT study_status_history_pkey TO study_status_history_partitioned_pkey')
+    op.execute('ALTER TABLE study_status_history_partitioned RENAME CONSTRAINT study_status_history_study_id_fkey TO study_status_history_partitioned_study_id_fkey')
+    op.execute('ALTER INDEX study_status_history_study_id_idx RENAME TO study_status_history_partitioned_study_id_idx')
+    op.execute('ALTER INDEX study_status_history_to_status_idx RENAME TO study_status_history_partitioned_to_status_idx')
+    op.execute('ALTER SEQUENCE study_status_history_id_seq OWNED BY NONE')
+
+    op.create_table(
+        'study_status_history',
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('study_status_history_id_seq')"), nullable=False),
+        sa.Column('study_id', sa.Integer(), nullable=False),
+        sa.Column('from_status', psql.ENUM(name='study_status', create_type=False), nullable=True),
+        sa.Column('to_status', psql.ENUM(name='study_status', create_type=False), nullable=False),
+        sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('iteration_count', sa.SmallInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['study_id'], ['study.id'], name=op.f('study_status_history_study_id_fkey'), ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', name=op.f('study_status_history_pkey')),
+    )
+    op.execute('ALTER SEQUENCE study_status_history_id_seq OWNED BY study_status_history.id')
+    op.create_index(op.f('study_status_history_study_id_idx'), 'study_status_history', ['study_id'], unique=False)
+    op.create_index(op.f('study_status_history_to_status_idx'), 'study_status_history', ['to_status'], unique=False)
+    op.execute(
+        """
+        INSERT INTO study_status_history (id, study_id, from_status, to_status, changed_at, iteration_count)
+        SELECT id, study_id, from_status, to_status, changed_at, iteration_count
+        FROM study_status_history_partitioned
+        """,
+    )
+    op.execute('DROP TABLE study_status_history_partitioned')
+    op.execute('DROP FUNCTION IF EXISTS study_status_history_maintain(integer, integer, boolean)')
+    op.execute('DROP FUNCTION IF EXISTS study_status_history_create_partition(date)')
@@ -0,0 +1,141 @@
+"""Study stats rollups.
+
+Revision ID: 6b1e9d3c7f28
+Revises: 2f9c4e7b1a65
+Create Date: 2025-11-17 15:26:04.118937
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as psql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1e9d3c7f28'
+down_revision: Union[str, Sequence[str], None] = '2f9c4e7b1a65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    study_status_enum = psql.ENUM(name='study_status', create_type=False)
+
+    op.create_table(
+        'study_transition_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('annotator_id', sa.BigInteger(), nullable=False),
+        sa.Column('to_status', study_status_enum, nullable=False),
+        sa.Column('transitions', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'project_id', 'annotator_id', 'to_status', name=op.f('study_transition_daily_pkey')),
+    )
+    op.create_table(
+        'study_state_duration_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('annotator_id', sa.BigInteger(), nullable=False),
+        sa.Column('status', study_status_enum, nullable=False),
+        sa.Column('total_seconds', sa.Float(), nullable=False),
+        sa.Column('exits', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'project_id', 'annotator_id', 'status', name=op.f('study_state_duration_daily_pkey')),
+    )
+    op.create_table(
+        'study_stats_watermark',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('last_changed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('name', name=op.f('study_stats_watermark_pkey')),
+    )
+    # Первый прогон обработает всю накопленную историю, дальше - только новые строки
+    op.execute("INSERT INTO study_stats_watermark (name, last_changed_at, last_id) VALUES ('study_status_history', '-infinity', 0)")
+
+    # Переносит в сводные таблицы строки истории после водяного знака и сдвигает его.
+    # Берутся только строки старше now() - p_lag: changed_at - время начала транзакции,
+    # и более ранняя, но ещё не закоммиченная строка иначе оказалась бы позади водяного знака.
+    # Время в статусе - от предыдущей строки истории того же исследования до текущей.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION study_stats_refresh(p_lag interval)
+        RETURNS integer
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+          v_from_at timestamptz;
+          v_from_id integer;
+          v_rows integer;
+        BEGIN
+          -- Блокировка строки водяного знака не даёт двум процессам учесть одни и те же строки
+          SELECT last_changed_at, last_id INTO v_from_at, v_from_id
+          FROM study_stats_watermark
+          WHERE name = 'study_status_history'
+          FOR UPDATE;
+
+          WITH new_rows AS MATERIALIZED (
+            SELECT
+              h.id,
+              h.changed_at,
+              h.from_status,
+              h.to_status,
+              (h.changed_at AT TIME ZONE 'UTC')::date AS day,
+              s.project_id,
+              coalesce(s.annotator_id, 0) AS annotator_id,
+              prev.changed_at AS entered_at
+            FROM study_status_history h
+            JOIN study s ON s.id = h.study_id
+            LEFT JOIN LATERAL (
+              SELECT p.changed_at
+              FROM study_status_history p
+              WHERE p.study_id = h.study_id
+                AND (p.changed_at, p.id) < (h.changed_at, h.id)
+              ORDER BY p.changed_at DESC, p.id DESC
+              LIMIT 1
+            ) prev ON true
+            WHERE h.changed_at >= v_from_at
+              AND (h.changed_at, h.id) > (v_from_at, v_from_id)
+              AND h.changed_at <= now() - p_lag
+          ),
+          transitions AS (
+            INSERT INTO study_transition_daily AS t (day, project_id, annotator_id, to_status, transitions)
+            SELECT day, project_id, annotator_id, to_status, count(*)
+            FROM new_rows
+            GROUP BY day, project_id, annotator_id, to_status
+            ON CONFLICT (day, project_id, annotator_id, to_status)
+            DO UPDATE SET transitions = t.transitions + EXCLUDED.transitions
+          ),
+          durations AS (
+            INSERT INTO study_state_duration_daily AS d (day, project_id, annotator_id, status, total_seconds, exits)
+            SELECT day, project_id, annotator_id, from_status, sum(extract(epoch FROM changed_at - entered_at)), count(*)
+            FROM new_rows
+            WHERE from_status IS NOT NULL AND entered_at IS NOT NULL
+            GROUP BY day, project_id, annotator_id, from_status
+            ON CONFLICT (day, project_id, annotator_id, status)
+            DO UPDATE SET total_seconds = d.total_seconds + EXCLUDED.total_seconds, exits = d.exits + EXCLUDED.exits
+          ),
+          last_row AS (
+            SELECT changed_at, id FROM new_rows ORDER BY changed_at DESC, id DESC LIMIT 1
+          )
+          UPDATE study_stats_watermark w
+          SET last_changed_at = l.changed_at, last_id = l.id, refreshed_at = now()
+          FROM last_row l
+          WHERE w.name = 'study_status_history'
+          RETURNING (SELECT count(*) FROM new_rows) INTO v_rows;
+
+          IF v_rows IS NULL THEN
+            UPDATE study_stats_watermark SET refreshed_at = now() WHERE name = 'study_status_history';
+          END IF;
+          RETURN coalesce(v_rows, 0);
+        END;
+        $$;
+        """,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP FUNCTION IF EXISTS study_stats_refresh(interval)')
+    op.drop_table('study_stats_watermark')
+    op.drop_table('study_state_duration_daily')
+    op.drop_table('study_transition_daily')
@@ -0,0 +1,57 @@
+"""Outbox.
+
+Revision ID: 8d4a1f6e2b93
+Revises: 6b1e9d3c7f28
+Create Date: 2025-11-18 11:02:47.604215
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as psql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4a1f6e2b93'
+down_revision: Union[str, Sequence[str], None] = '6b1e9d3c7f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('kind', sa.Enum('TELEGRAM', 'NEXTCLOUD_COPY', name='outbox_kind'), nullable=False),
+        sa.Column('recipient', sa.String(length=255), nullable=False),
+        sa.Column('payload', psql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('dedup_key', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.Enum('PENDING', 'SENT', 'DEAD', name='outbox_status'), nullable=False),
+        sa.Column('attempts', sa.SmallInteger(), nullable=False),
+        sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id', name=op.f('outbox_pkey')),
+        sa.UniqueConstraint('dedup_key', name=op.f('outbox_dedup_key_key')),
+    )
+    op.create_index('outbox_pending_idx', 'outbox', ['id'], unique=False, postgresql_where=sa.text("status = 'PENDING'"))
+    op.create_index(
+        'outbox_pending_recipient_idx',
+        'outbox',
+        ['recipient', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+    op.create_index(op.f('outbox_processed_at_idx'), 'outbox', ['processed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('outbox_processed_at_idx'), table_name='outbox')
+    op.drop_index('outbox_pending_recipient_idx', table_name='outbox')
+    op.drop_index('outbox_pending_idx', table_name='outbox')
+    op.drop_table('outbox')
+    sa.Enum(name='outbox_status').drop(op.get_bind(), checkfirst=False)
+    sa.Enum(name='outbox_kind').drop(op.get_bind(), checkfirst=False)
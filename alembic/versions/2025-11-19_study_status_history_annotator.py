@@ -0,0 +1,144 @@
+"""Study status history annotator.
+
+Revision ID: 3c8e5a2d9f71
+Revises: 8d4a1f6e2b93
+Create Date: 2025-11-19 10:14:52.381604
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c8e5a2d9f71'
+down_revision: Union[str, Sequence[str], None] = '8d4a1f6e2b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Тело study_stats_refresh из 6b1e9d3c7f28; меняется только то, чей это переход
+_STATS_REFRESH = """
+        CREATE OR REPLACE FUNCTION study_stats_refresh(p_lag interval)
+        RETURNS integer
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+          v_from_at timestamptz;
+          v_from_id integer;
+          v_rows integer;
+        BEGIN
+          -- Блокировка строки водяного знака не даёт двум процессам учесть одни и те же строки
+          SELECT last_changed_at, last_id INTO v_from_at, v_from_id
+          FROM study_stats_watermark
+          WHERE name = 'study_status_history'
+          FOR UPDATE;
+
+          WITH new_rows AS MATERIALIZED (
+            SELECT
+              h.id,
+              h.changed_at,
+              h.from_status,
+              h.to_status,
+              (h.changed_at AT TIME ZONE 'UTC')::date AS day,
+              s.project_id,
+              __ANNOTATOR__ AS annotator_id,
+              prev.changed_at AS entered_at
+            FROM study_status_history h
+            JOIN study s ON s.id = h.study_id
+            LEFT JOIN LATERAL (
+              SELECT p.changed_at
+              FROM study_status_history p
+              WHERE p.study_id = h.study_id
+                AND (p.changed_at, p.id) < (h.changed_at, h.id)
+              ORDER BY p.changed_at DESC, p.id DESC
+              LIMIT 1
+            ) prev ON true
+            WHERE h.changed_at >= v_from_at
+              AND (h.changed_at, h.id) > (v_from_at, v_from_id)
+              AND h.changed_at <= now() - p_lag
+          ),
+          transitions AS (
+            INSERT INTO study_transition_daily AS t (day, project_id, annotator_id, to_status, transitions)
+            SELECT day, project_id, annotator_id, to_status, count(*)
+            FROM new_rows
+            GROUP BY day, project_id, annotator_id, to_status
+            ON CONFLICT (day, project_id, annotator_id, to_status)
+            DO UPDATE SET transitions = t.transitions + EXCLUDED.transitions
+          ),
+          durations AS (
+            INSERT INTO study_state_duration_daily AS d (day, project_id, annotator_id, status, total_seconds, exits)
+            SELECT day, project_id, annotator_id, from_status, sum(extract(epoch FROM changed_at - entered_at)), count(*)
+            FROM new_rows
+            WHERE from_status IS NOT NULL AND entered_at IS NOT NULL
+            GROUP BY day, project_id, annotator_id, from_status
+            ON CONFLICT (day, project_id, annotator_id, status)
+            DO UPDATE SET total_seconds = d.total_seconds + EXCLUDED.total_seconds, exits = d.exits + EXCLUDED.exits
+          ),
+          last_row AS (
+            SELECT changed_at, id FROM new_rows ORDER BY changed_at DESC, id DESC LIMIT 1
+          )
+          UPDATE study_stats_watermark w
+          SET last_changed_at = l.changed_at, last_id = l.id, refreshed_at = now()
+          FROM last_row l
+          WHERE w.name = 'study_status_history'
+          RETURNING (SELECT count(*) FROM new_rows) INTO v_rows;
+
+          IF v_rows IS NULL THEN
+            UPDATE study_stats_watermark SET refreshed_at = now() WHERE name = 'study_status_history';
+          END IF;
+          RETURN coalesce(v_rows, 0);
+        END;
+        $$;
+"""
+
+# При отмене задачи annotator_id сбрасывается, а время в статусе принадлежит прежнему разметчику
+_LOG_STUDY_STATUS = """
+        CREATE OR REPLACE FUNCTION trg_log_study_status()
+        RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+          IF NEW.status IS DISTINCT FROM OLD.status THEN
+            INSERT INTO study_status_history(
+              study_id, from_status, to_status, iteration_count__ANNOTATOR_COLUMN__
+            )
+            VALUES (
+              OLD.id,
+              OLD.status,
+              NEW.status,
+              NEW.iteration_count__ANNOTATOR_VALUE__
+            );
+          END IF;
+          RETURN NEW;
+        END;
+        $$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Колонка добавляется во все партиции; без значения по умолчанию это только изменение каталога
+    op.add_column('study_status_history', sa.Column('annotator_id', sa.BigInteger(), nullable=True))
+    op.execute(
+        _LOG_STUDY_STATUS.replace('__ANNOTATOR_COLUMN__', ', annotator_id').replace(
+            '__ANNOTATOR_VALUE__', ',\n              coalesce(NEW.annotator_id, OLD.annotator_id)',
+        ),
+    )
+    # Для прежних строк разметчик на момент перехода не сохранился; берётся текущий,
+    # как и раньше считала study_stats_refresh, поэтому уже собранные сводки не расходятся с историей
+    op.execute(
+        """
+        UPDATE study_status_history h
+        SET annotator_id = s.annotator_id
+        FROM study s
+        WHERE s.id = h.study_id AND h.annotator_id IS NULL AND s.annotator_id IS NOT NULL
+        """,
+    )
+    op.execute(_STATS_REFRESH.replace('__ANNOTATOR__', 'coalesce(h.annotator_id, 0)'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(_STATS_REFRESH.replace('__ANNOTATOR__', 'coalesce(s.annotator_id, 0)'))
+    op.execute(_LOG_STUDY_STATUS.replace('__ANNOTATOR_COLUMN__', '').replace('__ANNOTATOR_VALUE__', ''))
+    op.drop_column('study_status_history', 'annotator_id')
@@ -0,0 +1,151 @@
+"""Move study status history rows out of the default partition.
+
+Revision ID: 5a7d2c9e4b18
+Revises: 3c8e5a2d9f71
+Create Date: 2025-11-20 11:02:17.734920
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7d2c9e4b18'
+down_revision: Union[str, Sequence[str], None] = '3c8e5a2d9f71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_CREATE_PARTITION_OLD = """
+        CREATE OR REPLACE FUNCTION study_status_history_create_partition(p_month date)
+        RETURNS void
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+          v_month date := date_trunc('month', p_month)::date;
+        BEGIN
+          EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF study_status_history FOR VALUES FROM (%L) TO (%L)',
+            'study_status_history_' || to_char(v_month, '"y"YYYY"m"MM'),
+            v_month::timestamp AT TIME ZONE 'UTC',
+            (v_month + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+          );
+        END;
+        $$;
+"""
+# Партиция месяца не создаётся, пока в DEFAULT лежат строки этого месяца. DEFAULT отсоединяется,
+# строки месяца переезжают в новую партицию, затем DEFAULT присоединяется обратно. Пока DEFAULT
+# отсоединена, вставки в историю ждут конца транзакции
+_CREATE_PARTITION = """
+        CREATE OR REPLACE FUNCTION study_status_history_create_partition(p_month date)
+        RETURNS void
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+          v_month date := date_trunc('month', p_month)::date;
+          v_name text := 'study_status_history_' || to_char(v_month, '"y"YYYY"m"MM');
+          v_from timestamptz := v_month::timestamp AT TIME ZONE 'UTC';
+          v_to timestamptz := (v_month + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+        BEGIN
+          IF to_regclass(v_name) IS NOT NULL THEN
+            RETURN;
+          END IF;
+          IF NOT EXISTS (
+            SELECT 1 FROM study_status_history_default WHERE changed_at >= v_from AND changed_at < v_to
+          ) THEN
+            EXECUTE format(
+              'CREATE TABLE IF NOT EXISTS %I PARTITION OF study_status_history FOR VALUES FROM (%L) TO (%L)',
+              v_name, v_from, v_to
+            );
+            RETURN;
+          END IF;
+
+          ALTER TABLE study_status_history DETACH PARTITION study_status_history_default;
+          EXECUTE format(
+            'CREATE TABLE %I PARTITION OF study_status_history FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_from, v_to
+          );
+          WITH moved AS (
+            DELETE FROM study_status_history_default
+            WHERE changed_at >= v_from AND changed_at < v_to
+            RETURNING id, study_id, from_status, to_status, changed_at, iteration_count, annotator_id
+          )
+          INSERT INTO study_status_history (id, study_id, from_status, to_status, changed_at, iteration_count, annotator_id)
+          SELECT id, study_id, from_status, to_status, changed_at, iteration_count, annotator_id
+          FROM moved;
+          ALTER TABLE study_status_history ATTACH PARTITION study_status_history_default DEFAULT;
+        END;
+        $$;
+"""
+# Тело study_status_history_maintain из 2f9c4e7b1a65; добавляется только разбор DEFAULT
+_MAINTAIN = """
+        CREATE OR REPLACE FUNCTION study_status_history_maintain(
+          p_months_ahead integer,
+          p_retention_months integer,
+          p_archive boolean
+        )
+        RETURNS integer
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+          v_current date := date_trunc('month', now() AT TIME ZONE 'UTC')::date;
+          v_cutoff date;
+          v_partition record;
+          v_removed integer := 0;__DEFAULT_MONTH__
+        BEGIN
+          FOR i IN 0..p_months_ahead LOOP
+            PERFORM study_status_history_create_partition((v_current + make_interval(months => i))::date);
+          END LOOP;
+__DRAIN_DEFAULT__
+          IF p_retention_months IS NULL THEN
+            RETURN 0;
+          END IF;
+
+          v_cutoff := (v_current - make_interval(months => p_retention_months))::date;
+          FOR v_partition IN
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'study_status_history'::regclass
+              AND c.relname ~ '^study_status_history_y[0-9]{4}m[0-9]{2}$'
+              AND to_date(substring(c.relname FROM 'y([0-9]{4}m[0-9]{2})$'), 'YYYY"m"MM') < v_cutoff
+          LOOP
+            IF p_archive THEN
+              EXECUTE format('ALTER TABLE study_status_history DETACH PARTITION %I', v_partition.relname);
+              EXECUTE format('ALTER TABLE %I RENAME TO %I', v_partition.relname, 'archived_' || v_partition.relname);
+            ELSE
+              EXECUTE format('DROP TABLE %I', v_partition.relname);
+            END IF;
+            v_removed := v_removed + 1;
+          END LOOP;
+          RETURN v_removed;
+        END;
+        $$;
+"""
+# Строки месяцев без партиции (обслуживание не успело её создать) разносятся по своим партициям,
+# после чего к ним применяется и срок хранения
+_DRAIN_DEFAULT = """
+          FOR v_default_month IN
+            SELECT DISTINCT date_trunc('month', changed_at AT TIME ZONE 'UTC')::date
+            FROM study_status_history_default
+          LOOP
+            PERFORM study_status_history_create_partition(v_default_month);
+          END LOOP;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(_CREATE_PARTITION)
+    op.execute(
+        _MAINTAIN.replace('__DEFAULT_MONTH__', '\n          v_default_month date;').replace(
+            '__DRAIN_DEFAULT__', _DRAIN_DEFAULT,
+        ),
+    )
+    # Разбирает то, что уже накопилось в DEFAULT
+    op.execute('SELECT study_status_history_maintain(0, NULL, true)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(_MAINTAIN.replace('__DEFAULT_MONTH__', '').replace('__DRAIN_DEFAULT__', ''))
+    op.execute(_CREATE_PARTITION_OLD)
@@ -0,0 +1,147 @@
+"""Общая часть бенчмарков с PostgreSQL.
+
+Схема создаётся во временной схеме ``bench`` внутри транзакции, которая в конце откатывается,
+поэтому подойдёт любая база, к которой есть доступ на создание схем; её содержимое не меняется.
+Триггеры и функции миграций не создаются.
+"""
+
+import argparse
+import os
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+
+from sqlalchemy import ClauseElement, event, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from core import models  # noqa: F401 - регистрирует все таблицы в metadata
+from core.database import metadata
+
+
+def parse_args(parser: argparse.ArgumentParser) -> argparse.Namespace:
+    """Разбирает аргументы бенчмарка; адрес базы - ``--url`` или ``BENCH_DATABASE_URL``."""
+    parser.add_argument(
+        "--url",
+        default=os.environ.get("BENCH_DATABASE_URL"),
+        help="postgresql+asyncpg://... (по умолчанию BENCH_DATABASE_URL)",
+    )
+    args = parser.parse_args()
+    if not args.url:
+        parser.error("--url or BENCH_DATABASE_URL is required")
+    return args
+
+
+@asynccontextmanager
+async def scratch_schema(url: str) -> AsyncIterator[AsyncConnection]:
+    engine = create_async_engine(url, poolclass=NullPool)
+    try:
+        async with engine.connect() as conn:
+            await conn.begin()
+            try:
+                await conn.execute(text("CREATE SCHEMA bench"))
+                await conn.execute(text("SET LOCAL search_path TO bench"))
+                await conn.run_sync(metadata.create_all)
+                yield conn
+            finally:
+                await conn.rollback()
+    finally:
+        await engine.dispose()
+
+
+# Исследования по id: последние ``new`` - очередь NEW, каждое ``active_every``-е - в работе
+# (поровну ASSIGNED и IN_REVIEW), остальные закрыты, как в базе, которая работает не первый год
+_SEED_STUDIES = """
+INSERT INTO study (study_iuid, batch_id, project_id, study_path, status, iteration_count, annotator_id, expert_id)
+SELECT
+  '1.2.840.' || g,
+  g % :batches + 1,
+  (g % :batches) % :projects + 1,
+  'projects/bench/1-original-data/' || g,
+  (CASE
+    WHEN g > :total - :new THEN 'NEW'
+    WHEN g % :active_every = 0 THEN 'ASSIGNED'
+    WHEN g % :active_every = 1 THEN 'IN_REVIEW'
+    WHEN g % 5 = 0 THEN 'CLOSED_N'
+    ELSE 'APPROVED'
+  END)::study_status,
+  1,
+  CASE WHEN g > :total - :new THEN NULL ELSE g % :users + 1 END,
+  CASE WHEN g > :total - :new THEN NULL ELSE (g + 1) % :users + 1 END
+FROM generate_series(1, :total) AS g
+"""
+
+
+async def seed_studies(
+    conn: AsyncConnection,
+    *,
+    total: int,
+    new: int,
+    projects: int = 10,
+    batches: int = 1000,
+    users: int = 200,
+    active_every: int = 1000,
+) -> None:
+    """Заполняет проекты, партии (партия ``b`` принадлежит проекту ``(b - 1) % projects + 1``),
+    пользователей и ``total`` исследований, затем собирает статистику планировщика.
+    """
+    params = {
+        "total": total,
+        "new": new,
+        "projects": projects,
+        "batches": batches,
+        "users": users,
+        "active_every": active_every,
+    }
+    await conn.execute(
+        text(
+            "INSERT INTO project (id, name, tg_group_id, product) "
+            "SELECT g, 'project-' || g, -g, 'DX' FROM generate_series(1, :projects) AS g",
+        ),
+        params,
+    )
+    await conn.execute(
+        text(
+            "INSERT INTO batch (id, name, project_id) "
+            "SELECT g, 'batch-' || g, (g - 1) % :projects + 1 FROM generate_series(1, :batches) AS g",
+        ),
+        params,
+    )
+    await conn.execute(
+        text(
+            'INSERT INTO "user" (tg_id, role, name) '
+            "SELECT g, 'ANNOTATOR', 'user-' || g FROM generate_series(1, :users) AS g",
+        ),
+        params,
+    )
+    await conn.execute(text(_SEED_STUDIES), params)
+    await conn.execute(text('ANALYZE project, batch, "user", study'))
+
+
+async def explain(conn: AsyncConnection, stmt: ClauseElement, **params: Any) -> list[str]:  # noqa: ANN401
+    """План с фактическим временем и буферами; параметры подставляются в текст запроса."""
+    sql = stmt.params(**params).compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    res = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))
+    return [row[0] for row in res]
+
+
+class StatementCounter:
+    """Число SQL-запросов, отправленных через соединение."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *_: Any) -> None:  # noqa: ANN401
+        self.count += 1
+
+
+@contextmanager
+def count_statements(conn: AsyncConnection) -> Iterator[StatementCounter]:
+    # У движка бенчмарка одно соединение, поэтому слушать можно движок
+    counter = StatementCounter()
+    event.listen(conn.sync_engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(conn.sync_engine, "before_cursor_execute", counter)
@@ -0,0 +1,80 @@
+"""Назначение следующего NEW исследования: через join с batch и через project_id в study.
+
+«До» - выборка по ``batch.project_id`` с join и частичным индексом ``(batch_id, id)``.
+«После» - выборка только из study по частичному индексу ``(project_id, id)``. Для каждого
+варианта выводится план выборки и среднее время назначения (UPDATE ... RETURNING)
+за ``--assigns`` вызовов; назначения откатываются.
+
+Нужна PostgreSQL: ``uv run python -m benchmarks.assign_path --url postgresql+asyncpg://... [--studies N]``.
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import CTE, Update, bindparam, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from benchmarks._db import explain, parse_args, scratch_schema, seed_studies
+from core.models.batch import Batch
+from core.models.study import Study, StudyStatusEnum
+from core.repositories.study_repo import _ASSIGN_TO_USER_Q, _next_new_study
+
+# Запрос до переноса project_id в study
+_old_next_new_study = (
+    select(Study.id)
+    .join(Batch, Study.batch_id == Batch.id)
+    .where(Batch.project_id == bindparam("target_project_id"), Study.status == StudyStatusEnum.NEW)
+    .order_by(Study.id)
+    .limit(1)
+    .with_for_update(skip_locked=True)
+    .cte("c")
+)
+_OLD_ASSIGN_TO_USER_Q = (
+    update(Study)
+    .where(Study.id == select(_old_next_new_study.c.id).scalar_subquery())
+    .values(
+        annotator_id=bindparam("user_id"), status=StudyStatusEnum.ASSIGNED, iteration_count=Study.iteration_count + 1
+    )
+    .returning(Study)
+)
+
+
+async def _measure(conn: AsyncConnection, title: str, pick: CTE, assign: Update, assigns: int) -> None:
+    print(f"=== {title}")
+    params = {"target_project_id": 1, "user_id": 1}
+    # Первый прогон прогревает кеш, выводится второй
+    await explain(conn, select(pick.c.id), target_project_id=1)
+    print("\n".join(await explain(conn, select(pick.c.id), target_project_id=1)))
+    # Каждое назначение забирает следующее NEW исследование; после замера они возвращаются
+    savepoint = await conn.begin_nested()
+    started = time.perf_counter()
+    for _ in range(assigns):
+        await conn.execute(assign, params)
+    elapsed = (time.perf_counter() - started) / assigns
+    await savepoint.rollback()
+    print(f"assign: {elapsed * 1000:.3f} ms per call over {assigns} calls")
+
+
+async def _run(url: str, studies: int, new: int, assigns: int) -> None:
+    async with scratch_schema(url) as conn:
+        await seed_studies(conn, total=studies, new=new)
+        await _measure(conn, "after: study.project_id", _next_new_study, _ASSIGN_TO_USER_Q, assigns)
+
+        await conn.execute(text("DROP INDEX study_project_id_id_new_idx"))
+        await conn.execute(text("CREATE INDEX study_batch_id_id_new_idx ON study (batch_id, id) WHERE status = 'NEW'"))
+        await conn.execute(text("ANALYZE study"))
+        await _measure(conn, "before: join with batch", _old_next_new_study, _OLD_ASSIGN_TO_USER_Q, assigns)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--studies", type=int, default=1_000_000)
+    parser.add_argument("--new", type=int, default=5000, help="NEW studies at the end of the id range")
+    parser.add_argument("--assigns", type=int, default=1000)
+    args = parse_args(parser)
+    asyncio.run(_run(args.url, args.studies, args.new, args.assigns))
+
+
+if __name__ == "__main__":
+    main()
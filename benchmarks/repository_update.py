@@ -0,0 +1,74 @@
+"""Запросы и время на ``update`` репозитория: UPDATE + SELECT против UPDATE ... RETURNING.
+
+Нужна PostgreSQL: ``uv run python -m benchmarks.repository_update --url postgresql+asyncpg://...``.
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from benchmarks._db import count_statements, parse_args, scratch_schema
+from core.models import Batch, Project, Study
+from core.models.project import ProductEnum
+from core.models.study import StudyStatusEnum
+from core.repositories.study_repo import StudySQLAlchemyRepository
+
+_ITERATIONS = 500
+
+
+async def _update_then_select(repo: StudySQLAlchemyRepository, study_id: int, values: dict[str, Any]) -> Study | None:
+    # Как update() работал раньше
+    await repo.session.execute(update(Study).where(Study.id == study_id).values(**values))
+    return await repo.get_by_id(study_id)
+
+
+async def _measure(
+    conn: AsyncConnection,
+    name: str,
+    call: Callable[[int], Awaitable[Study | None]],
+) -> None:
+    with count_statements(conn) as counter:
+        await call(0)
+    started = time.perf_counter()
+    for i in range(_ITERATIONS):
+        await call(i)
+    elapsed = (time.perf_counter() - started) / _ITERATIONS
+    print(f"{name:<22} {counter.count} statement(s) per call, {elapsed * 1000:.3f} ms per call")
+
+
+async def _run(url: str) -> None:
+    async with scratch_schema(url) as conn:
+        session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        session.add(Project(id=1, name="bench", tg_group_id=-1, product=ProductEnum.DX))
+        await session.flush()
+        batch = Batch(name="bench", project_id=1)
+        session.add(batch)
+        await session.flush()
+        study = Study(
+            study_iuid="1.2.3", batch_id=batch.id, project_id=1, study_path="p/0001", status=StudyStatusEnum.NEW
+        )
+        session.add(study)
+        await session.flush()
+
+        repo = StudySQLAlchemyRepository(session)
+        await _measure(
+            conn,
+            "update + get_by_id",
+            lambda i: _update_then_select(repo, study.id, {"nc_upload_link": f"link-{i}"}),
+        )
+        await _measure(conn, "update ... returning", lambda i: repo.update(study.id, {"nc_upload_link": f"link-{i}"}))
+        await session.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    asyncio.run(_run(parse_args(parser).url))
+
+
+if __name__ == "__main__":
+    main()
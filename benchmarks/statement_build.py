@@ -0,0 +1,67 @@
+"""Стоимость подготовки горячих запросов на стороне Python, без базы.
+
+Сравнивает запрос, собираемый заново на каждый вызов (как было до вынесения запросов
+на уровень модуля), с готовым запросом из ``study_repo``: на каждом execute SQLAlchemy
+строит ключ кеша компиляции, поэтому в замер входят конструкция и ``_generate_cache_key``.
+Отдельно - поиск первичного ключа модели через ``inspect`` и через кеш ``base._primary_key``.
+
+Запуск: ``uv run python -m benchmarks.statement_build [--number N]``.
+"""
+
+import argparse
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import inspect, select, update
+
+from core.models.study import Study, StudyStatusEnum
+from core.repositories.base import _primary_key
+from core.repositories.study_repo import _ASSIGN_TO_USER_Q
+
+
+def _assign_to_user_rebuilt(project_id: int, user_id: int) -> Any:  # noqa: ANN401
+    next_new_study = (
+        select(Study.id)
+        .where(Study.project_id == project_id, Study.status == StudyStatusEnum.NEW)
+        .order_by(Study.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .cte("c")
+    )
+    stmt = (
+        update(Study)
+        .where(Study.id == select(next_new_study.c.id).scalar_subquery())
+        .values(annotator_id=user_id, status=StudyStatusEnum.ASSIGNED, iteration_count=Study.iteration_count + 1)
+        .returning(Study)
+    )
+    return stmt._generate_cache_key()
+
+
+def _assign_to_user_prebuilt(project_id: int, user_id: int) -> Any:  # noqa: ANN401, ARG001
+    # Параметры уходят в execute отдельно и в ключ кеша не входят
+    return _ASSIGN_TO_USER_Q._generate_cache_key()
+
+
+def _report(name: str, before: Callable[[], Any], after: Callable[[], Any], number: int) -> None:
+    before_us = min(timeit.repeat(before, number=number, repeat=5)) / number * 1e6
+    after_us = min(timeit.repeat(after, number=number, repeat=5)) / number * 1e6
+    print(f"{name:<24} before {before_us:9.2f} us/call   after {after_us:9.2f} us/call   x{before_us / after_us:.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="calls per measurement")
+    args = parser.parse_args()
+
+    _report(
+        "assign_to_user",
+        lambda: _assign_to_user_rebuilt(1, 2),
+        lambda: _assign_to_user_prebuilt(1, 2),
+        args.number,
+    )
+    _report("model_pk", lambda: inspect(Study).primary_key[0], lambda: _primary_key(Study), args.number)
+
+
+if __name__ == "__main__":
+    main()
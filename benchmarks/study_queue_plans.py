@@ -0,0 +1,62 @@
+"""Планы запросов очередей разметки на большой таблице study: без индексов очередей и с ними.
+
+«До» - индексы, которые были до частичных и составных: одиночные по annotator_id, expert_id,
+batch_id и status. «После» - индексы модели Study. На каждый набор выводится
+EXPLAIN (ANALYZE, BUFFERS) выборки следующего NEW исследования проекта и поиска текущих задач
+разметчика и эксперта. Ожидаемо «после» - Index Scan по частичному или составному индексу
+с несколькими буферами, которые не растут вместе с числом закрытых исследований.
+
+Нужна PostgreSQL: ``uv run python -m benchmarks.study_queue_plans --url postgresql+asyncpg://... [--studies N]``.
+Заполнение миллиона строк занимает десятки секунд.
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from benchmarks._db import explain, parse_args, scratch_schema, seed_studies
+from core.repositories.study_repo import _ASSIGNED_FOR_ANNOTATOR_Q, _IN_REVIEW_FOR_EXPERT_Q, _next_new_study
+
+_QUEUE_INDEXES = ("study_project_id_id_new_idx", "study_annotator_id_status_idx", "study_expert_id_status_idx")
+
+
+async def _print_plans(conn: AsyncConnection, title: str) -> None:
+    print(f"=== {title}")
+    queries = {
+        "next NEW study of a project": (select(_next_new_study.c.id), {"target_project_id": 1}),
+        "annotator's current study": (_ASSIGNED_FOR_ANNOTATOR_Q, {"user_id": 1}),
+        # Пользователи 1 и 3 по раскладке seed_studies держат задачи ASSIGNED и IN_REVIEW
+        "expert's current study": (_IN_REVIEW_FOR_EXPERT_Q, {"user_id": 3}),
+    }
+    for name, (stmt, params) in queries.items():
+        print(f"--- {name}")
+        # Первый прогон прогревает кеш, выводится второй
+        await explain(conn, stmt, **params)
+        print("\n".join(await explain(conn, stmt, **params)))
+
+
+async def _run(url: str, studies: int, new: int) -> None:
+    async with scratch_schema(url) as conn:
+        await seed_studies(conn, total=studies, new=new)
+        await _print_plans(conn, f"after: model indexes ({studies} studies, {new} NEW)")
+
+        for index in _QUEUE_INDEXES:
+            await conn.execute(text(f"DROP INDEX {index}"))
+        await conn.execute(text("CREATE INDEX study_annotator_id_idx ON study (annotator_id)"))
+        await conn.execute(text("CREATE INDEX study_expert_id_idx ON study (expert_id)"))
+        await conn.execute(text("ANALYZE study"))
+        await _print_plans(conn, "before: single-column indexes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--studies", type=int, default=1_000_000)
+    parser.add_argument("--new", type=int, default=5000, help="NEW studies at the end of the id range")
+    args = parse_args(parser)
+    asyncio.run(_run(args.url, args.studies, args.new))
+
+
+if __name__ == "__main__":
+    main()
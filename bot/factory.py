@@ -0,0 +1,60 @@
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.utils.callback_answer import CallbackAnswerMiddleware
+from dishka import AsyncContainer
+from dishka.integrations.aiogram import setup_dishka
+
+from bot.middleware.fsm_session import FSMSessionMiddleware, FSMSessionStorage
+from bot.middleware.send_limit import SendLimitMiddleware, UpdateChatMiddleware
+from bot.middleware.sql_stats import SqlStatsMiddleware
+from bot.middleware.update_timing import HandlerTimingMiddleware, TelegramTimingMiddleware, UpdateTimingMiddleware
+from bot.register_handlers import register_handlers
+from bot.utils.fsm_storage import CompactRedisStorage
+from bot.utils.rate_limiter import TelegramRateLimiter
+from core.config import Settings
+
+
+def create_bot(settings: Settings) -> Bot:
+    """Бот с лимитером исходящих запросов; лимитер свой у каждого процесса."""
+    bot_properties = DefaultBotProperties(parse_mode="html", link_preview_is_disabled=True)
+    bot = Bot(token=settings.BOT_TOKEN, default=bot_properties)
+    rate_limiter = TelegramRateLimiter(
+        global_rate=settings.BOT_SEND_GLOBAL_RATE,
+        chat_rate=settings.BOT_SEND_CHAT_RATE,
+        group_rate=settings.BOT_SEND_GROUP_RATE_PER_MINUTE / 60,
+    )
+    # Первым, чтобы в замер попало и ожидание лимитера
+    bot.session.middleware(TelegramTimingMiddleware())
+    bot.session.middleware(SendLimitMiddleware(rate_limiter, max_retries=settings.BOT_SEND_MAX_RETRIES))
+    return bot
+
+
+def create_fsm_storage(settings: Settings) -> CompactRedisStorage:
+    return CompactRedisStorage.from_url(
+        str(settings.REDIS_URI),
+        default_ttl=settings.BOT_FSM_TTL or None,
+        state_ttls=settings.BOT_FSM_STATE_TTLS,
+    )
+
+
+def create_dispatcher(settings: Settings, container: AsyncContainer, storage: CompactRedisStorage) -> Dispatcher:
+    """Dispatcher со всеми обработчиками; одинаковый в основном процессе и в воркерах апдейтов."""
+    # Сессионная обёртка встаёт на место FSM middleware диспетчера, чтобы читать состояние вместе с данными
+    dp = Dispatcher(
+        storage=FSMSessionStorage(storage) if settings.BOT_FSM_SESSION else storage,
+        disable_fsm=settings.BOT_FSM_SESSION,
+    )
+    dp.update.outer_middleware(UpdateTimingMiddleware(slow_threshold=settings.BOT_SLOW_UPDATE_THRESHOLD))
+    if settings.BOT_FSM_SESSION:
+        dp.update.outer_middleware(FSMSessionMiddleware(dp.fsm))
+    dp.update.outer_middleware(UpdateChatMiddleware())
+    dp.callback_query.middleware(CallbackAnswerMiddleware())
+    register_handlers(dp)
+    handler_timing_middleware = HandlerTimingMiddleware()
+    sql_stats_middleware = SqlStatsMiddleware(n_plus_one_threshold=settings.DATABASE_N_PLUS_ONE_THRESHOLD)
+    for update_type in dp.resolve_used_update_types():
+        dp.observers[update_type].middleware(handler_timing_middleware)
+        if settings.DATABASE_SQL_STATS:
+            dp.observers[update_type].middleware(sql_stats_middleware)
+    setup_dishka(container=container, router=dp, auto_inject=True)
+    return dp
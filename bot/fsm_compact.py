@@ -0,0 +1,139 @@
+"""Перевод ключей FSM в компактный формат: ``python -m bot.fsm_compact [--dry-run]``.
+
+Ключи прежнего формата (``fsm:<chat>[:<thread>]:<user>:<destiny>:<state|data>``, JSON) переписываются
+в формат ``CompactRedisStorage`` (msgpack, TTL по состоянию) и удаляются; уже существующие ключи
+нового формата не перезаписываются. Ключам нового формата без срока проставляется TTL.
+Запускать после остановки процессов, которые пишут прежний формат.
+"""
+
+import argparse
+import asyncio
+import json
+from dataclasses import dataclass
+
+from aiogram.fsm.storage.base import StorageKey
+from loguru import logger
+
+from bot.factory import create_fsm_storage
+from bot.utils.fsm_storage import CompactRedisStorage
+from core.config import Settings
+from core.utils.logging_config import setup_logging
+
+_LEGACY_PREFIX = "fsm"
+_BATCH = 500
+
+
+@dataclass(slots=True)
+class _Stats:
+    contexts: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    ttl_applied: int = 0
+
+
+def _parse_legacy_key(key: str) -> StorageKey | None:
+    # DefaultKeyBuilder(with_destiny=True): fsm:<chat>[:<thread>]:<user>:<destiny>:<part>
+    parts = key.split(":")
+    if parts[0] != _LEGACY_PREFIX or parts[-1] not in {"state", "data"} or len(parts) not in {5, 6}:
+        return None
+    try:
+        ids = [int(part) for part in parts[1:-2]]
+    except ValueError:
+        return None
+    chat_id, thread_id, user_id = (ids[0], None, ids[1]) if len(ids) == 2 else ids
+    return StorageKey(bot_id=0, chat_id=chat_id, user_id=user_id, thread_id=thread_id, destiny=parts[-2])
+
+
+async def _scan(storage: CompactRedisStorage, pattern: str) -> list[str]:
+    keys = storage.redis.scan_iter(match=pattern, count=_BATCH)
+    return [key.decode() if isinstance(key, bytes) else key async for key in keys]
+
+
+async def _migrate_legacy(storage: CompactRedisStorage, stats: _Stats, *, dry_run: bool) -> None:
+    # Контекст -> общая часть его ключей (без ``:state``/``:data``)
+    contexts: dict[StorageKey, str] = {}
+    for key in await _scan(storage, f"{_LEGACY_PREFIX}:*"):
+        parsed = _parse_legacy_key(key)
+        if parsed is not None:
+            contexts[parsed] = key.rsplit(":", 1)[0]
+
+    items = list(contexts.items())
+    for start in range(0, len(items), _BATCH):
+        batch = items[start : start + _BATCH]
+        async with storage.redis.pipeline(transaction=False) as pipe:
+            for _, base in batch:
+                pipe.get(f"{base}:state")
+                pipe.get(f"{base}:data")
+            values = await pipe.execute()
+
+        async with storage.redis.pipeline(transaction=True) as pipe:
+            for (storage_key, base), raw_state, raw_data in zip(batch, values[::2], values[1::2], strict=True):
+                state = raw_state.decode() if isinstance(raw_state, bytes) else raw_state
+                data = json.loads(raw_data) if raw_data is not None else {}
+                packed = storage.dump_data(data) if data else b""
+                ttl = storage.ttl_for(state)
+                stats.contexts += 1
+                stats.bytes_before += len(raw_state or b"") + len(raw_data or b"")
+                stats.bytes_after += len(state.encode() if state else b"") + len(packed)
+                # Ключ нового формата мог появиться, пока старый ждал миграции; он новее
+                if state:
+                    pipe.set(storage.key_builder.build(storage_key, "state"), state, ex=ttl, nx=True)
+                if packed:
+                    pipe.set(storage.key_builder.build(storage_key, "data"), packed, ex=ttl, nx=True)
+                pipe.delete(f"{base}:state", f"{base}:data")
+            if not dry_run:
+                await pipe.execute()
+
+
+async def _apply_ttl(storage: CompactRedisStorage, stats: _Stats, *, dry_run: bool) -> None:
+    keys = [key for key in await _scan(storage, f"{storage.key_builder.prefix}:*") if key.endswith((":s", ":d"))]
+    for start in range(0, len(keys), _BATCH):
+        batch = keys[start : start + _BATCH]
+        async with storage.redis.pipeline(transaction=False) as pipe:
+            for key in batch:
+                pipe.ttl(key)
+                pipe.get(key if key.endswith(":s") else storage.key_builder.state_key(key))
+            values = await pipe.execute()
+
+        async with storage.redis.pipeline(transaction=False) as pipe:
+            for key, key_ttl, raw_state in zip(batch, values[::2], values[1::2], strict=True):
+                # -1: ключ без срока (-2: успел исчезнуть)
+                if key_ttl != -1:
+                    continue
+                ttl = storage.ttl_for(raw_state.decode() if isinstance(raw_state, bytes) else raw_state)
+                if ttl is not None:
+                    pipe.expire(key, ttl)
+                    stats.ttl_applied += 1
+            if not dry_run:
+                await pipe.execute()
+
+
+async def _run(settings: Settings, *, dry_run: bool) -> None:
+    storage = create_fsm_storage(settings)
+    stats = _Stats()
+    try:
+        await _migrate_legacy(storage, stats, dry_run=dry_run)
+        await _apply_ttl(storage, stats, dry_run=dry_run)
+    finally:
+        await storage.close()
+    logger.info(
+        "{}FSM compaction: {} contexts migrated ({} -> {} bytes), TTL set on {} keys",
+        "[dry run] " if dry_run else "",
+        stats.contexts,
+        stats.bytes_before,
+        stats.bytes_after,
+        stats.ttl_applied,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Перевод ключей FSM в компактный формат с TTL")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не менять")
+    args = parser.parse_args()
+    settings = Settings()
+    setup_logging(settings)
+    asyncio.run(_run(settings, dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,7 @@ from dishka.integrations.aiogram import FromDishka
 
 from bot.states.add_user_to_project import AddProjectUserState
 from core.models.user import UserRoleEnum
-from core.unit_of_work import IUnitOfWork
+from core.unit_of_work import IReadOnlyUnitOfWork, IUnitOfWork
 
 
 class Project(CallbackData, prefix="for-project"):
@@ -28,7 +28,7 @@ async def add_user_to_project(msg: types.Message, state: FSMContext, uow: FromDi
     await msg.answer(text="Пришлите TG-id пользователя")
 
 
-async def user_tg_id_writen(msg: types.Message, state: FSMContext, uow: FromDishka[IUnitOfWork]) -> None:
+async def user_tg_id_writen(msg: types.Message, state: FSMContext, uow: FromDishka[IReadOnlyUnitOfWork]) -> None:
     if TYPE_CHECKING:
         assert msg.text
         assert msg.bot
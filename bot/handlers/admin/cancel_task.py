@@ -7,9 +7,11 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from dishka.integrations.aiogram import FromDishka
 
 from bot.states.cancel_task import CancelTask
+from core.config import Settings
 from core.models.study import StudyStatusEnum
 from core.models.user import UserRoleEnum
 from core.unit_of_work import IUnitOfWork
+from core.utils.study_queue import StudyReadyQueue
 
 
 async def cancel_task(msg: types.Message, state: FSMContext, uow: FromDishka[IUnitOfWork]) -> None:
@@ -58,17 +60,24 @@ async def study_iuid_writen(msg: types.Message, state: FSMContext, uow: FromDish
     await msg.answer(text="🔹 Вы точно желаете обнулить исследование?", reply_markup=reply_markup)
 
 
-async def confirmed(cq: types.CallbackQuery, state: FSMContext, uow: FromDishka[IUnitOfWork]) -> None:
+async def confirmed(
+    cq: types.CallbackQuery,
+    state: FSMContext,
+    uow: FromDishka[IUnitOfWork],
+    ready_queue: FromDishka[StudyReadyQueue],
+    settings: FromDishka[Settings],
+) -> None:
     study_id = await state.get_value("study_id")
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
         assert study_id
 
     async with uow:
-        await uow.studies.update(
+        # Исследование могли закрыть, пока администратор подтверждал сброс
+        result = await uow.studies.transition(
             study_id,
+            StudyStatusEnum.NEW,
             {
-                "status": StudyStatusEnum.NEW,
                 "iteration_count": 0,
                 "annotator_id": None,
                 "expert_id": None,
@@ -76,7 +85,14 @@ async def confirmed(cq: types.CallbackQuery, state: FSMContext, uow: FromDishka[
                 "nc_upload_link": None,
             },
         )
+        study = result.study
         await uow.commit()
+    if not study:
+        await state.clear()
+        await cq.message.edit_text(text="❗️ Исследование уже закрыто или сброшено")
+        return
+    if settings.ASSIGNMENT_ENGINE == "redis":
+        await ready_queue.push_front(study.project_id, study.id)
     await state.clear()
     await cq.message.edit_text(text="✅ Исследование успешно сброшено")
 
@@ -0,0 +1,77 @@
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from aiogram import Dispatcher, Router, types
+from aiogram.filters import Command, CommandObject
+from dishka.integrations.aiogram import FromDishka
+
+from core.config import Settings
+from core.models.user import UserRoleEnum
+from core.repositories.study_repo import StudyExportFilter
+from core.unit_of_work import IReadOnlyUnitOfWork
+from core.utils.export import ExportFormat, encode_export
+
+# Лимит Bot API на отправку файла
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+USAGE = "Использование: /export [id проекта] [ndjson|csv]"
+
+
+def _parse_args(args: str | None) -> tuple[int | None, ExportFormat] | None:
+    project_id = None
+    export_format = ExportFormat.NDJSON
+    for arg in (args or "").split():
+        if arg.isdigit():
+            project_id = int(arg)
+        elif arg.lower() in ExportFormat:
+            export_format = ExportFormat(arg.lower())
+        else:
+            return None
+    return project_id, export_format
+
+
+async def export(
+    msg: types.Message,
+    command: CommandObject,
+    uow: FromDishka[IReadOnlyUnitOfWork],
+    settings: FromDishka[Settings],
+) -> None:
+    if TYPE_CHECKING:
+        assert msg.from_user
+
+    parsed = _parse_args(command.args)
+    if parsed is None:
+        await msg.answer(text=USAGE)
+        return
+    project_id, export_format = parsed
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / f"studies.{export_format.value}"
+        async with uow:
+            user = await uow.users.get_by_id(msg.from_user.id)
+            if not user or user.role != UserRoleEnum.ADMIN:
+                return
+            rows = uow.studies.iter_export(
+                StudyExportFilter(project_id=project_id),
+                fetch_size=settings.EXPORT_FETCH_SIZE,
+            )
+            # Файл пишется кусками по мере чтения курсора, целиком в памяти выгрузка не держится
+            with path.open("wb") as file:
+                async for chunk in encode_export(rows, export_format):
+                    await asyncio.to_thread(file.write, chunk)
+
+        size = path.stat().st_size
+        if size > MAX_DOCUMENT_SIZE:
+            await msg.answer(
+                text=f"Выгрузка занимает {size // (1024 * 1024)} МБ, это больше лимита Telegram. "
+                "Используйте фильтр по проекту или GET /api/v1/export/studies",
+            )
+            return
+        await msg.answer_document(types.FSInputFile(path))
+
+
+def register_handlers(dp: Dispatcher) -> None:
+    router = Router(name=__name__)
+    router.message.register(export, Command("export"))
+    dp.include_router(router)
@@ -0,0 +1,104 @@
+from typing import TYPE_CHECKING
+
+from aiogram import Dispatcher, Router, types
+from aiogram.filters import Command, CommandObject
+from aiogram.utils.formatting import Bold, Text, as_line, as_list, as_marked_list
+from dishka.integrations.aiogram import FromDishka
+
+from core.models.study import StudyStatusEnum
+from core.models.user import UserRoleEnum
+from core.repositories.study_stats_repo import ThroughputStats
+from core.unit_of_work import IReadOnlyUnitOfWork
+
+DEFAULT_DAYS = 7
+MAX_DAYS = 365
+TOP_ANNOTATORS = 10
+_NO_ANNOTATOR_ID = 0
+
+
+def _format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "—"
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f"{days}д {hours}ч"
+    if hours:
+        return f"{hours}ч {minutes}м"
+    return f"{minutes}м" if minutes else "<1м"
+
+
+def _format_rate(rate: float | None) -> str:
+    return "—" if rate is None else f"{rate:.0%}"
+
+
+def _project_block(stats: ThroughputStats) -> Text:
+    state_times = [
+        f"{status.name} {_format_duration(stats.avg_seconds(status))}"
+        for status in StudyStatusEnum
+        if stats.avg_seconds(status) is not None
+    ]
+    return as_list(
+        Bold(stats.name),
+        as_marked_list(
+            Text(f"Завершено: {stats.done} ({stats.done_per_day:.1f} в день)"),
+            Text(f"Доля доработок: {_format_rate(stats.rework_rate)}"),
+            Text(f"Проверка: {_format_duration(stats.review_turnaround)}"),
+            Text(f"Среднее время в статусах: {', '.join(state_times) or '—'}"),
+        ),
+    )
+
+
+def _annotator_line(stats: ThroughputStats) -> Text:
+    return Text(
+        f"{stats.name}: {stats.done} ({stats.done_per_day:.1f} в день), "
+        f"доработки {_format_rate(stats.rework_rate)}, "
+        f"в работе {_format_duration(stats.avg_seconds(StudyStatusEnum.ASSIGNED))}",
+    )
+
+
+async def stats(msg: types.Message, command: CommandObject, uow: FromDishka[IReadOnlyUnitOfWork]) -> None:
+    if TYPE_CHECKING:
+        assert msg.from_user
+
+    days = DEFAULT_DAYS
+    if command.args:
+        if not command.args.strip().isdigit():
+            await msg.answer(text="Использование: /stats [количество дней]")
+            return
+        days = min(max(int(command.args), 1), MAX_DAYS)
+
+    async with uow:
+        user = await uow.users.get_by_id(msg.from_user.id)
+        if not user or user.role != UserRoleEnum.ADMIN:
+            return
+        by_project = await uow.stats.get_by_project(days)
+        by_annotator = await uow.stats.get_by_annotator(days)
+        watermark = await uow.stats.get_refreshed_at()
+
+    refreshed_at = watermark.refreshed_at if watermark else None
+    header = as_list(
+        Bold(f"📊 Статистика за {days} дн."),
+        Text(f"Обновлено: {refreshed_at:%Y-%m-%d %H:%M} UTC" if refreshed_at else "Обновлено: ещё не считалась"),
+    )
+    if not by_project:
+        await msg.answer(**as_list(header, Text("Нет данных за период"), sep="\n\n").as_kwargs())
+        return
+
+    annotators = [item for item in by_annotator if item.key != _NO_ANNOTATOR_ID][:TOP_ANNOTATORS]
+    text = as_list(
+        header,
+        *(_project_block(item) for item in by_project),
+        as_list(Bold("Разметчики"), as_marked_list(*(_annotator_line(item) for item in annotators)))
+        if annotators
+        else as_line(),
+        sep="\n\n",
+    )
+    await msg.answer(**text.as_kwargs())
+
+
+def register_handlers(dp: Dispatcher) -> None:
+    router = Router(name=__name__)
+    router.message.register(stats, Command("stats"))
+    dp.include_router(router)
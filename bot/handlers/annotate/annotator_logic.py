@@ -1,9 +1,10 @@
-import asyncio
+from contextlib import AbstractAsyncContextManager, nullcontext
 from typing import TYPE_CHECKING, cast
 
 from aiogram import Dispatcher, F, Router, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
+from aiogram.methods import SendMessage
 from aiogram.utils.callback_answer import CallbackAnswer
 from aiogram.utils.formatting import Bold, Code, Text, TextLink, as_line, as_list
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -25,9 +26,13 @@ from bot.handlers.annotate.utils import (
     get_assigned_study_kb,
     get_assigned_study_text,
 )
-from core.models.study import StudyStatusEnum
+from bot.outbox import enqueue_telegram
+from core.config import Settings
+from core.models.study import Study, StudyStatusEnum
 from core.unit_of_work import IUnitOfWork
+from core.utils.locks import LockManager, LockTimeoutError
 from core.utils.nextcloud import NextcloudUtils
+from core.utils.study_queue import StudyReadyQueue
 
 
 async def command_task(msg: types.Message, uow: FromDishka[IUnitOfWork]) -> None:
@@ -102,6 +107,8 @@ async def assign_annotate_to_user(
     callback_data: ChooseProjectCallback,
     uow: FromDishka[IUnitOfWork],
     nc_util: FromDishka[NextcloudUtils],
+    ready_queue: FromDishka[StudyReadyQueue],
+    settings: FromDishka[Settings],
 ) -> None:
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
@@ -112,42 +119,50 @@ async def assign_annotate_to_user(
         return
 
     async with uow:
-        study = await uow.studies.assign_to_user(
-            project_id=project_id,
-            user_id=cq.from_user.id,
-        )
-        if not study:
-            text = as_list(
-                Bold("Назначение задачи"),
-                Text("Нет исследований для разметки, попробуйте позже"),
-            )
-            reply_markup = None
-            with logger.contextualize(user_id=cq.from_user.id):
-                logger.info("No studies available for annotation")
+        assignment: AbstractAsyncContextManager[Study | None]
+        if settings.ASSIGNMENT_ENGINE == "redis":
+            # Если commit не состоится, id вернётся в список Redis
+            assignment = ready_queue.assign(uow, project_id=project_id, user_id=cq.from_user.id)
         else:
-            share_link = await nc_util.create_public_link(
-                path=study.study_path,
-                label=f"Public View for tg-id={cq.from_user.id}",
-                permissions=1,
+            assignment = nullcontext(
+                await uow.studies.assign_to_user(
+                    project_id=project_id,
+                    user_id=cq.from_user.id,
+                ),
             )
+        async with assignment as study:
+            if not study:
+                text = as_list(
+                    Bold("Назначение задачи"),
+                    Text("Нет исследований для разметки, попробуйте позже"),
+                )
+                reply_markup = None
+                with logger.contextualize(user_id=cq.from_user.id):
+                    logger.info("No studies available for annotation")
+            else:
+                share_link = await nc_util.create_public_link(
+                    path=study.study_path,
+                    label=f"Public View for tg-id={cq.from_user.id}",
+                    permissions=1,
+                )
 
-            path_for_upload = study.study_path.replace("1-original-data", "2-check")
-            upload_folder_name = f"version_{study.iteration_count}"
-            await nc_util.create_folder(path=path_for_upload, new_folder=upload_folder_name)
-            upload_link = await nc_util.create_public_link(
-                path=f"{path_for_upload}/{upload_folder_name}",
-                label=f"Upload for tg-id={cq.from_user.id}",
-                permissions=7,  # Upload
-            )
+                path_for_upload = study.study_path.replace("1-original-data", "2-check")
+                upload_folder_name = f"version_{study.iteration_count}"
+                await nc_util.create_folder(path=path_for_upload, new_folder=upload_folder_name)
+                upload_link = await nc_util.create_public_link(
+                    path=f"{path_for_upload}/{upload_folder_name}",
+                    label=f"Upload for tg-id={cq.from_user.id}",
+                    permissions=7,  # Upload
+                )
 
-            study.nc_share_link = share_link
-            study.nc_upload_link = upload_link
-            await uow.commit()
+                study.nc_share_link = share_link
+                study.nc_upload_link = upload_link
+                await uow.commit()
 
-            text = get_assigned_study_text(study)
-            reply_markup = get_assigned_study_kb(study)
-            with logger.contextualize(user_id=cq.from_user.id, study_iuid=study.study_iuid):
-                logger.info("A study was assigned to the user for annotation")
+                text = get_assigned_study_text(study)
+                reply_markup = get_assigned_study_kb(study)
+                with logger.contextualize(user_id=cq.from_user.id, study_iuid=study.study_iuid):
+                    logger.info("A study was assigned to the user for annotation")
 
     await cq.message.edit_text(**text.as_kwargs(), reply_markup=reply_markup)
 
@@ -210,9 +225,6 @@ async def choose_categories(
     await cq.message.edit_text(text=text, reply_markup=reply_markup)
 
 
-review_request_lock = asyncio.Lock()
-
-
 async def annotate_review_request(
     cq: types.CallbackQuery,
     callback_data: StudyAnnoReviewRequest,
@@ -222,25 +234,17 @@ async def annotate_review_request(
     nc_util: FromDishka[NextcloudUtils],
 ) -> None:
     if TYPE_CHECKING:
-        assert cq.bot
         assert isinstance(cq.message, types.Message)
 
     study_id = callback_data.study_id
     category_ids = await state.get_value("choosed_categories")
-    async with review_request_lock, uow:
-        study = await uow.studies.get_with_categories(study_id)
-        if not study:
+    async with uow:
+        context = await uow.studies.get_context(study_id)
+        if not context:
             logger.error("Study with id {} not found", study_id)
             callback_answer.text, callback_answer.show_alert = "Ошибка - исследование не найдено", True
             return
-        if study.status not in (StudyStatusEnum.ASSIGNED, StudyStatusEnum.REWORK):
-            with logger.contextualize(
-                user_id=cq.from_user.id,
-                study_iuid=study.study_iuid,
-                iteration_count=study.iteration_count,
-            ):
-                logger.debug("Double review request detected, skip")
-            return
+        study, project = context.study, context.project
 
         study_iteration = study.iteration_count
         upload_path = study.study_path.replace("1-original-data", "2-check")
@@ -250,46 +254,48 @@ async def annotate_review_request(
             callback_answer.text, callback_answer.show_alert = "Вы ничего не выгрузили", True
             return
 
+        # Повторное нажатие или параллельный запрос не пройдут условный UPDATE
+        if not (await uow.studies.transition(study_id, StudyStatusEnum.WAITING_REVIEW)).applied:
+            with logger.contextualize(
+                user_id=cq.from_user.id,
+                study_iuid=study.study_iuid,
+                iteration_count=study.iteration_count,
+            ):
+                logger.debug("Double review request detected, skip")
+            return
+
         study.categories.clear()
         if category_ids:
             categories = await uow.categories.get_by_ids(category_ids)
             study.categories.extend(categories)
 
-        study.status = StudyStatusEnum.WAITING_REVIEW
-
-        project = await uow.projects.get_by_batch_id(batch_id=study.batch_id)
-        if not project:
-            logger.error("Project for batch_id={} not found", study.batch_id)
-            callback_answer.text, callback_answer.show_alert = "Ошибка - проект не найден", True
-            return
-
-        annotator = await uow.users.get_by_id(cq.from_user.id)
+        annotator = context.user(cq.from_user.id) or await uow.users.get_by_id(cq.from_user.id)
         if not annotator:
             callback_answer.text, callback_answer.show_alert = "Вы не зарегистрированы в боте!", True
             return
 
-        await uow.commit()
-
-    test = as_list(
-        Bold("✏️ Требуется подтверждение разметки"),
-        as_line(Bold("study_uiud: "), Code(study.study_iuid)),
-        as_line(
-            Bold("Разметчик: "),
+        test = as_list(
+            Bold("✏️ Требуется подтверждение разметки"),
+            as_line(Bold("study_uiud: "), Code(study.study_iuid)),
             as_line(
-                TextLink(annotator.name, url=f"tg://user?id={annotator.tg_id}"),
-                Text(f" (@{annotator.tg_username})") if annotator.tg_username else Text(),
+                Bold("Разметчик: "),
+                as_line(
+                    TextLink(annotator.name, url=f"tg://user?id={annotator.tg_id}"),
+                    Text(f" (@{annotator.tg_username})") if annotator.tg_username else Text(),
+                ),
             ),
-        ),
-        sep="\n",
-    )
-    kb = InlineKeyboardBuilder()
-    kb.button(text="Взять в работу", callback_data=StudyAnnoReview(study_id=study.id))
-    reply_markup = kb.adjust(1).as_markup()
-    await cq.bot.send_message(
-        chat_id=project.tg_group_id,
-        **test.as_kwargs(),
-        reply_markup=reply_markup,
-    )
+            sep="\n",
+        )
+        kb = InlineKeyboardBuilder()
+        kb.button(text="Взять в работу", callback_data=StudyAnnoReview(study_id=study.id))
+        reply_markup = kb.adjust(1).as_markup()
+        # Пост в группу проекта уйдёт после commit вместе со сменой статуса, ответ пользователю его не ждёт
+        await enqueue_telegram(
+            uow,
+            SendMessage(chat_id=project.tg_group_id, **test.as_kwargs(), reply_markup=reply_markup),
+            dedup_key=f"{cq.id}:project_group",
+        )
+        await uow.commit()
 
     with logger.contextualize(
         user_id=cq.from_user.id,
@@ -326,52 +332,47 @@ async def report_study_reason_choosen(
     uow: FromDishka[IUnitOfWork],
 ) -> None:
     if TYPE_CHECKING:
-        assert cq.bot
         assert isinstance(cq.message, types.Message)
 
     async with uow:
-        study = await uow.studies.get_by_id(callback_data.study_id)
-        if not study:
+        context = await uow.studies.get_context(callback_data.study_id)
+        if not context:
             logger.error("Study with id={} is not found", callback_data.study_id)
             callback_answer.text = "Ошибка - исследование не найдено"
             return
-        await uow.studies.update(
-            study.id,
-            {
-                "status": StudyStatusEnum.PENDING_CONFIRMATION,
-            },
-        )
-        project = await uow.projects.get_by_batch_id(batch_id=study.batch_id)
-        if not project:
-            logger.error("Project for batch with id={} is not found", study.batch_id)
-            callback_answer.text = "Ошибка - проект не найден"
+        study, project = context.study, context.project
+        if not (await uow.studies.transition(study.id, StudyStatusEnum.PENDING_CONFIRMATION)).applied:
+            callback_answer.text, callback_answer.show_alert = "Исследование уже отправлено на проверку", True
             return
-        annotator = await uow.users.get_by_id(cq.from_user.id)
+        annotator = context.user(cq.from_user.id) or await uow.users.get_by_id(cq.from_user.id)
         if not annotator:
             callback_answer.text, callback_answer.show_alert = "Вы не зарегистрированы в боте!", True
             return
-        await uow.commit()
 
-    test = as_list(
-        Bold("Требуется подтверждение"),
-        as_line(Bold("study_uiud: "), Code(study.study_iuid)),
-        as_line(Bold("Причина: "), Code(callback_data.reason.name)),
-        as_line(
-            Bold("Разметчик: "),
+        test = as_list(
+            Bold("Требуется подтверждение"),
+            as_line(Bold("study_uiud: "), Code(study.study_iuid)),
+            as_line(Bold("Причина: "), Code(callback_data.reason.name)),
             as_line(
-                TextLink(annotator.name, url=f"tg://user?id={annotator.tg_id}"),
-                Text(f" (@{annotator.tg_username})") if annotator.tg_username else Text(),
+                Bold("Разметчик: "),
+                as_line(
+                    TextLink(annotator.name, url=f"tg://user?id={annotator.tg_id}"),
+                    Text(f" (@{annotator.tg_username})") if annotator.tg_username else Text(),
+                ),
             ),
-        ),
-    )
-    kb = InlineKeyboardBuilder()
-    kb.button(text="Взять в работу", callback_data=StudyReportReview(study_id=study.id, reason=callback_data.reason))
-    reply_markup = kb.adjust(1).as_markup()
-    await cq.bot.send_message(
-        chat_id=project.tg_group_id,
-        **test.as_kwargs(),
-        reply_markup=reply_markup,
-    )
+        )
+        kb = InlineKeyboardBuilder()
+        kb.button(
+            text="Взять в работу",
+            callback_data=StudyReportReview(study_id=study.id, reason=callback_data.reason),
+        )
+        reply_markup = kb.adjust(1).as_markup()
+        await enqueue_telegram(
+            uow,
+            SendMessage(chat_id=project.tg_group_id, **test.as_kwargs(), reply_markup=reply_markup),
+            dedup_key=f"{cq.id}:project_group",
+        )
+        await uow.commit()
     with logger.contextualize(
         user_id=cq.from_user.id,
         study_iuid=study.study_iuid,
@@ -390,6 +391,7 @@ async def reannotate(
     callback_answer: CallbackAnswer,
     uow: FromDishka[IUnitOfWork],
     nc_util: FromDishka[NextcloudUtils],
+    locks: FromDishka[LockManager],
 ) -> None:
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
@@ -399,28 +401,44 @@ async def reannotate(
         logger.debug("Received callback command without from_user payload")
         return
 
-    async with uow:
-        study = await uow.studies.get_by_id(study_id)
-        if not study:
-            logger.error("Study with id {} not found", study_id)
-            callback_answer.text, callback_answer.show_alert = "Ошибка - исследование не найдено", True
-            return
-        path_for_upload = study.study_path.replace("1-original-data", "2-check")
-        new_iteration_count = study.iteration_count + 1
-        upload_folder_name = f"version_{new_iteration_count}"
-
-        await nc_util.create_folder(path=path_for_upload, new_folder=upload_folder_name)
-        upload_link = await nc_util.create_public_link(
-            path=f"{path_for_upload}/{upload_folder_name}",
-            label=f"Upload for tg-id={cq.from_user.id}",
-            permissions=7,
-        )
+    try:
+        # Повторное нажатие подождёт и не создаст вторую версию в Nextcloud
+        async with locks.lock("study", study_id), uow:
+            study = await uow.studies.get_by_id(study_id)
+            if not study:
+                logger.error("Study with id {} not found", study_id)
+                callback_answer.text, callback_answer.show_alert = "Ошибка - исследование не найдено", True
+                return
+            if study.status != StudyStatusEnum.WAITING_REWORK:
+                callback_answer.text, callback_answer.show_alert = "Исследование уже взято в работу", True
+                return
+            path_for_upload = study.study_path.replace("1-original-data", "2-check")
+            new_iteration_count = study.iteration_count + 1
+            upload_folder_name = f"version_{new_iteration_count}"
 
-        study.nc_last_upload_link = study.nc_upload_link
-        study.nc_upload_link = upload_link
-        study.iteration_count = new_iteration_count
-        study.status = StudyStatusEnum.REWORK
-        await uow.commit()
+            await nc_util.create_folder(path=path_for_upload, new_folder=upload_folder_name)
+            upload_link = await nc_util.create_public_link(
+                path=f"{path_for_upload}/{upload_folder_name}",
+                label=f"Upload for tg-id={cq.from_user.id}",
+                permissions=7,
+            )
+
+            result = await uow.studies.transition(
+                study_id,
+                StudyStatusEnum.REWORK,
+                {
+                    "nc_last_upload_link": study.nc_upload_link,
+                    "nc_upload_link": upload_link,
+                    "iteration_count": new_iteration_count,
+                },
+            )
+            if not result.applied:
+                callback_answer.text, callback_answer.show_alert = "Исследование уже взято в работу", True
+                return
+            await uow.commit()
+    except LockTimeoutError:
+        callback_answer.text, callback_answer.show_alert = "Предыдущее действие ещё выполняется, попробуйте позже", True
+        return
 
     text = get_assigned_study_text(study)
     reply_markup = get_assigned_study_kb(study)
@@ -434,9 +452,6 @@ async def reannotate(
         logger.info("User took studies for re-annotation")
 
 
-reannotate_review_request_lock = asyncio.Lock()
-
-
 async def reannotate_review_request(
     cq: types.CallbackQuery,
     callback_data: StudyAnnoReviewReRequest,
@@ -445,17 +460,30 @@ async def reannotate_review_request(
     nc_util: FromDishka[NextcloudUtils],
 ) -> None:
     if TYPE_CHECKING:
-        assert cq.bot
         assert isinstance(cq.message, types.Message)
 
     study_id = callback_data.study_id
-    async with reannotate_review_request_lock, uow:
+    async with uow:
         study = await uow.studies.get_by_id(study_id)
         if not study:
             logger.error("Study with id={} is not found", callback_data.study_id)
             callback_answer.text = "Ошибка - исследование не найдено"
             return
-        if study.status != StudyStatusEnum.REWORK:
+        if study.expert_id is None:
+            logger.error("Expert for study with id={} is not found", callback_data.study_id)
+            callback_answer.text = "Ошибка - исследованию не назначен эксперт"
+            return
+
+        # Проверка до смены статуса: иначе пустая версия ушла бы на проверку без уведомления эксперта
+        study_iteration = study.iteration_count
+        upload_path = study.study_path.replace("1-original-data", "2-check")
+        annotate_path = f"{upload_path}/version_{study_iteration}"
+        empty = await nc_util.is_directory_empty(path=annotate_path)
+        if empty:
+            callback_answer.text, callback_answer.show_alert = "Вы ничего не выгрузили", True
+            return
+
+        if not (await uow.studies.transition(study_id, StudyStatusEnum.WAITING_REVIEW)).applied:
             with logger.contextualize(
                 user_id=cq.from_user.id,
                 study_iuid=study.study_iuid,
@@ -463,34 +491,25 @@ async def reannotate_review_request(
             ):
                 logger.debug("Double review request detected, skip")
             return
-        study.status = StudyStatusEnum.WAITING_REVIEW
-        if study.expert_id is None:
-            logger.error("Expert for study with id={} is not found", callback_data.study_id)
-            callback_answer.text = "Ошибка - исследованию не назначен эксперт"
-            return
-        await uow.commit()
-
-    study_iteration = study.iteration_count
-    upload_path = study.study_path.replace("1-original-data", "2-check")
-    annotate_path = f"{upload_path}/version_{study_iteration}"
-    empty = await nc_util.is_directory_empty(path=annotate_path)
-    if empty:
-        callback_answer.text, callback_answer.show_alert = "Вы ничего не выгрузили", True
-        return
 
-    text: Text = as_list(
-        Bold("🔹 Проверка разметки") if study.iteration_count == 1 else Bold("🔺 Перепроверка разметки"),
-        as_line(Bold("StudyIUID: "), Code(study.study_iuid)),
-    )
-    kb = InlineKeyboardBuilder()
-    kb.button(text="Взять в работу", callback_data=ExpertReworkReview(study_id=study_id))
-    reply_markup = kb.as_markup()
-    await cq.bot.send_message(
-        chat_id=study.expert_id,
-        **text.as_kwargs(),
-        reply_markup=reply_markup,
-        reply_to_message_id=study.reject_comment_msg_id,
-    )
+        text: Text = as_list(
+            Bold("🔹 Проверка разметки") if study.iteration_count == 1 else Bold("🔺 Перепроверка разметки"),
+            as_line(Bold("StudyIUID: "), Code(study.study_iuid)),
+        )
+        kb = InlineKeyboardBuilder()
+        kb.button(text="Взять в работу", callback_data=ExpertReworkReview(study_id=study_id))
+        reply_markup = kb.as_markup()
+        await enqueue_telegram(
+            uow,
+            SendMessage(
+                chat_id=study.expert_id,
+                **text.as_kwargs(),
+                reply_markup=reply_markup,
+                reply_to_message_id=study.reject_comment_msg_id,
+            ),
+            dedup_key=f"{cq.id}:expert",
+        )
+        await uow.commit()
     with logger.contextualize(
         user_id=cq.from_user.id,
         study_iuid=study.study_iuid,
@@ -77,7 +77,15 @@ class ConfirmCategories(CallbackData, prefix="confirm-categories"):
     study_id: int
 
 
-class ApproveWithSelfAnno(CallbackData, prefix="approve-with-self-anno"):
+class ApproveWithSelfAnno(CallbackData, prefix="approve-with-self-anno-v2"):
+    study_id: int
+    # Итерация, которую видел эксперт; по ней отсекается повторное нажатие.
+    # None - итерация не известна, берётся текущая
+    iteration: int | None = None
+
+
+# Кнопки прежнего формата, без итерации, в уже отправленных сообщениях
+class LegacyApproveWithSelfAnno(CallbackData, prefix="approve-with-self-anno"):
     study_id: int
 
 
@@ -106,7 +114,13 @@ class PreExpertAnno(CallbackData, prefix="pre-expert-anno"):
     study_id: int
 
 
-class ExpertAnno(CallbackData, prefix="expert-anno"):
+class ExpertAnno(CallbackData, prefix="expert-anno-v2"):
+    study_id: int
+    iteration: int | None = None
+
+
+# Кнопки прежнего формата, без итерации, в уже отправленных сообщениях
+class LegacyExpertAnno(CallbackData, prefix="expert-anno"):
     study_id: int
 
 
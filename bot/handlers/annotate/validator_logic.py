@@ -1,9 +1,9 @@
-import asyncio
 from typing import TYPE_CHECKING, cast
 
 from aiogram import Dispatcher, F, Router, types
 from aiogram.filters import StateFilter, or_f
 from aiogram.fsm.context import FSMContext
+from aiogram.methods import SendMediaGroup, SendMessage
 from aiogram.utils.callback_answer import CallbackAnswer
 from aiogram.utils.formatting import Bold, Code, Text, TextLink, Url, as_line, as_list, as_marked_list
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -25,6 +25,8 @@ from bot.handlers.annotate.utils import (
     ExpertAnnoView,
     ExpertCloseAnno,
     ExpertReworkReview,
+    LegacyApproveWithSelfAnno,
+    LegacyExpertAnno,
     PreExpertAnno,
     ReAnnoStudy,
     RejectAnno,
@@ -34,16 +36,16 @@ from bot.handlers.annotate.utils import (
     get_assigned_study_text,
 )
 from bot.middleware.album_middleware import MediaGroupMiddleware
+from bot.outbox import enqueue_nextcloud_copy, enqueue_telegram
 from bot.states.check_categories import CheckCategoriesView
 from bot.states.expert_pre_anno import ExpertPreAnno
 from bot.states.reject import RejectState
 from core.config import Settings
 from core.models.study import Study, StudyStatusEnum
-from core.unit_of_work import IUnitOfWork
+from core.unit_of_work import IReadOnlyUnitOfWork, IUnitOfWork
+from core.utils.locks import LockManager, LockTimeoutError
 from core.utils.nextcloud import NextcloudUtils
 
-async_lock = asyncio.Lock()
-
 
 async def annotate_review(
     cq: types.CallbackQuery,
@@ -51,57 +53,68 @@ async def annotate_review(
     callback_answer: CallbackAnswer,
     uow: FromDishka[IUnitOfWork],
     settings: FromDishka[Settings],
+    locks: FromDishka[LockManager],
 ) -> None:
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
-        assert cq.bot
 
     study_id = callback_data.study_id
     user_tg_id = cq.from_user.id
-    async with async_lock, uow:
-        study = await uow.studies.get_by_id(study_id)
-        if not study:
-            callback_answer.text, callback_answer.show_alert = "Ошибка - нет такого исследования", True
-            return
-
-        if study.expert_id:
-            callback_answer.text, callback_answer.show_alert = "Задача уже назначена другому эксперту", True
-            return
-
-        if await uow.studies.get_in_review_for_expert(cq.from_user.id):
-            callback_answer.text, callback_answer.show_alert = "У ваc есть незавершенные проверки", True
-            return
+    try:
+        # Проверка незавершённых проверок и захват - одна критическая секция на эксперта
+        async with locks.lock("expert", user_tg_id), uow:
+            if await uow.studies.get_in_review_for_expert(cq.from_user.id):
+                callback_answer.text, callback_answer.show_alert = "У ваc есть незавершенные проверки", True
+                return
 
-        user = await uow.users.get_by_id(user_tg_id)
-        if not user:
-            callback_answer.text, callback_answer.show_alert = "Вы не зарегистрированы в боте!", True
-            return
+            user = await uow.users.get_by_id(user_tg_id)
+            if not user:
+                callback_answer.text, callback_answer.show_alert = "Вы не зарегистрированы в боте!", True
+                return
 
-        study.expert_id = user_tg_id
-        study.status = StudyStatusEnum.IN_REVIEW
-        await uow.commit()
-        expert_data = as_line(
-            Text("\n\nВзял в работу - "),
-            as_line(
-                TextLink(user.name, url=f"tg://user?id={user.tg_id}"),
-                Text(f" (@{user.tg_username})") if user.tg_username else Text(),
-            ),
-        )
+            # Из двух экспертов, нажавших одновременно, исследование достанется одному
+            result = await uow.studies.transition(
+                study_id,
+                StudyStatusEnum.IN_REVIEW,
+                {"expert_id": user_tg_id},
+                conditions=(Study.expert_id.is_(None),),
+            )
+            if result.not_found:
+                callback_answer.text, callback_answer.show_alert = "Ошибка - нет такого исследования", True
+                return
+            if not result.study:
+                callback_answer.text, callback_answer.show_alert = "Задача уже назначена другому эксперту", True
+                return
+            study = result.study
+            review_text = get_anno_review_text(study)
+            kb = get_anno_review_kb(study, iteration_limit=settings.ITERATION_LIMIT)
+            await enqueue_telegram(
+                uow,
+                SendMessage(
+                    chat_id=user_tg_id,
+                    **review_text.as_kwargs(),
+                    reply_markup=kb,
+                    reply_parameters=types.ReplyParameters(
+                        message_id=cq.message.message_id,
+                        chat_id=cq.message.chat.id,
+                    ),
+                ),
+                dedup_key=f"{cq.id}:expert",
+            )
+            await uow.commit()
+            expert_data = as_line(
+                Text("\n\nВзял в работу - "),
+                as_line(
+                    TextLink(user.name, url=f"tg://user?id={user.tg_id}"),
+                    Text(f" (@{user.tg_username})") if user.tg_username else Text(),
+                ),
+            )
+    except LockTimeoutError:
+        callback_answer.text, callback_answer.show_alert = "Предыдущее действие ещё выполняется, попробуйте позже", True
+        return
     text = cq.message.html_text + expert_data.as_html()
     await cq.message.edit_text(text=text)
     callback_answer.text = "Вам назначена задача ✅"
-
-    review_text = get_anno_review_text(study)
-    kb = get_anno_review_kb(study, iteration_limit=settings.ITERATION_LIMIT)
-    await cq.bot.send_message(
-        chat_id=user_tg_id,
-        **review_text.as_kwargs(),
-        reply_markup=kb,
-        reply_parameters=types.ReplyParameters(
-            message_id=cq.message.message_id,
-            chat_id=cq.message.chat.id,
-        ),
-    )
     with logger.contextualize(
         user_id=cq.from_user.id,
         study_iuid=study.study_iuid,
@@ -138,7 +151,7 @@ async def annotate_review_view_only(
     callback_data: StudyAnnoReview,
     callback_answer: CallbackAnswer,
     state: FSMContext,
-    uow: FromDishka[IUnitOfWork],
+    uow: FromDishka[IReadOnlyUnitOfWork],
     settings: FromDishka[Settings],
 ) -> None:
     if TYPE_CHECKING:
@@ -169,15 +182,14 @@ async def rework_review_start(
         assert cq.message.reply_to_message
 
     async with uow:
-        study = await uow.studies.update(
-            callback_data.study_id,
-            {
-                "status": StudyStatusEnum.IN_REVIEW,
-            },
-        )
-        if not study:
+        result = await uow.studies.transition(callback_data.study_id, StudyStatusEnum.IN_REVIEW)
+        if result.not_found:
             callback_answer.text, callback_answer.show_alert = "Ошибка - нет такого исследования", True
             return
+        if not result.study:
+            callback_answer.text, callback_answer.show_alert = "Проверка уже начата", True
+            return
+        study = result.study
         await uow.commit()
 
     text = get_anno_review_text(study)
@@ -191,12 +203,26 @@ async def rework_review_start(
     await cq.message.delete()
 
 
-async def approve_anno(cq: types.CallbackQuery, callback_data: ApproveAnno, state: FSMContext) -> None:
+async def approve_anno(
+    cq: types.CallbackQuery,
+    callback_data: ApproveAnno,
+    callback_answer: CallbackAnswer,
+    state: FSMContext,
+    uow: FromDishka[IReadOnlyUnitOfWork],
+) -> None:
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
+    async with uow:
+        study = await uow.studies.get_by_id(callback_data.study_id)
+    if not study:
+        callback_answer.text, callback_answer.show_alert = "Ошибка - нет такого исследования", True
+        return
     kb = InlineKeyboardBuilder()
     kb.button(text="Да", callback_data=CheckCategories(study_id=callback_data.study_id))
-    kb.button(text="Да, но с доразметкой", callback_data=ApproveWithSelfAnno(study_id=callback_data.study_id))
+    kb.button(
+        text="Да, но с доразметкой",
+        callback_data=ApproveWithSelfAnno(study_id=callback_data.study_id, iteration=study.iteration_count),
+    )
     kb.button(text="Отмена", callback_data=AnnoReview(study_id=callback_data.study_id))
     reply_markup = cast("types.InlineKeyboardMarkup", kb.adjust(1).as_markup())
     await cq.message.edit_text(text="Вы точно желаете подтвердить корректность разметки?", reply_markup=reply_markup)
@@ -241,21 +267,23 @@ async def check_categories(
 
     if not batch_categories:
         # Для батча нет в принципе категорий - скипаем их выбор
-        cd: ConfirmApproveAnno | ExpertCloseAnno
         if check_categories_from_state == CheckCategoriesView.from_default_approve:
-            func = approve_anno_confirmed
-            cd = ConfirmApproveAnno(study_id=callback_data.study_id)
+            await approve_anno_confirmed(
+                cq=cq,
+                callback_data=ConfirmApproveAnno(study_id=callback_data.study_id),
+                callback_answer=callback_answer,
+                state=state,
+                uow=uow,
+            )
         else:
-            func = expert_annotate_finish  # type: ignore[assignment]
-            cd = ExpertCloseAnno(study_id=callback_data.study_id)
-        await func(
-            cq=cq,
-            callback_data=cd,  # type: ignore[arg-type]
-            callback_answer=callback_answer,
-            state=state,
-            uow=uow,
-            nc_util=nc_util,
-        )
+            await expert_annotate_finish(
+                cq=cq,
+                callback_data=ExpertCloseAnno(study_id=callback_data.study_id),
+                callback_answer=callback_answer,
+                state=state,
+                uow=uow,
+                nc_util=nc_util,
+            )
         return
     if not study_categories_names:
         # Для батча есть предопределенные категории, но разметчик ни одну не выбрал
@@ -337,18 +365,20 @@ async def approve_anno_confirmed(
     callback_answer: CallbackAnswer,
     state: FSMContext,
     uow: FromDishka[IUnitOfWork],
-    nc_util: FromDishka[NextcloudUtils],
 ) -> None:
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
-        assert cq.bot
 
     study_id = callback_data.study_id
     async with uow:
-        study = await uow.studies.get_with_categories(study_id)
-        if not study:
+        context = await uow.studies.get_context(study_id)
+        if not context:
             callback_answer.text, callback_answer.show_alert = "Ошибка - нет такого исследования", True
             return
+        study = context.study
+        if not (await uow.studies.transition(study_id, StudyStatusEnum.APPROVED)).applied:
+            callback_answer.text, callback_answer.show_alert = "Проверка уже завершена", True
+            return
 
         if isinstance(callback_data, ConfirmCategories):
             study.categories.clear()
@@ -357,15 +387,30 @@ async def approve_anno_confirmed(
                 categories = await uow.categories.get_by_ids(category_ids)
                 study.categories.extend(categories)
 
-        study.status = StudyStatusEnum.APPROVED
-
         if not study.annotator_id:
             callback_answer.text, callback_answer.show_alert = "Ошибка - у разметки нет разметчика", True
             return
-        expert = await uow.users.get_by_id(cq.from_user.id)
+        expert = context.user(cq.from_user.id) or await uow.users.get_by_id(cq.from_user.id)
         if not expert:
             callback_answer.text, callback_answer.show_alert = "Вы не зарегистрированы в боте!", True
             return
+
+        text = as_line(
+            Text("✅ Эксперт "),
+            expert.name,
+            Text(" одобрил разметку исследования - "),
+            Code(study.study_iuid),
+        )
+        await enqueue_telegram(
+            uow,
+            SendMessage(chat_id=study.annotator_id, **text.as_kwargs()),
+            dedup_key=f"{cq.id}:annotator",
+        )
+        # Копирование в 3-research выполнит диспетчер outbox, эксперт его не ждёт
+        upload_path = study.study_path.replace("1-original-data", "2-check")
+        latest_upload = f"{upload_path}/version_{study.iteration_count}"
+        dst_path = upload_path.replace("2-check", "3-research")
+        await enqueue_nextcloud_copy(uow, latest_upload, dst_path, dedup_key=f"{cq.id}:copy")
         await uow.commit()
 
     text = as_list(
@@ -374,16 +419,6 @@ async def approve_anno_confirmed(
         sep="\n\n",
     )
     await cq.message.edit_text(**text.as_kwargs())
-    text = as_line(
-        Text("✅ Эксперт "),
-        expert.name,
-        Text(" одобрил разметку исследования - "),
-        Code(study.study_iuid),
-    )
-    await cq.bot.send_message(
-        chat_id=study.annotator_id,
-        **text.as_kwargs(),
-    )
 
     with logger.contextualize(
         user_id=cq.from_user.id,
@@ -392,13 +427,6 @@ async def approve_anno_confirmed(
     ):
         logger.info("Expert approved the annotation")
 
-    upload_path = study.study_path.replace("1-original-data", "2-check")
-    latest_upload = f"{upload_path}/version_{study.iteration_count}"
-    dst_path = upload_path.replace("2-check", "3-research")
-    await nc_util.copy_directory(src_dir=latest_upload, dst_dir=dst_path)
-    with logger.contextualize(study_iuid=study.study_iuid, iteration_count=study.iteration_count):
-        logger.info("The latest annotation version was copied to the 3-research directory")
-
     await state.clear()
 
 
@@ -431,7 +459,6 @@ async def close_anno_reason_choosen(
 ) -> None:
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
-        assert cq.bot
 
     match callback_data.reason:
         case ReportReasons.NORMAL:
@@ -441,43 +468,43 @@ async def close_anno_reason_choosen(
         case ReportReasons.OTHER_PATHOLOGY:
             status = StudyStatusEnum.CLOSED_OP
 
-    study_iuid = callback_data.study_id
     async with uow:
-        study = await uow.studies.update(
-            study_iuid,
-            {
-                "status": status,
-            },
-        )
-        if not study:
+        context = await uow.studies.get_context(callback_data.study_id)
+        if not context:
             callback_answer.text, callback_answer.show_alert = "Ошибка - нет такого исследования", True
             return
+        study = context.study
         if not study.annotator_id:
             callback_answer.text, callback_answer.show_alert = "Ошибка - у разметки нет разметчика", True
             return
-        await uow.commit()
-        expert = await uow.users.get_by_id(cq.from_user.id)
+        if not (await uow.studies.transition(study.id, status)).applied:
+            callback_answer.text, callback_answer.show_alert = "Проверка уже завершена", True
+            return
+        expert = context.user(cq.from_user.id) or await uow.users.get_by_id(cq.from_user.id)
         if not expert:
             callback_answer.text, callback_answer.show_alert = "Вы не зарегистрированы в боте!", True
             return
 
+        text = as_line(
+            Text("❗️ Эксперт "),
+            expert.name,
+            Text(" закрыл разметку исследования: "),
+            Code(study.study_iuid),
+            Text(f"\nПричина: {callback_data.reason.name}"),
+        )
+        await enqueue_telegram(
+            uow,
+            SendMessage(chat_id=study.annotator_id, **text.as_kwargs()),
+            dedup_key=f"{cq.id}:annotator",
+        )
+        await uow.commit()
+
     text = as_list(
         get_anno_review_text(study),
         Text(f"Закрыто по причине - {callback_data.reason.name} ✅"),
         sep="\n\n",
     )
     await cq.message.edit_text(**text.as_kwargs())
-    text = as_line(
-        Text("❗️ Эксперт "),
-        expert.name,
-        Text(" закрыл разметку исследования: "),
-        Code(study.study_iuid),
-        Text(f"\nПричина: {callback_data.reason.name}"),
-    )
-    await cq.bot.send_message(
-        chat_id=study.annotator_id,
-        **text.as_kwargs(),
-    )
     with logger.contextualize(
         user_id=cq.from_user.id,
         study_iuid=study.study_iuid,
@@ -577,59 +604,58 @@ async def send_reject(
     uow: FromDishka[IUnitOfWork],
 ) -> None:
     if TYPE_CHECKING:
-        assert cq.bot
         assert isinstance(cq.message, types.Message)
 
     state_data = await state.get_data()
     study_id = state_data["study_id"]
     async with uow:
-        study = await uow.studies.update(
+        result = await uow.studies.transition(
             study_id,
-            {
-                "status": StudyStatusEnum.WAITING_REWORK,
-                "reject_comment_msg_id": state_data["reject_comment_msg_id"],
-            },
+            StudyStatusEnum.WAITING_REWORK,
+            {"reject_comment_msg_id": state_data["reject_comment_msg_id"]},
         )
-        if not study:
+        if result.not_found:
             callback_answer.text, callback_answer.show_alert = "Ошибка - нет такого исследования", True
             return
+        if not result.study:
+            callback_answer.text, callback_answer.show_alert = "Проверка уже завершена", True
+            return
+        study = result.study
         if not study.annotator_id:
             callback_answer.text, callback_answer.show_alert = "Ошибка - у разметки нет разметчика", True
             return
-        await uow.commit()
         expert = await uow.users.get_by_id(cq.from_user.id)
         if not expert:
             callback_answer.text, callback_answer.show_alert = "Вы не зарегистрированы в боте!", True
             return
 
-    text = as_line(
-        Text("❗️ Эксперт "),
-        expert.name,
-        Text(" запросил доразметку исследования: "),
-        Code(study.study_iuid),
-        Text("\n\nКомментарий в сообщении ниже"),
-    )
-    kb = InlineKeyboardBuilder()
-    kb.button(text="Взять в работу", callback_data=ReAnnoStudy(study_id=study_id))
-    reply_markup = kb.adjust(1).as_markup()
-    await cq.bot.send_message(
-        chat_id=study.annotator_id,
-        **text.as_kwargs(),
-        reply_markup=reply_markup,
-    )
-    if state_data.get("photo_ids"):
-        mg = MediaGroupBuilder(caption=state_data["comment"])
-        for photo_id in state_data["photo_ids"]:
-            mg.add_photo(media=photo_id)
-        await cq.bot.send_media_group(
-            chat_id=study.annotator_id,
-            media=mg.build(),
+        text = as_line(
+            Text("❗️ Эксперт "),
+            expert.name,
+            Text(" запросил доразметку исследования: "),
+            Code(study.study_iuid),
+            Text("\n\nКомментарий в сообщении ниже"),
         )
-    else:
-        await cq.bot.send_message(
-            chat_id=study.annotator_id,
-            text=state_data["comment"],
+        kb = InlineKeyboardBuilder()
+        kb.button(text="Взять в работу", callback_data=ReAnnoStudy(study_id=study_id))
+        reply_markup = kb.adjust(1).as_markup()
+        # Оба сообщения адресованы разметчику, outbox доставит их в порядке записи
+        await enqueue_telegram(
+            uow,
+            SendMessage(chat_id=study.annotator_id, **text.as_kwargs(), reply_markup=reply_markup),
+            dedup_key=f"{cq.id}:annotator",
         )
+        comment: SendMessage | SendMediaGroup
+        if state_data.get("photo_ids"):
+            mg = MediaGroupBuilder(caption=state_data["comment"])
+            for photo_id in state_data["photo_ids"]:
+                mg.add_photo(media=photo_id)
+            comment = SendMediaGroup(chat_id=study.annotator_id, media=mg.build())
+        else:
+            comment = SendMessage(chat_id=study.annotator_id, text=state_data["comment"])
+        await enqueue_telegram(uow, comment, dedup_key=f"{cq.id}:annotator_comment")
+        await uow.commit()
+
     with logger.contextualize(
         user_id=cq.from_user.id,
         study_iuid=study.study_iuid,
@@ -640,14 +666,29 @@ async def send_reject(
     await cq.message.edit_text("Успешный запрос доразметки - разметчик получил ваш комментарий ✅")
 
 
-async def pre_expert_annotate(cq: types.CallbackQuery, callback_data: PreExpertAnno, state: FSMContext) -> None:
+async def pre_expert_annotate(
+    cq: types.CallbackQuery,
+    callback_data: PreExpertAnno,
+    callback_answer: CallbackAnswer,
+    state: FSMContext,
+    uow: FromDishka[IReadOnlyUnitOfWork],
+) -> None:
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
 
+    async with uow:
+        study = await uow.studies.get_by_id(callback_data.study_id)
+    if not study:
+        callback_answer.text, callback_answer.show_alert = "Ошибка - нет такого исследования", True
+        return
+    # Итерация на момент решения эксперта: по ней ExpertAnno отсекает повторное нажатие
     await state.set_state(ExpertPreAnno.waiting_for_conslusion)
-    await state.update_data(study_id=callback_data.study_id)
+    await state.update_data(study_id=callback_data.study_id, iteration=study.iteration_count)
     kb = InlineKeyboardBuilder()
-    kb.button(text="Пропустить", callback_data=ExpertAnno(study_id=callback_data.study_id))
+    kb.button(
+        text="Пропустить",
+        callback_data=ExpertAnno(study_id=callback_data.study_id, iteration=study.iteration_count),
+    )
     kb.button(text="Отмена", callback_data=AnnoReview(study_id=callback_data.study_id))
     reply_markup = cast("types.InlineKeyboardMarkup", kb.adjust(1).as_markup())
     await cq.message.edit_text(text="Напишите комментарий разметчику", reply_markup=reply_markup)
@@ -660,54 +701,88 @@ async def conslusion_for_annotator_writen(msg: types.Message, state: FSMContext)
         Text(msg.text),
     )
     kb = InlineKeyboardBuilder()
-    kb.button(text="Отправить", callback_data=ExpertAnno(study_id=state_data["study_id"]))
+    kb.button(
+        text="Отправить",
+        # В сессиях, начатых до появления итерации в данных FSM, её нет
+        callback_data=ExpertAnno(study_id=state_data["study_id"], iteration=state_data.get("iteration")),
+    )
     kb.button(text="Отмена", callback_data=AnnoReview(study_id=state_data["study_id"]))
     reply_markup = kb.adjust(1).as_markup()
     await state.set_state(ExpertPreAnno.waiting_for_confirmation)
     await msg.answer(**text.as_kwargs(), reply_markup=reply_markup)
 
 
+async def _notify_annotator_about_expert_anno(uow: IUnitOfWork, study: Study, comment: str, *, dedup_key: str) -> None:
+    if TYPE_CHECKING:
+        assert study.annotator_id
+    text = as_list(
+        Text("🔹 Эксперт самостоятельно разметит исследование"),
+        as_line(Bold("study_iuid: "), Code(study.study_iuid)),
+        as_line(Bold("Комментарий: "), comment),
+    )
+    await enqueue_telegram(uow, SendMessage(chat_id=study.annotator_id, **text.as_kwargs()), dedup_key=dedup_key)
+
+
 async def expert_annotate(
     cq: types.CallbackQuery,
-    callback_data: ExpertAnno | ApproveWithSelfAnno,
+    callback_data: ExpertAnno | LegacyExpertAnno | ApproveWithSelfAnno | LegacyApproveWithSelfAnno,
     callback_answer: CallbackAnswer,
     state: FSMContext,
     uow: FromDishka[IUnitOfWork],
     nc_util: FromDishka[NextcloudUtils],
+    locks: FromDishka[LockManager],
 ) -> None:
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
-        assert cq.bot
 
     study_id = callback_data.study_id
     if cq.from_user is None:
         return
 
-    if isinstance(callback_data, ExpertAnno):
+    from_expert_anno = isinstance(callback_data, ExpertAnno | LegacyExpertAnno)
+    if from_expert_anno:
         await state.set_state(CheckCategoriesView.from_expert_annotate)
     else:
         await state.set_state(CheckCategoriesView.from_approve_with_self_anno)
 
-    async with uow:
-        study = await uow.studies.get_by_id(study_id)
-        if not study:
-            callback_answer.text, callback_answer.show_alert = "Ошибка - нет такого исследования", True
-            return
-        path_for_upload = study.study_path.replace("1-original-data", "2-check")
-        new_iteration_count = study.iteration_count + 1
-        upload_folder_name = f"version_{new_iteration_count}"
-
-        await nc_util.create_folder(path=path_for_upload, new_folder=upload_folder_name)
-        upload_link = await nc_util.create_public_link(
-            path=f"{path_for_upload}/{upload_folder_name}",
-            label=f"Upload for tg-id={cq.from_user.id}",
-            permissions=7,
-        )
+    try:
+        # Блокировка не пускает второе нажатие к Nextcloud, пока первое создаёт версию
+        async with locks.lock("study", study_id), uow:
+            current = await uow.studies.get_by_id(study_id)
+            if not current:
+                callback_answer.text, callback_answer.show_alert = "Ошибка - нет такого исследования", True
+                return
+            # Итерация поднимается, только если она та, что видел эксперт: повторное нажатие
+            # получит None и не создаст ещё одну версию. У кнопок без итерации защиты от повтора нет
+            seen_iteration = getattr(callback_data, "iteration", None)
+            study = await uow.studies.advance_iteration(
+                study_id,
+                current.iteration_count if seen_iteration is None else seen_iteration,
+                conditions=(Study.status == StudyStatusEnum.IN_REVIEW, Study.expert_id == cq.from_user.id),
+            )
+            if not study:
+                callback_answer.text, callback_answer.show_alert = "Исследование уже взято на доразметку", True
+                return
+            path_for_upload = study.study_path.replace("1-original-data", "2-check")
+            upload_folder_name = f"version_{study.iteration_count}"
+
+            await nc_util.create_folder(path=path_for_upload, new_folder=upload_folder_name)
+            upload_link = await nc_util.create_public_link(
+                path=f"{path_for_upload}/{upload_folder_name}",
+                label=f"Upload for tg-id={cq.from_user.id}",
+                permissions=7,
+            )
 
-        study.nc_last_upload_link = study.nc_upload_link
-        study.nc_upload_link = upload_link
-        study.iteration_count = new_iteration_count
-        await uow.commit()
+            study.nc_last_upload_link = study.nc_upload_link
+            study.nc_upload_link = upload_link
+
+            if from_expert_anno:
+                comment = await state.get_value("text", "-")
+                await _notify_annotator_about_expert_anno(uow, study, comment, dedup_key=f"{cq.id}:annotator")
+            await uow.commit()
+    except LockTimeoutError:
+        callback_answer.text, callback_answer.show_alert = "Предыдущее действие ещё выполняется, попробуйте позже", True
+        return
 
     text = get_assigned_study_text(study)
     kb = InlineKeyboardBuilder()
@@ -719,24 +794,12 @@ async def expert_annotate(
         study_iuid=study.study_iuid,
         iteration_count=study.iteration_count,
     ):
-        if isinstance(callback_data, ExpertAnno):
+        if from_expert_anno:
             logger.info("Expert rejected annotation v3 and self-assigned the task")
         else:
             logger.info("Expert approved the annotation and proceeded to add minor annotations.")
 
-    if isinstance(callback_data, ExpertAnno):
-        if TYPE_CHECKING:
-            assert study.annotator_id
-        state_data = await state.get_data()
-        text = as_list(
-            Text("🔹 Эксперт самостоятельно разметит исследование"),
-            as_line(Bold("study_iuid: "), Code(study.study_iuid)),
-            as_line(Bold("Комментарий: "), state_data.get("text", "-")),
-        )
-        await cq.bot.send_message(
-            chat_id=study.annotator_id,
-            **text.as_kwargs(),
-        )
+    if from_expert_anno:
         callback_answer.text = "Сообщение отправлено разметчику ✅"
 
 
@@ -744,7 +807,7 @@ async def expert_annotate_view_only(
     cq: types.CallbackQuery,
     callback_data: ExpertAnnoView,
     callback_answer: CallbackAnswer,
-    uow: FromDishka[IUnitOfWork],
+    uow: FromDishka[IReadOnlyUnitOfWork],
 ) -> None:
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
@@ -775,7 +838,6 @@ async def expert_annotate_finish(
 ) -> None:
     if TYPE_CHECKING:
         assert isinstance(cq.message, types.Message)
-        assert cq.bot
 
     fsm_state = await state.get_state()
     if not fsm_state:
@@ -806,6 +868,10 @@ async def expert_annotate_finish(
             callback_answer.text, callback_answer.show_alert = "Вы ничего не выгрузили", True
             return
 
+        if not (await uow.studies.transition(study_id, study_finish_status)).applied:
+            callback_answer.text, callback_answer.show_alert = "Проверка уже завершена", True
+            return
+
         if isinstance(callback_data, ConfirmCategories):
             study.categories.clear()
             category_ids = await state.get_value("choosed_categories")
@@ -813,7 +879,8 @@ async def expert_annotate_finish(
                 categories = await uow.categories.get_by_ids(category_ids)
                 study.categories.extend(categories)
 
-        study.status = study_finish_status
+        dst_path = upload_path.replace("2-check", "3-research")
+        await enqueue_nextcloud_copy(uow, annotate_path, dst_path, dedup_key=f"{cq.id}:copy")
         await uow.commit()
 
     text = as_list(
@@ -829,13 +896,6 @@ async def expert_annotate_finish(
     ):
         logger.info("Expert finished the annotation personally")
 
-    upload_path = study.study_path.replace("1-original-data", "2-check")
-    latest_upload = f"{upload_path}/version_{study_iteration}"
-    dst_path = upload_path.replace("2-check", "3-research")
-    await nc_util.copy_directory(src_dir=latest_upload, dst_dir=dst_path)
-    with logger.contextualize(study_iuid=study.study_iuid, iteration_count=study.iteration_count):
-        logger.info("The latest annotation version was copied to the 3-research directory")
-
     await state.clear()
 
 
@@ -868,7 +928,15 @@ def register_handlers(dp: Dispatcher) -> None:
 
     router.callback_query.register(pre_expert_annotate, PreExpertAnno.filter())
     router.message.register(conslusion_for_annotator_writen, F.text, ExpertPreAnno.waiting_for_conslusion)
-    router.callback_query.register(expert_annotate, or_f(ExpertAnno.filter(), ApproveWithSelfAnno.filter()))
+    router.callback_query.register(
+        expert_annotate,
+        or_f(
+            ExpertAnno.filter(),
+            LegacyExpertAnno.filter(),
+            ApproveWithSelfAnno.filter(),
+            LegacyApproveWithSelfAnno.filter(),
+        ),
+    )
     router.callback_query.register(expert_annotate_view_only, ExpertAnnoView.filter())
     router.callback_query.register(
         expert_annotate_finish,
@@ -1,20 +1,24 @@
-import asyncio
 from collections.abc import Awaitable, Callable
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from aiogram import BaseMiddleware
 from aiogram.types import (
     Message,
     TelegramObject,
 )
+from dishka.integrations.aiogram import CONTAINER_NAME
+
+from bot.utils.album_collector import AlbumCollector
+
+if TYPE_CHECKING:
+    from dishka import AsyncContainer
 
 
 class MediaGroupMiddleware(BaseMiddleware):
-    ALBUM_DATA: dict[str, list[Message]]
+    """Собирает альбом и передаёт его обработчику первой части в ``album``; остальные части пропускаются.
 
-    def __init__(self, delay: float = 1) -> None:
-        self.ALBUM_DATA = {}
-        self.delay = delay
+    Сборщик (в памяти или в Redis, ``BOT_ALBUM_BACKEND``) берётся из контейнера dishka.
+    """
 
     async def __call__(
         self,
@@ -25,13 +29,10 @@ class MediaGroupMiddleware(BaseMiddleware):
         if not isinstance(event, Message) or not event.media_group_id:
             return await handler(event, data)
 
-        try:
-            self.ALBUM_DATA[event.media_group_id].append(event)
-        except KeyError:
-            self.ALBUM_DATA[event.media_group_id] = [event]
-            await asyncio.sleep(self.delay)
-            data["album"] = self.ALBUM_DATA.pop(event.media_group_id)
-        else:
+        container: AsyncContainer = data[CONTAINER_NAME]
+        collector = await container.get(AlbumCollector)
+        album = await collector.collect(event, data["bot"])
+        if album is None:
             return None
-
+        data["album"] = album
         return await handler(event, data)
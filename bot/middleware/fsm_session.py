@@ -0,0 +1,192 @@
+import copy
+from collections.abc import Awaitable, Callable, Mapping
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.types import TelegramObject
+
+from bot.utils.fsm_storage import CompactRedisStorage
+from core.utils.metrics import FSM_SESSION_ROUND_TRIPS
+
+
+@dataclass(slots=True)
+class _Entry:
+    state: str | None
+    data: dict[str, Any]
+    state_changed: bool = False
+    data_changed: bool = False
+
+
+@dataclass(slots=True)
+class _Session:
+    entries: dict[StorageKey, _Entry] = field(default_factory=dict)
+    round_trips: int = 0
+    closed: bool = False
+
+
+_session: ContextVar[_Session | None] = ContextVar("fsm_session", default=None)
+
+
+class FSMSessionStorage(BaseStorage):
+    """Хранилище FSM с буфером на время апдейта.
+
+    Внутри сессии (её открывает ``FSMSessionMiddleware``) состояние и данные ключа читаются
+    из Redis одним pipeline при первом обращении, дальше обработчики работают с локальной
+    копией, а изменения записываются одной транзакцией в конце апдейта. Вне сессии все
+    вызовы идут напрямую в ``storage``.
+
+    Апдейты одного пользователя, обрабатываемые одновременно, видят снимок данных на начало
+    своего апдейта; последний записавший перезаписывает данные целиком.
+    """
+
+    def __init__(self, storage: CompactRedisStorage) -> None:
+        self.storage = storage
+
+    async def _entry(self, key: StorageKey) -> _Entry | None:
+        session = _session.get()
+        # Задачи, запущенные из обработчика, наследуют сессию и после её записи идут напрямую
+        if session is None or session.closed:
+            return None
+        entry = session.entries.get(key)
+        if entry is None:
+            entry = session.entries[key] = await self._load(key)
+            session.round_trips += 1
+        return entry
+
+    async def _load(self, key: StorageKey) -> _Entry:
+        build = self.storage.key_builder.build
+        async with self.storage.redis.pipeline(transaction=False) as pipe:
+            pipe.get(build(key, "state"))
+            pipe.get(build(key, "data"))
+            state, data = await pipe.execute()
+        if isinstance(state, bytes):
+            state = state.decode("utf-8")
+        return _Entry(state=state, data=self.storage.load_data(data))
+
+    async def flush(self, session: _Session) -> None:
+        """Записывает изменения сессии одной транзакцией; после этого сессия закрыта."""
+        session.closed = True
+        build = self.storage.key_builder.build
+        async with self.storage.redis.pipeline(transaction=True) as pipe:
+            for key, entry in session.entries.items():
+                ttl = self.storage.ttl_for(entry.state)
+                if entry.state_changed:
+                    if entry.state is None:
+                        pipe.delete(build(key, "state"))
+                    else:
+                        pipe.set(build(key, "state"), entry.state, ex=ttl)
+                if entry.data_changed:
+                    if entry.data:
+                        pipe.set(build(key, "data"), self.storage.dump_data(entry.data), ex=ttl)
+                    else:
+                        pipe.delete(build(key, "data"))
+                elif entry.state_changed and entry.data:
+                    # Срок данных следует за состоянием
+                    if ttl is None:
+                        pipe.persist(build(key, "data"))
+                    else:
+                        pipe.expire(build(key, "data"), ttl)
+            if len(pipe):
+                await pipe.execute()
+                session.round_trips += 1
+        FSM_SESSION_ROUND_TRIPS.observe(session.round_trips)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._entry(key)
+        if entry is None:
+            await self.storage.set_state(key, state)
+            return
+        entry.state = state.state if isinstance(state, State) else state
+        entry.state_changed = True
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        entry = await self._entry(key)
+        if entry is None:
+            return await self.storage.get_state(key)
+        return entry.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        entry = await self._entry(key)
+        if entry is None:
+            await self.storage.set_data(key, data)
+            return
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        entry.data = copy.deepcopy(data)
+        entry.data_changed = True
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        entry = await self._entry(key)
+        if entry is None:
+            return await self.storage.get_data(key)
+        # Копия, как и у RedisStorage: изменения без set_data/update_data не сохраняются
+        return copy.deepcopy(entry.data)
+
+    async def get_value(
+        self,
+        storage_key: StorageKey,
+        dict_key: str,
+        default: Any | None = None,  # noqa: ANN401
+    ) -> Any | None:  # noqa: ANN401
+        entry = await self._entry(storage_key)
+        if entry is None:
+            return await self.storage.get_value(storage_key, dict_key, default)
+        if dict_key not in entry.data:
+            return default
+        return copy.deepcopy(entry.data[dict_key])
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> dict[str, Any]:
+        entry = await self._entry(key)
+        if entry is None:
+            return await self.storage.update_data(key, data)
+        entry.data.update(copy.deepcopy(dict(data)))
+        entry.data_changed = True
+        return copy.deepcopy(entry.data)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+
+class FSMSessionMiddleware(BaseMiddleware):
+    """Открывает сессию ``FSMSessionStorage`` на время апдейта и записывает её до снятия блокировки FSM.
+
+    Встаёт на место FSM middleware диспетчера::
+
+        dp = Dispatcher(storage=FSMSessionStorage(redis_storage), disable_fsm=True)
+        dp.update.outer_middleware(FSMSessionMiddleware(dp.fsm))
+    """
+
+    def __init__(self, fsm: FSMContextMiddleware) -> None:
+        if not isinstance(fsm.storage, FSMSessionStorage):
+            msg = "FSMSessionMiddleware requires FSMSessionStorage"
+            raise TypeError(msg)
+        self.fsm = fsm
+        self.storage = fsm.storage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:  # noqa: ANN401
+        session = _Session()
+        token = _session.set(session)
+
+        async def handle(event: TelegramObject, data: dict[str, Any]) -> Any:  # noqa: ANN401
+            try:
+                return await handler(event, data)
+            finally:
+                # Как и при прямой записи, изменения, сделанные до исключения, сохраняются
+                await self.storage.flush(session)
+
+        try:
+            return await self.fsm(handle, event, data)
+        finally:
+            _session.reset(token)
@@ -0,0 +1,78 @@
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMediaGroup, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+from loguru import logger
+
+from bot.utils.rate_limiter import SendPriority, TelegramRateLimiter
+from core.utils.metrics import TELEGRAM_RETRY_AFTER
+
+if TYPE_CHECKING:
+    from aiogram.client.session.base import Response
+    from aiogram.types import Chat
+
+# Чат апдейта, который сейчас обрабатывается в этой задаче
+_update_chat_id: ContextVar[int | None] = ContextVar("update_chat_id", default=None)
+# Методы, на которые распространяются лимиты Telegram на сообщения
+_LIMITED_PREFIXES = ("send", "copy", "forward", "edit")
+
+
+class UpdateChatMiddleware(BaseMiddleware):
+    """Запоминает чат апдейта, чтобы ответы в него отправлялись раньше уведомлений.
+
+    Регистрируется как outer middleware на ``dp.update`` после встроенного, который кладёт ``event_chat``.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:  # noqa: ANN401
+        chat: Chat | None = data.get("event_chat")
+        token = _update_chat_id.set(chat.id if chat else None)
+        try:
+            return await handler(event, data)
+        finally:
+            _update_chat_id.reset(token)
+
+
+class SendLimitMiddleware(BaseRequestMiddleware):
+    """Session middleware: ждёт токены лимитера перед отправкой и повторяет запрос после flood control."""
+
+    def __init__(self, limiter: TelegramRateLimiter, max_retries: int) -> None:
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> "Response[TelegramType]":
+        chat_id: int | str | None = getattr(method, "chat_id", None)
+        api_method = method.__api_method__
+        if chat_id is None or not api_method.startswith(_LIMITED_PREFIXES) or api_method == "sendChatAction":
+            return await make_request(bot, method)
+
+        priority = SendPriority.INTERACTIVE if chat_id == _update_chat_id.get() else SendPriority.NOTIFICATION
+        # Каждое вложение альбома Telegram считает отдельным сообщением
+        cost = len(method.media) if isinstance(method, SendMediaGroup) else 1
+        attempt = 0
+        while True:
+            await self.limiter.acquire(chat_id, priority, cost)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                TELEGRAM_RETRY_AFTER.labels(method=api_method).inc()
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                logger.warning("Flood control on {} in chat {}, retry in {}s", api_method, chat_id, e.retry_after)
+                self.limiter.pause(chat_id, e.retry_after)
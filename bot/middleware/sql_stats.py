@@ -0,0 +1,31 @@
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from core.utils.sql_instrumentation import sql_scope
+
+if TYPE_CHECKING:
+    from aiogram.dispatcher.event.handler import HandlerObject
+
+
+class SqlStatsMiddleware(BaseMiddleware):
+    """Привязывает SQL-статистику к обработчику апдейта.
+
+    Регистрируется как inner middleware, чтобы в ``data`` уже был выбранный обработчик.
+    """
+
+    def __init__(self, n_plus_one_threshold: int) -> None:
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:  # noqa: ANN401
+        handler_object: HandlerObject | None = data.get("handler")
+        scope = handler_object.callback.__name__ if handler_object else type(event).__name__
+        with sql_scope(f"bot:{scope}", n_plus_one_threshold=self.n_plus_one_threshold):
+            return await handler(event, data)
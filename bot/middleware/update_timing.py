@@ -0,0 +1,105 @@
+import time
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import CallbackQuery, TelegramObject, Update
+from loguru import logger
+
+from core.utils.metrics import BOT_UPDATE_COMPONENT_TIME, BOT_UPDATE_DURATION
+from core.utils.update_timing import COMPONENTS, UpdateTiming, current_timing, timed, update_timing
+
+if TYPE_CHECKING:
+    from aiogram.client.session.base import Response
+    from aiogram.dispatcher.event.handler import HandlerObject
+
+
+class UpdateTimingMiddleware(BaseMiddleware):
+    """Меряет полное время обработки апдейта и раскладывает его по зависимостям.
+
+    Регистрируется как outer middleware на ``dp.update`` раньше сессии FSM, чтобы в замер
+    попали и блокировка FSM, и чтение состояния. Обработчик и префикс callback data
+    подставляет ``HandlerTimingMiddleware``. Апдейты дольше ``slow_threshold`` секунд
+    пишутся в лог с полной разбивкой; 0 - не писать.
+    """
+
+    def __init__(self, slow_threshold: float) -> None:
+        self.slow_threshold = slow_threshold
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:  # noqa: ANN401
+        started = time.perf_counter()
+        with update_timing("unhandled") as timing:
+            try:
+                return await handler(event, data)
+            finally:
+                self._report(event, timing, time.perf_counter() - started)
+
+    def _report(self, event: TelegramObject, timing: UpdateTiming, elapsed: float) -> None:
+        BOT_UPDATE_DURATION.labels(handler=timing.handler, prefix=timing.prefix).observe(elapsed)
+        for component in COMPONENTS:
+            BOT_UPDATE_COMPONENT_TIME.labels(handler=timing.handler, component=component).observe(
+                timing.components[component],
+            )
+        if not self.slow_threshold or elapsed < self.slow_threshold:
+            return
+
+        fields: dict[str, Any] = {
+            "update_id": event.update_id if isinstance(event, Update) else None,
+            "handler": timing.handler,
+            "callback_prefix": timing.prefix,
+            "total_ms": round(elapsed * 1000, 2),
+            # Время вне перечисленных зависимостей: код обработчика, FSM, ожидание частей альбома
+            "other_ms": round(max(elapsed - sum(timing.components.values()), 0) * 1000, 2),
+        }
+        for component in COMPONENTS:
+            fields[f"{component}_ms"] = round(timing.components[component] * 1000, 2)
+            fields[f"{component}_calls"] = timing.calls[component]
+        logger.bind(**fields).warning(
+            "Slow update in {}: {:.0f} ms (db {:.0f}, nextcloud {:.0f}, telegram {:.0f}, lock wait {:.0f})",
+            timing.handler,
+            elapsed * 1000,
+            *(timing.components[component] * 1000 for component in COMPONENTS),
+        )
+
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """Подписывает замер апдейта именем обработчика и префиксом callback data.
+
+    Регистрируется как inner middleware, чтобы в ``data`` уже был выбранный обработчик.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:  # noqa: ANN401
+        timing = current_timing()
+        if timing is not None:
+            handler_object: HandlerObject | None = data.get("handler")
+            timing.handler = handler_object.callback.__name__ if handler_object else type(event).__name__
+            if isinstance(event, CallbackQuery) and event.data:
+                # У CallbackData префикс стоит до первого разделителя
+                timing.prefix = event.data.split(":", maxsplit=1)[0]
+        return await handler(event, data)
+
+
+class TelegramTimingMiddleware(BaseRequestMiddleware):
+    """Session middleware: время запросов к Bot API, включая ожидание лимитера, попадает в разбивку апдейта."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> "Response[TelegramType]":
+        with timed("telegram"):
+            return await make_request(bot, method)
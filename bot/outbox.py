@@ -0,0 +1,186 @@
+import asyncio
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+import httpx
+from aiogram import Bot
+from aiogram.client.default import Default
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, TelegramRetryAfter
+from aiogram.methods import SendMediaGroup, SendMessage, TelegramMethod
+from dishka import AsyncContainer
+from loguru import logger
+from pydantic_core import to_jsonable_python
+
+from core.database import DatabaseWorkload
+from core.models.outbox import OutboxKind, OutboxMessage
+from core.repositories.outbox_repo import add_commit_listener, remove_commit_listener
+from core.unit_of_work import IUnitOfWork
+from core.utils.metrics import OUTBOX_LAG, OUTBOX_PROCESSED
+from core.utils.nextcloud import NextcloudUtils
+
+# Методы, которые можно отложить через outbox
+_TELEGRAM_METHODS: dict[str, type[TelegramMethod[Any]]] = {
+    method.__api_method__: method for method in (SendMessage, SendMediaGroup)
+}
+# Ответ на эти ошибки не изменится от повтора
+_PERMANENT_TELEGRAM_ERRORS = (TelegramBadRequest, TelegramForbiddenError, TelegramNotFound)
+_MAX_BACKOFF = 300.0
+
+
+def _strip_defaults(value: Any) -> Any:  # noqa: ANN401
+    # Default - значения из DefaultBotProperties, бот подставит их при отправке
+    if isinstance(value, dict):
+        return {key: _strip_defaults(item) for key, item in value.items() if not isinstance(item, Default)}
+    if isinstance(value, list):
+        return [_strip_defaults(item) for item in value]
+    return value
+
+
+async def enqueue_telegram(
+    uow: IUnitOfWork,
+    method: SendMessage | SendMediaGroup,
+    *,
+    dedup_key: str | None = None,
+) -> None:
+    """Откладывает отправку в Telegram до commit транзакции ``uow``."""
+    payload = {
+        "method": method.__api_method__,
+        "params": to_jsonable_python(_strip_defaults(method.model_dump())),
+    }
+    await uow.outbox.add(OutboxKind.TELEGRAM, f"tg:{method.chat_id}", payload, dedup_key=dedup_key)
+
+
+async def enqueue_nextcloud_copy(
+    uow: IUnitOfWork,
+    src_dir: str,
+    dst_dir: str,
+    *,
+    dedup_key: str | None = None,
+) -> None:
+    """Откладывает копирование каталога в Nextcloud до commit транзакции ``uow``."""
+    payload = {"src_dir": src_dir, "dst_dir": dst_dir}
+    await uow.outbox.add(OutboxKind.NEXTCLOUD_COPY, f"nc:{dst_dir}", payload, dedup_key=dedup_key)
+
+
+@dataclass(frozen=True, slots=True)
+class _Outcome:
+    message: OutboxMessage
+    error: str | None = None
+    retry_after: float | None = None
+    permanent: bool = False
+
+
+class OutboxDispatcher:
+    """Доставляет сообщения outbox: сразу после commit в этом процессе и не реже ``poll_interval``.
+
+    Доставка - at-least-once: если процесс упадёт между отправкой и отметкой, сообщение
+    уйдёт ещё раз после истечения аренды.
+    """
+
+    def __init__(
+        self,
+        container: AsyncContainer,
+        bot: Bot,
+        nc_util: NextcloudUtils,
+        *,
+        poll_interval: float,
+        batch_size: int,
+        lease_seconds: float,
+        max_attempts: int,
+    ) -> None:
+        self._container = container
+        self._bot = bot
+        self._nc_util = nc_util
+        self._poll_interval = poll_interval
+        self._batch_size = batch_size
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        add_commit_listener(self.wake)
+        try:
+            while True:
+                self._wakeup.clear()
+                try:
+                    await self.dispatch()
+                except Exception:  # noqa: BLE001
+                    logger.exception("Outbox dispatch failed")
+                with suppress(TimeoutError):
+                    async with asyncio.timeout(self._poll_interval):
+                        await self._wakeup.wait()
+        finally:
+            remove_commit_listener(self.wake)
+
+    async def dispatch(self) -> int:
+        """Доставляет всё, что готово; возвращает число обработанных сообщений."""
+        processed = 0
+        while True:
+            async with self._container() as request_container:
+                uow = await request_container.get(IUnitOfWork, component=DatabaseWorkload.BACKGROUND)
+                async with uow:
+                    messages = await uow.outbox.claim(self._batch_size, self._lease_seconds)
+                    await uow.commit()
+                if not messages:
+                    return processed
+                # В пачке не больше одного сообщения на получателя, поэтому их можно слать параллельно
+                outcomes = await asyncio.gather(*(self._deliver(message) for message in messages))
+                async with uow:
+                    await self._record(uow, outcomes)
+                    await uow.commit()
+            processed += len(messages)
+
+    async def _deliver(self, message: OutboxMessage) -> _Outcome:
+        try:
+            if message.kind is OutboxKind.TELEGRAM:
+                method = _TELEGRAM_METHODS[message.payload["method"]].model_validate(message.payload["params"])
+                await self._bot(method)
+            else:
+                await self._nc_util.copy_directory(
+                    src_dir=message.payload["src_dir"],
+                    dst_dir=message.payload["dst_dir"],
+                )
+        except TelegramRetryAfter as e:
+            return _Outcome(message, error=str(e), retry_after=e.retry_after)
+        except _PERMANENT_TELEGRAM_ERRORS as e:
+            return _Outcome(message, error=str(e), permanent=True)
+        except httpx.HTTPStatusError as e:
+            code = e.response.status_code
+            return _Outcome(message, error=str(e), permanent=code < 500 and code not in {408, 429})
+        except Exception as e:  # noqa: BLE001
+            return _Outcome(message, error=repr(e))
+        return _Outcome(message)
+
+    async def _record(self, uow: IUnitOfWork, outcomes: list[_Outcome]) -> None:
+        now = datetime.now(UTC)
+        sent = [outcome.message for outcome in outcomes if outcome.error is None]
+        await uow.outbox.mark_sent([message.id for message in sent])
+        for message in sent:
+            logger.info("Outbox message {} ({}) delivered to {}", message.id, message.kind.value, message.recipient)
+            OUTBOX_PROCESSED.labels(kind=message.kind.value, outcome="sent").inc()
+            OUTBOX_LAG.labels(kind=message.kind.value).observe((now - message.created_at).total_seconds())
+
+        for outcome in outcomes:
+            message, error = outcome.message, outcome.error
+            if error is None:
+                continue
+            if outcome.permanent or message.attempts >= self._max_attempts:
+                await uow.outbox.mark_dead(message.id, error)
+                OUTBOX_PROCESSED.labels(kind=message.kind.value, outcome="dead").inc()
+                logger.error("Outbox message {} to {} is dead: {}", message.id, message.recipient, error)
+                continue
+            delay = outcome.retry_after or min(2.0**message.attempts, _MAX_BACKOFF)
+            await uow.outbox.retry(message.id, delay, error)
+            OUTBOX_PROCESSED.labels(kind=message.kind.value, outcome="retry").inc()
+            logger.warning(
+                "Outbox message {} to {} failed, retry in {}s: {}",
+                message.id,
+                message.recipient,
+                delay,
+                error,
+            )
@@ -3,7 +3,9 @@ from aiogram import Dispatcher
 from bot.handlers.admin.add_project import register_handlers as add_project_handlers
 from bot.handlers.admin.add_user_to_project import register_handlers as add_validator_to_project
 from bot.handlers.admin.cancel_task import register_handlers as cancel_task
+from bot.handlers.admin.export import register_handlers as export_handlers
 from bot.handlers.admin.generate_reg_link import register_handlers as admin_handlers
+from bot.handlers.admin.stats import register_handlers as stats_handlers
 from bot.handlers.annotate.annotator_logic import register_handlers as tasks_handlers
 from bot.handlers.annotate.validator_logic import register_handlers as expert_review
 from bot.handlers.common import register_handlers as common_handlers
@@ -19,3 +21,5 @@ def register_handlers(dp: Dispatcher) -> None:
     add_project_handlers(dp=dp)
     cancel_task(dp=dp)
     add_validator_to_project(dp=dp)
+    stats_handlers(dp=dp)
+    export_handlers(dp=dp)
@@ -0,0 +1,303 @@
+import asyncio
+import json
+import time
+import uuid
+import zlib
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates
+from aiogram.types import Update
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+
+from core.utils.metrics import BOT_UPDATE_LAG
+
+if TYPE_CHECKING:
+    from redis.typing import EncodableT, FieldT
+
+_GROUP = "bot_workers"
+# Владелец шарда продлевает ключ в отдельной задаче каждую треть TTL; упавший воркер освобождает шард через TTL
+_OWNER_TTL = 30.0
+_OWNER_REFRESH_INTERVAL = _OWNER_TTL / 3
+_READ_BLOCK_MS = 5000
+_POLL_BACKOFF_MAX = 30.0
+# Продлеваем владение, только если оно всё ещё наше (могло истечь и достаться другому)
+_REDIS_REFRESH_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_REDIS_RELEASE_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _routing_key(payload: dict[str, Any]) -> int | str:
+    """Пользователь апдейта; у апдейтов без пользователя - чат, в крайнем случае id апдейта."""
+    for name, event in payload.items():
+        if name == "update_id" or not isinstance(event, dict):
+            continue
+        source = event.get("from") or event.get("user") or event.get("chat")
+        if isinstance(source, dict) and "id" in source:
+            return source["id"]
+    return payload["update_id"]
+
+
+def _media_group(payload: dict[str, Any]) -> str | None:
+    message = payload.get("message")
+    return message.get("media_group_id") if isinstance(message, dict) else None
+
+
+class _OwnershipLostError(Exception):
+    """Ключ владельца шарда истёк или принадлежит другому воркеру."""
+
+
+def shard_for(key: int | str, shards: int) -> int:
+    if isinstance(key, str):
+        key = zlib.crc32(key.encode())
+    return key % shards
+
+
+class UpdateStreamPublisher:
+    """Раскладывает апдейты по Redis Streams ``<prefix>:<shard>``, шард выбирается по пользователю.
+
+    Все апдейты одного пользователя попадают в один поток, поэтому воркер шарда видит их по порядку.
+    """
+
+    def __init__(self, redis: Redis, *, shards: int, maxlen: int, key_prefix: str = "bot_updates") -> None:
+        self._redis = redis
+        self.shards = shards
+        self._maxlen = maxlen
+        self._key_prefix = key_prefix
+
+    def stream(self, shard: int) -> str:
+        return f"{self._key_prefix}:{shard}"
+
+    async def publish(self, *payloads: dict[str, Any]) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for payload in payloads:
+                key = _routing_key(payload)
+                fields: dict[FieldT, EncodableT] = {"key": str(key), "update": json.dumps(payload)}
+                if group := _media_group(payload):
+                    fields["group"] = group
+                pipe.xadd(
+                    self.stream(shard_for(key, self.shards)),
+                    fields,
+                    maxlen=self._maxlen,
+                    approximate=True,
+                )
+            await pipe.execute()
+
+
+async def run_polling_ingress(
+    bot: Bot,
+    publisher: UpdateStreamPublisher,
+    *,
+    allowed_updates: list[str],
+    polling_timeout: int = 30,
+) -> None:
+    """Long polling без обработки: апдейты уходят в потоки, offset сдвигается только после записи."""
+    get_updates = GetUpdates(timeout=polling_timeout, allowed_updates=allowed_updates)
+    kwargs = {"request_timeout": int(bot.session.timeout + polling_timeout)} if bot.session.timeout else {}
+    backoff = 1.0
+    while True:
+        try:
+            updates = await bot(get_updates, **kwargs)
+            if updates:
+                await publisher.publish(
+                    *(update.model_dump(mode="json", exclude_none=True, by_alias=True) for update in updates),
+                )
+                get_updates.offset = updates[-1].update_id + 1
+            backoff = 1.0
+        except Exception:  # noqa: BLE001
+            logger.exception("Update ingress failed, retry in {}s", backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, _POLL_BACKOFF_MAX)
+
+
+@dataclass(slots=True)
+class _Tail:
+    """Последние апдейты пользователя: одиночный апдейт или части одного альбома."""
+
+    tasks: list[asyncio.Task[None]]
+    group: str | None = None
+    # Что должно завершиться до частей альбома
+    before: list[asyncio.Task[None]] = field(default_factory=list)
+
+
+class UpdateStreamWorker:
+    """Обрабатывает апдейты одного шарда через consumer group.
+
+    Апдейты разных пользователей идут параллельно (до ``concurrency``), одного - строго
+    по очереди. Исключение - части одного альбома: они обрабатываются одновременно, иначе
+    ``MediaGroupMiddleware`` первой части ждал бы остальные, стоящие за ней в очереди.
+    XACK отправляется после обработки, поэтому апдейты, принятые упавшим воркером,
+    обработает следующий владелец шарда (at-least-once). Шард читает один процесс: владение
+    держится ключом в Redis, остальные воркеры этого шарда ждут в резерве.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        publisher: UpdateStreamPublisher,
+        dp: Dispatcher,
+        bot: Bot,
+        shard: int,
+        *,
+        concurrency: int,
+        **workflow_data: Any,  # noqa: ANN401
+    ) -> None:
+        self._redis = redis
+        self._dp = dp
+        self._bot = bot
+        self.shard = shard
+        self._stream = publisher.stream(shard)
+        self._owner_key = f"{self._stream}:owner"
+        self._owner = uuid.uuid4().hex
+        # Имя потребителя постоянное: новый владелец шарда забирает неподтверждённые апдейты прежнего
+        self._consumer = f"shard-{shard}"
+        self._concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        self._workflow_data = workflow_data
+        self._tails: dict[str, _Tail] = {}
+        self._refresh_owner = redis.register_script(_REDIS_REFRESH_OWNER)
+        self._release_owner = redis.register_script(_REDIS_RELEASE_OWNER)
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        try:
+            await self._redis.xgroup_create(self._stream, _GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        while not self._stopping.is_set():
+            try:
+                acquired = await self._redis.set(self._owner_key, self._owner, nx=True, px=int(_OWNER_TTL * 1000))
+                if not acquired:
+                    await self._wait(_OWNER_TTL / 3)
+                    continue
+                logger.info("Consuming updates of shard {}", self.shard)
+                try:
+                    # Владение продлевается независимо от чтения: оно может надолго встать
+                    # на ожидании свободного слота. Потеря владения отменяет чтение
+                    async with asyncio.TaskGroup() as tg:
+                        tg.create_task(self._keep_ownership())
+                        tg.create_task(self._consume())
+                except* _OwnershipLostError:
+                    logger.warning("Lost ownership of shard {}", self.shard)
+                    # Неподтверждённые апдейты повторит новый владелец, доделывать их здесь - обработать дважды
+                    self._cancel_in_flight()
+                finally:
+                    await self._drain()
+                    await self._release_owner(keys=[self._owner_key], args=[self._owner])
+            except Exception:  # noqa: BLE001
+                logger.exception("Update worker of shard {} failed", self.shard)
+                await self._wait(1.0)
+
+    async def _wait(self, seconds: float) -> None:
+        with suppress(TimeoutError):
+            async with asyncio.timeout(seconds):
+                await self._stopping.wait()
+
+    async def _keep_ownership(self) -> None:
+        """Продлевает ключ владельца, пока воркер не остановлен.
+
+        Ошибки Redis повторяются, пока ключ не мог истечь; дальше владение считается потерянным.
+        """
+        refreshed = time.monotonic()
+        while not self._stopping.is_set():
+            await self._wait(_OWNER_REFRESH_INTERVAL)
+            try:
+                owned = await self._refresh_owner(keys=[self._owner_key], args=[self._owner, int(_OWNER_TTL * 1000)])
+            except RedisError:
+                if time.monotonic() - refreshed + _OWNER_REFRESH_INTERVAL < _OWNER_TTL:
+                    logger.exception("Failed to refresh ownership of shard {}", self.shard)
+                    continue
+                raise _OwnershipLostError from None
+            if not owned:
+                raise _OwnershipLostError
+            refreshed = time.monotonic()
+
+    async def _consume(self) -> None:
+        # Сначала свои неподтверждённые апдейты (остались от упавшего владельца), затем новые
+        last_id = "0"
+        while not self._stopping.is_set():
+            response = await self._redis.xreadgroup(
+                _GROUP,
+                self._consumer,
+                {self._stream: last_id},
+                count=self._concurrency,
+                block=_READ_BLOCK_MS if last_id == ">" else None,
+            )
+            entries = response[0][1] if response else []
+            if last_id != ">":
+                if not entries:
+                    last_id = ">"
+                    continue
+                last_id = entries[-1][0]
+            for entry_id, fields in entries:
+                if not fields:
+                    # Запись вытеснена по MAXLEN, пока ждала подтверждения
+                    await self._redis.xack(self._stream, _GROUP, entry_id)
+                    continue
+                await self._slots.acquire()
+                self._schedule(entry_id, fields)
+
+    def _schedule(self, entry_id: str, fields: dict[str, str]) -> None:
+        key, group = fields["key"], fields.get("group")
+        tail = self._tails.get(key)
+        if group is not None and tail is not None and tail.group == group:
+            # Очередная часть альбома ждёт то же, что и первая, а следующие апдейты - весь альбом
+            tail.tasks.append(asyncio.create_task(self._process(tail.before, entry_id, fields)))
+        else:
+            previous = tail.tasks if tail is not None else []
+            tail = self._tails[key] = _Tail(
+                [asyncio.create_task(self._process(previous, entry_id, fields))],
+                group,
+                previous,
+            )
+
+        def forget(_: asyncio.Task[None]) -> None:
+            if self._tails.get(key) is tail and all(task.done() for task in tail.tasks):
+                del self._tails[key]
+
+        tail.tasks[-1].add_done_callback(forget)
+
+    async def _process(self, previous: list[asyncio.Task[None]], entry_id: str, fields: dict[str, str]) -> None:
+        try:
+            if previous:
+                await asyncio.wait(previous)
+            # Время в id записи - момент публикации апдейта
+            published = int(entry_id.split("-", maxsplit=1)[0]) / 1000
+            BOT_UPDATE_LAG.labels(shard=str(self.shard)).observe(time.time() - published)
+            update = Update.model_validate_json(fields["update"], context={"bot": self._bot})
+            try:
+                await self._dp.feed_update(self._bot, update, **self._workflow_data)
+            except Exception:  # noqa: BLE001
+                # Повтор упавшего обработчика не поможет, апдейт подтверждается как обработанный
+                logger.exception("Failed to process update {}", update.update_id)
+            await self._redis.xack(self._stream, _GROUP, entry_id)
+        finally:
+            self._slots.release()
+
+    def _cancel_in_flight(self) -> None:
+        for tail in self._tails.values():
+            for task in tail.tasks:
+                task.cancel()
+
+    async def _drain(self) -> None:
+        if self._tails:
+            await asyncio.gather(
+                *(task for tail in self._tails.values() for task in tail.tasks), return_exceptions=True
+            )
@@ -0,0 +1,172 @@
+import abc
+import asyncio
+import time
+import uuid
+from contextlib import suppress
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.types import Message
+from loguru import logger
+from redis.asyncio import Redis
+
+from core.utils.metrics import ALBUM_PARTS, ALBUMS_COLLECTED
+
+# Больше частей в одном альбоме Telegram не присылает
+MAX_ALBUM_SIZE = 10
+
+
+class AlbumCollector(abc.ABC):
+    """Собирает части альбома (сообщения с одним ``media_group_id``).
+
+    Первая часть становится ведущей: ждёт, пока части перестанут приходить ``quiet`` секунд
+    (таймер сбрасывается каждой новой частью), но не дольше ``max_wait``, или пока их не станет
+    ``MAX_ALBUM_SIZE``, и получает весь альбом. Остальные части получают None.
+    """
+
+    backend: str
+
+    def __init__(self, *, quiet: float, max_wait: float) -> None:
+        self._quiet = quiet
+        self._max_wait = max_wait
+
+    async def collect(self, message: Message, bot: Bot) -> list[Message] | None:
+        if not message.media_group_id:
+            return [message]
+        album = await self._collect(message.media_group_id, message, bot)
+        if album is not None:
+            ALBUMS_COLLECTED.labels(backend=self.backend).inc()
+            ALBUM_PARTS.labels(backend=self.backend).observe(len(album))
+        return album
+
+    @abc.abstractmethod
+    async def _collect(self, group_id: str, message: Message, bot: Bot) -> list[Message] | None: ...
+
+
+@dataclass(slots=True)
+class _PendingAlbum:
+    started: float
+    last_part: float
+    messages: list[Message] = field(default_factory=list)
+    arrived: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class MemoryAlbumCollector(AlbumCollector):
+    """Альбомы в памяти процесса: годится, когда все части одного альбома приходят в один процесс.
+
+    Не больше ``max_pending`` альбомов одновременно: сверх лимита часть обрабатывается как отдельное
+    сообщение. Альбом, пролежавший дольше ``ttl``, вытесняется, даже если ведущая часть пропала.
+    """
+
+    backend = "memory"
+
+    def __init__(self, *, quiet: float, max_wait: float, max_pending: int, ttl: float = 60.0) -> None:
+        super().__init__(quiet=quiet, max_wait=max_wait)
+        self._max_pending = max_pending
+        self._ttl = ttl
+        self._albums: dict[str, _PendingAlbum] = {}
+
+    def _evict(self, now: float) -> None:
+        expired = [group_id for group_id, album in self._albums.items() if now - album.started > self._ttl]
+        for group_id in expired:
+            del self._albums[group_id]
+
+    async def _collect(self, group_id: str, message: Message, bot: Bot) -> list[Message] | None:  # noqa: ARG002
+        now = time.monotonic()
+        album = self._albums.get(group_id)
+        if album is not None:
+            album.messages.append(message)
+            album.last_part = now
+            album.arrived.set()
+            return None
+
+        self._evict(now)
+        if len(self._albums) >= self._max_pending:
+            logger.warning("Too many pending albums, media group {} part is handled alone", group_id)
+            return [message]
+
+        album = self._albums[group_id] = _PendingAlbum(started=now, last_part=now, messages=[message])
+        try:
+            while len(album.messages) < MAX_ALBUM_SIZE:
+                album.arrived.clear()
+                remaining = min(album.last_part + self._quiet, album.started + self._max_wait) - time.monotonic()
+                if remaining <= 0:
+                    break
+                with suppress(TimeoutError):
+                    async with asyncio.timeout(remaining):
+                        await album.arrived.wait()
+        finally:
+            # Запоздавшая часть начнёт новый альбом, а не попадёт в уже обработанный
+            if self._albums.get(group_id) is album:
+                del self._albums[group_id]
+        return sorted(album.messages, key=lambda part: part.message_id)
+
+
+# Первая часть ставит ключ ведущего; части пишутся в список, время последней - в отдельный ключ
+_REDIS_ADD_PART = """
+redis.call('rpush', KEYS[1], ARGV[1])
+redis.call('pexpire', KEYS[1], ARGV[3])
+redis.call('set', KEYS[2], ARGV[4], 'PX', ARGV[3])
+if redis.call('set', KEYS[3], ARGV[2], 'NX', 'PX', ARGV[3]) then
+  return 1
+end
+return 0
+"""
+
+
+class RedisAlbumCollector(AlbumCollector):
+    """Альбомы в Redis: части одного альбома могут прийти в разные процессы.
+
+    Ведущая часть опрашивает Redis каждые ``poll_interval`` секунд и забирает альбом одной
+    транзакцией вместе с ключом ведущего, поэтому запоздавшая часть начнёт новый альбом.
+    """
+
+    backend = "redis"
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        quiet: float,
+        max_wait: float,
+        poll_interval: float = 0.05,
+        ttl: float = 60.0,
+        key_prefix: str = "album",
+    ) -> None:
+        super().__init__(quiet=quiet, max_wait=max_wait)
+        self._redis = redis
+        self._poll_interval = poll_interval
+        self._ttl_ms = int(ttl * 1000)
+        self._key_prefix = key_prefix
+        self._add_part = redis.register_script(_REDIS_ADD_PART)
+
+    async def _collect(self, group_id: str, message: Message, bot: Bot) -> list[Message] | None:
+        parts_key = f"{self._key_prefix}:{group_id}:parts"
+        last_key = f"{self._key_prefix}:{group_id}:last"
+        leader_key = f"{self._key_prefix}:{group_id}:leader"
+        payload = message.model_dump_json(exclude_none=True, by_alias=True)
+        is_leader = await self._add_part(
+            keys=[parts_key, last_key, leader_key],
+            args=[payload, uuid.uuid4().hex, self._ttl_ms, int(time.time() * 1000)],
+        )
+        if not is_leader:
+            return None
+
+        started = time.time()
+        while True:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.llen(parts_key)
+                pipe.get(last_key)
+                count, last_part_ms = await pipe.execute()
+            last_part = int(last_part_ms) / 1000 if last_part_ms else started
+            remaining = min(last_part + self._quiet, started + self._max_wait) - time.time()
+            if count >= MAX_ALBUM_SIZE or remaining <= 0:
+                break
+            await asyncio.sleep(min(self._poll_interval, remaining))
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.lrange(parts_key, 0, -1)
+            pipe.delete(parts_key, last_key, leader_key)
+            payloads, _ = await pipe.execute()
+        messages = [Message.model_validate_json(raw, context={"bot": bot}) for raw in payloads]
+        return sorted(messages, key=lambda part: part.message_id)
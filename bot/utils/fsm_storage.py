@@ -0,0 +1,155 @@
+from collections import defaultdict
+from collections.abc import Mapping
+from functools import partial
+from typing import Any, Literal, Self
+
+import msgpack
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import DEFAULT_DESTINY, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio import ConnectionPool, Redis
+
+from core.utils.metrics import FSM_BYTES, FSM_KEYS
+
+_PART_SUFFIXES = {"state": "s", "data": "d", "lock": "l"}
+_USAGE_BATCH = 500
+
+
+class CompactKeyBuilder(KeyBuilder):
+    """Короткие ключи: ``<prefix>:<chat>[:<thread>]:<user>[:<destiny>]:<s|d|l>``.
+
+    destiny пишется, только если отличается от ``default``.
+    """
+
+    def __init__(self, *, prefix: str = "f") -> None:
+        self.prefix = prefix
+
+    def build(self, key: StorageKey, part: Literal["data", "state", "lock"] | None = None) -> str:
+        parts = [self.prefix, str(key.chat_id)]
+        if key.thread_id:
+            parts.append(str(key.thread_id))
+        parts.append(str(key.user_id))
+        if key.destiny != DEFAULT_DESTINY:
+            parts.append(key.destiny)
+        if part:
+            parts.append(_PART_SUFFIXES[part])
+        return ":".join(parts)
+
+    def state_key(self, data_key: str) -> str:
+        """Ключ состояния того же контекста, что и ключ данных."""
+        return f"{data_key.removesuffix(_PART_SUFFIXES['data'])}{_PART_SUFFIXES['state']}"
+
+
+class CompactRedisStorage(RedisStorage):
+    """RedisStorage с msgpack вместо JSON, короткими ключами и TTL по состоянию.
+
+    TTL берётся из ``state_ttls`` по полному имени состояния (``RejectState:waiting_for_comment``)
+    или по группе (``RejectState``), иначе ``default_ttl``; ``None`` - без срока. Данные живут
+    столько же, сколько текущее состояние, поэтому брошенный сценарий исчезает целиком.
+    """
+
+    key_builder: CompactKeyBuilder
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        default_ttl: int | None = None,
+        state_ttls: Mapping[str, int] | None = None,
+    ) -> None:
+        super().__init__(
+            redis,
+            key_builder=CompactKeyBuilder(),
+            json_loads=partial(msgpack.unpackb, strict_map_key=False),
+            json_dumps=msgpack.packb,
+        )
+        self.default_ttl = default_ttl
+        self.state_ttls = dict(state_ttls or {})
+
+    @classmethod
+    def from_url(cls, url: str, connection_kwargs: dict[str, Any] | None = None, **kwargs: Any) -> Self:  # noqa: ANN401
+        pool = ConnectionPool.from_url(url, **(connection_kwargs or {}))
+        return cls(Redis(connection_pool=pool), **kwargs)
+
+    def ttl_for(self, state: str | None) -> int | None:
+        if state is not None:
+            ttl = self.state_ttls.get(state, self.state_ttls.get(state.split(":", 1)[0]))
+            if ttl is not None:
+                return ttl or None
+        return self.default_ttl
+
+    def dump_data(self, data: Mapping[str, Any]) -> bytes:
+        # json_dumps у RedisStorage типизирован как str, поэтому msgpack вызывается напрямую
+        return msgpack.packb(data)
+
+    def load_data(self, value: bytes | None) -> dict[str, Any]:
+        return self.json_loads(value) if value is not None else {}
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state_key = self.key_builder.build(key, "state")
+        data_key = self.key_builder.build(key, "data")
+        value = state.state if isinstance(state, State) else state
+        ttl = self.ttl_for(value)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if value is None:
+                pipe.delete(state_key)
+            else:
+                pipe.set(state_key, value, ex=ttl)
+            # Срок данных следует за состоянием
+            if ttl is None:
+                pipe.persist(data_key)
+            else:
+                pipe.expire(data_key, ttl)
+            await pipe.execute()
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        data_key = self.key_builder.build(key, "data")
+        if not data:
+            await self.redis.delete(data_key)
+            return
+        # Без сессии FSM срок данных требует ещё одного чтения состояния
+        state = await self.get_state(key)
+        await self.redis.set(data_key, self.dump_data(data), ex=self.ttl_for(state))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return self.load_data(await self.redis.get(self.key_builder.build(key, "data")))
+
+    async def collect_usage(self) -> dict[str, tuple[int, int]]:
+        """Число ключей и байт значений по состояниям; данные без состояния - под ``none``."""
+        usage: defaultdict[str, list[int]] = defaultdict(lambda: [0, 0])
+        batch: list[str] = []
+        async for raw_key in self.redis.scan_iter(match=f"{self.key_builder.prefix}:*", count=_USAGE_BATCH):
+            key = raw_key.decode() if isinstance(raw_key, bytes) else raw_key
+            if key.endswith((":s", ":d")):
+                batch.append(key)
+            if len(batch) >= _USAGE_BATCH:
+                await self._count_usage(batch, usage)
+                batch = []
+        if batch:
+            await self._count_usage(batch, usage)
+        return {state: (count, size) for state, (count, size) in usage.items()}
+
+    async def _count_usage(self, keys: list[str], usage: defaultdict[str, list[int]]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.get(key if key.endswith(":s") else self.key_builder.state_key(key))
+                pipe.strlen(key)
+            results = await pipe.execute()
+        for state, size in zip(results[::2], results[1::2], strict=True):
+            label = state.decode() if isinstance(state, bytes) else state or "none"
+            usage[label][0] += 1
+            usage[label][1] += size
+
+
+async def report_fsm_usage(storage: CompactRedisStorage) -> None:
+    usage = await storage.collect_usage()
+    # Состояния, от которых не осталось ключей, пропадают из метрик
+    FSM_KEYS.clear()
+    FSM_BYTES.clear()
+    for state, (count, size) in usage.items():
+        FSM_KEYS.labels(state=state).set(count)
+        FSM_BYTES.labels(state=state).set(size)
@@ -0,0 +1,130 @@
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+
+from core.utils.metrics import TELEGRAM_SEND_QUEUE, TELEGRAM_SEND_WAIT
+
+# Запас для личных чатов: короткая серия ответов уходит без задержки
+_PRIVATE_BURST = 3
+# Бакеты, простоявшие дольше, заполнены до краёв и ничем не отличаются от новых
+_PRUNE_INTERVAL = 60.0
+
+
+class SendPriority(IntEnum):
+    """Меньше - раньше: ответ в чат текущего апдейта обгоняет уведомления."""
+
+    INTERACTIVE = 0
+    NOTIFICATION = 1
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float, now: float) -> float:
+        """Сколько ждать, пока накопится ``cost`` токенов (не больше ёмкости)."""
+        self._refill(now)
+        return max(0.0, (min(cost, self.capacity) - self.tokens) / self.rate)
+
+    def take(self, cost: float, now: float) -> None:
+        # Баланс может уйти в минус: дорогой запрос (альбом) отодвигает следующие
+        self._refill(now)
+        self.tokens -= cost
+
+    def reserve(self, cost: float, now: float) -> float:
+        """Списывает токены сразу и возвращает, сколько ждать до своей очереди."""
+        wait = self.delay(cost, now)
+        self.take(cost, now)
+        return wait
+
+    def pause(self, seconds: float, now: float) -> None:
+        # Следующий токен появится ровно через ``seconds``; уже выданные резервы сдвигаются следом
+        self._refill(now)
+        self.tokens = min(self.tokens, 1.0) - seconds * self.rate
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class TelegramRateLimiter:
+    """Token bucket на весь бот и на каждый чат.
+
+    Лимит чата соблюдается в порядке обращения. Общий лимит раздаётся по приоритету:
+    ожидающие ``INTERACTIVE`` получают токен раньше любых ``NOTIFICATION``.
+    Состояние локально для процесса.
+    """
+
+    def __init__(self, *, global_rate: float, chat_rate: float, group_rate: float) -> None:
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._group_rate = group_rate
+        self._chats: dict[int | str, TokenBucket] = {}
+        self._waiters: list[tuple[SendPriority, int, float, asyncio.Future[None]]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._pruned = time.monotonic()
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Отрицательный id или @username - группа или канал, у них свой, более жёсткий лимит
+            if isinstance(chat_id, str) or chat_id < 0:
+                bucket = TokenBucket(self._group_rate, 1)
+            else:
+                bucket = TokenBucket(self._chat_rate, _PRIVATE_BURST)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        if now - self._pruned < _PRUNE_INTERVAL:
+            return
+        self._pruned = now
+        self._chats = {chat_id: bucket for chat_id, bucket in self._chats.items() if not bucket.is_full(now)}
+
+    def _pump(self) -> None:
+        self._timer = None
+        now = time.monotonic()
+        while self._waiters:
+            _, _, cost, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._global.delay(cost, now)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._pump)
+                return
+            heapq.heappop(self._waiters)
+            self._global.take(cost, now)
+            future.set_result(None)
+
+    async def acquire(self, chat_id: int | str, priority: SendPriority, cost: float = 1) -> None:
+        started = time.monotonic()
+        TELEGRAM_SEND_QUEUE.labels(priority=priority.name.lower()).inc()
+        try:
+            self._prune(started)
+            chat_wait = self._chat_bucket(chat_id).reserve(cost, started)
+            if chat_wait > 0:
+                await asyncio.sleep(chat_wait)
+
+            future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), cost, future))
+            if self._timer is None:
+                self._pump()
+            await future
+        finally:
+            TELEGRAM_SEND_QUEUE.labels(priority=priority.name.lower()).dec()
+            TELEGRAM_SEND_WAIT.labels(priority=priority.name.lower()).observe(time.monotonic() - started)
+
+    def pause(self, chat_id: int | str, seconds: float) -> None:
+        """Отодвигает отправку в чат после flood control (``retry_after``) от Telegram."""
+        self._chat_bucket(chat_id).pause(seconds, time.monotonic())
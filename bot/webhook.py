@@ -0,0 +1,72 @@
+import asyncio
+import secrets
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from loguru import logger
+
+from bot.update_stream import UpdateStreamPublisher
+
+
+class WebhookUpdateFeeder:
+    """Передаёт апдейты из webhook-запросов в ``Dispatcher.feed_update``.
+
+    Апдейт обрабатывается в фоне, Telegram сразу получает 200. Одновременно
+    обрабатывается не больше ``max_in_flight`` апдейтов: сверх лимита запрос
+    отклоняется, и Telegram повторит доставку позже.
+
+    С ``publisher`` апдейт только записывается в поток шарда, обрабатывают его воркеры.
+    """
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        *,
+        secret_token: str,
+        max_in_flight: int,
+        publisher: UpdateStreamPublisher | None = None,
+        **workflow_data: Any,  # noqa: ANN401
+    ) -> None:
+        self.dp = dp
+        self.bot = bot
+        self._secret_token = secret_token
+        self._max_in_flight = max_in_flight
+        self._publisher = publisher
+        self._workflow_data = workflow_data
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._closing = False
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def check_secret(self, token: str | None) -> bool:
+        return token is not None and secrets.compare_digest(token, self._secret_token)
+
+    async def submit(self, payload: dict[str, Any]) -> bool:
+        """Ставит апдейт в обработку; False, если лимит исчерпан или идёт остановка."""
+        if self._closing or len(self._tasks) >= self._max_in_flight:
+            return False
+        if self._publisher is not None:
+            # 200 уходит только после записи в Redis, иначе Telegram повторит доставку
+            await self._publisher.publish(payload)
+            return True
+        update = Update.model_validate(payload, context={"bot": self.bot})
+        task = asyncio.create_task(self._feed(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _feed(self, update: Update) -> None:
+        try:
+            await self.dp.feed_update(self.bot, update, **self._workflow_data)
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to process update {}", update.update_id)
+
+    async def close(self) -> None:
+        """Перестаёт принимать апдейты и дожидается уже принятых."""
+        self._closing = True
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
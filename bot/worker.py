@@ -0,0 +1,102 @@
+"""Воркер апдейтов: ``python -m bot.worker --shard 0 --shard 1``.
+
+При ``BOT_UPDATE_SHARDS > 0`` основной процесс только принимает апдейты и раскладывает
+их по потокам Redis, а обработчики бота выполняются в этих процессах.
+"""
+
+import argparse
+import asyncio
+import signal
+from contextlib import suppress
+
+from loguru import logger
+from prometheus_client import start_http_server
+from redis.asyncio import Redis
+
+from bot.factory import create_bot, create_dispatcher, create_fsm_storage
+from bot.outbox import OutboxDispatcher
+from bot.update_stream import UpdateStreamPublisher, UpdateStreamWorker
+from core.config import Settings
+from core.di import container
+from core.utils.logging_config import setup_logging
+from core.utils.nextcloud import NextcloudUtils
+from core.utils.warmup import warm_up
+
+
+async def _run(shards: list[int], settings: Settings) -> None:
+    setup_logging(settings)
+    await warm_up(container, settings)
+    bot = create_bot(settings)
+    dp = create_dispatcher(settings, container, create_fsm_storage(settings))
+    redis = await container.get(Redis)
+    publisher = UpdateStreamPublisher(
+        redis,
+        shards=settings.BOT_UPDATE_SHARDS,
+        maxlen=settings.BOT_UPDATE_STREAM_MAXLEN,
+    )
+    workers = [
+        UpdateStreamWorker(
+            redis,
+            publisher,
+            dp,
+            bot,
+            shard,
+            concurrency=settings.BOT_WORKER_CONCURRENCY,
+            settings=settings,
+        )
+        for shard in shards
+    ]
+    # Outbox разбирается и здесь: сообщения, записанные обработчиками, уходят сразу после commit
+    outbox_dispatcher = OutboxDispatcher(
+        container,
+        bot,
+        await container.get(NextcloudUtils),
+        poll_interval=settings.OUTBOX_POLL_INTERVAL,
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        lease_seconds=settings.OUTBOX_LEASE_SECONDS,
+        max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await dp.emit_startup(bot=bot, settings=settings)
+    outbox_task = asyncio.create_task(outbox_dispatcher.run())
+    worker_tasks = [asyncio.create_task(worker.run()) for worker in workers]
+    logger.info("Update worker started for shards {}", shards)
+    try:
+        await stop.wait()
+    finally:
+        # Принятые апдейты дорабатываются и подтверждаются, новые останутся в потоке
+        for worker in workers:
+            worker.stop()
+        await asyncio.gather(*worker_tasks, return_exceptions=True)
+        outbox_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await outbox_task
+        await dp.emit_shutdown(bot=bot, settings=settings)
+        await bot.session.close()
+        await dp.storage.close()
+        await container.close()
+
+
+def main() -> None:
+    settings = Settings()
+    parser = argparse.ArgumentParser(description="Обработка апдейтов бота из потоков Redis")
+    parser.add_argument("--shard", type=int, action="append", dest="shards", help="номер шарда; по умолчанию все")
+    parser.add_argument("--metrics-port", type=int, default=0, help="порт для метрик Prometheus; 0 - не поднимать")
+    args = parser.parse_args()
+    if settings.BOT_UPDATE_SHARDS <= 0:
+        parser.error("BOT_UPDATE_SHARDS must be positive to run update workers")
+    shards = sorted(set(args.shards or range(settings.BOT_UPDATE_SHARDS)))
+    if not all(0 <= shard < settings.BOT_UPDATE_SHARDS for shard in shards):
+        parser.error(f"shards must be in 0..{settings.BOT_UPDATE_SHARDS - 1}")
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    asyncio.run(_run(shards, settings))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pathlib import PurePosixPath
-from typing import Any
+from typing import Any, Literal
 
 from loguru import logger
 from pydantic import Field, SecretStr, computed_field
@@ -23,6 +23,7 @@ class Settings(BaseSettings):
     NEXTCLOUD_AUTH: tuple[str, str]
     NEXTCLOUD_DIRECTORIES: list[PurePosixPath]
     NEXTCLOUD_OCS_URL: str
+    NEXTCLOUD_MAX_CONNECTIONS: int = 20
 
     DATABASE_HOST: str
     DATABASE_PORT: int = 5432
@@ -33,30 +34,81 @@ class Settings(BaseSettings):
     DATABASE_ECHO: bool = False
     DATABASE_POOL_SIZE: int = 5
     DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_WEBHOOK_POOL_SIZE: int = 2
+    DATABASE_WEBHOOK_MAX_OVERFLOW: int = 3
+    DATABASE_BACKGROUND_POOL_SIZE: int = 2
+    DATABASE_BACKGROUND_MAX_OVERFLOW: int = 0
+    DATABASE_LOCK_POOL_SIZE: int = 2
+    DATABASE_LOCK_MAX_OVERFLOW: int = 8
+    DATABASE_POOL_TIMEOUT: float = 30.0
     DATABASE_POOL_PRE_PING: bool = False
+    DATABASE_QUERY_CACHE_SIZE: int = 500
+    DATABASE_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DATABASE_LAZY_UOW: bool = False
+    DATABASE_WARMUP_CONNECTIONS: int = 2
+    DATABASE_SQL_STATS: bool = False
+    DATABASE_N_PLUS_ONE_THRESHOLD: int = 5
     DATABASE_ADDITIONAL_CONNECTION_PARAMS: dict[str, Any] = {}
+    DATABASE_REPLICA_HOST: str | None = None
+    DATABASE_REPLICA_PORT: int | None = None
 
-    @computed_field  # type: ignore[prop-decorator]
-    @property
-    def SQLALCHEMY_DATABASE_URI(self) -> MultiHostUrl:  # noqa: N802
+    def _build_uri(self, host: str, port: int) -> MultiHostUrl:
         additional_connection_params = "&".join(
             f"{key}={value}" for key, value in self.DATABASE_ADDITIONAL_CONNECTION_PARAMS.items()
         )
         logger.info(f"Additional connection params: {additional_connection_params}")
         return MultiHostUrl.build(
             scheme="postgresql+asyncpg",
-            host=self.DATABASE_HOST,
-            port=self.DATABASE_PORT,
+            host=host,
+            port=port,
             username=self.DATABASE_USER,
             password=self.DATABASE_PASSWORD,
             path=self.DATABASE_NAME,
             query=additional_connection_params,
         )
 
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def SQLALCHEMY_DATABASE_URI(self) -> MultiHostUrl:  # noqa: N802
+        return self._build_uri(self.DATABASE_HOST, self.DATABASE_PORT)
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def SQLALCHEMY_REPLICA_DATABASE_URI(self) -> MultiHostUrl | None:  # noqa: N802
+        if not self.DATABASE_REPLICA_HOST:
+            return None
+        return self._build_uri(self.DATABASE_REPLICA_HOST, self.DATABASE_REPLICA_PORT or self.DATABASE_PORT)
+
     BOT_TOKEN: str
     BOT_SECRET: SecretStr
     BOT_DEEP_LINK_TTL: int = 300
     BOT_DEEP_LINK_TAG_LEN: int = 8
+    BOT_MODE: Literal["polling", "webhook"] = "polling"
+    BOT_WEBHOOK_BASE_URL: str | None = None
+    BOT_WEBHOOK_SECRET: SecretStr | None = None
+    BOT_WEBHOOK_MAX_CONNECTIONS: int = 40
+    BOT_WEBHOOK_MAX_IN_FLIGHT: int = 100
+    BOT_SEND_GLOBAL_RATE: float = 30.0
+    BOT_SEND_CHAT_RATE: float = 1.0
+    BOT_SEND_GROUP_RATE_PER_MINUTE: float = 20.0
+    BOT_SEND_MAX_RETRIES: int = 3
+    BOT_SLOW_UPDATE_THRESHOLD: float = 2.0
+    BOT_FSM_SESSION: bool = False
+    BOT_FSM_TTL: int = 7 * 24 * 3600
+    BOT_FSM_STATE_TTLS: dict[str, int] = {
+        "RejectState": 3600,
+        "CheckCategoriesView": 3600,
+        "ExpertPreAnno": 3600,
+        "RegistrationState": 24 * 3600,
+    }
+    BOT_FSM_STATS_INTERVAL: float = 300.0
+    BOT_ALBUM_BACKEND: Literal["memory", "redis"] = "memory"
+    BOT_ALBUM_QUIET: float = 0.3
+    BOT_ALBUM_MAX_WAIT: float = 2.0
+    BOT_ALBUM_MAX_PENDING: int = 1000
+    BOT_UPDATE_SHARDS: int = 0
+    BOT_UPDATE_STREAM_MAXLEN: int = 100_000
+    BOT_WORKER_CONCURRENCY: int = 50
 
     REDIS_HOST: str
     REDIS_PORT: int
@@ -75,6 +127,28 @@ class Settings(BaseSettings):
         )
 
     ITERATION_LIMIT: int = 3
+    ASSIGNMENT_ENGINE: Literal["postgres", "redis"] = "postgres"
+    ASSIGNMENT_RECONCILE_INTERVAL: float = 300.0
+
+    STATUS_HISTORY_PARTITIONS_AHEAD: int = 3
+    STATUS_HISTORY_RETENTION_MONTHS: int | None = None
+    STATUS_HISTORY_ARCHIVE: bool = True
+    STATUS_HISTORY_MAINTENANCE_INTERVAL: float = 86400.0
+
+    STATS_REFRESH_INTERVAL: float = 60.0
+    STATS_REFRESH_LAG_SECONDS: int = 120
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_LEASE_SECONDS: float = 60.0
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_RETENTION_DAYS: int = 7
+
+    EXPORT_API_TOKEN: SecretStr | None = None
+    EXPORT_FETCH_SIZE: int = 1000
+
+    LOCK_BACKEND: Literal["redis", "postgres"] = "redis"
+    LOCK_TIMEOUT: float = 10.0
+    LOCK_TTL: float = 60.0
     SHARE_LINK_TTL_HOURS: int = 24
 
     model_config = SettingsConfigDict(
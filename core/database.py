@@ -1,8 +1,12 @@
+from enum import StrEnum
+
 from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 
 from core.config import Settings
+from core.utils.pool_telemetry import InstrumentedAsyncAdaptedQueuePool, instrument_engine
+from core.utils.sql_instrumentation import instrument_sql
 
 _POSTGRES_INDEXES_NAMING_CONVENTION = {
     "ix": "%(column_0_label)s_idx",
@@ -15,22 +19,93 @@ metadata = MetaData(naming_convention=_POSTGRES_INDEXES_NAMING_CONVENTION)
 Base = declarative_base(metadata=metadata)
 
 
+class DatabaseWorkload(StrEnum):
+    """Тип нагрузки; у каждого свой пул, чтобы они не вытесняли друг друга."""
+
+    BOT = "bot"
+    WEBHOOK = "webhook"
+    BACKGROUND = "background"
+    LOCKS = "locks"
+
+
 class DatabaseManager:
     async_session_maker: async_sessionmaker[AsyncSession]
 
     def __init__(self, settings: Settings) -> None:
-        self.engine = create_async_engine(
-            str(settings.SQLALCHEMY_DATABASE_URI),
-            connect_args={"server_settings": {"search_path": settings.DATABASE_SCHEMA}},
-            echo=settings.DATABASE_ECHO,
-        )
-        self.async_session_maker = async_sessionmaker(
-            self.engine,
+        url = str(settings.SQLALCHEMY_DATABASE_URI)
+        pool_limits = {
+            DatabaseWorkload.BOT: (settings.DATABASE_POOL_SIZE, settings.DATABASE_MAX_OVERFLOW),
+            DatabaseWorkload.WEBHOOK: (settings.DATABASE_WEBHOOK_POOL_SIZE, settings.DATABASE_WEBHOOK_MAX_OVERFLOW),
+            DatabaseWorkload.BACKGROUND: (
+                settings.DATABASE_BACKGROUND_POOL_SIZE,
+                settings.DATABASE_BACKGROUND_MAX_OVERFLOW,
+            ),
+            # Соединение занято, пока держится advisory-блокировка (LOCK_BACKEND=postgres)
+            DatabaseWorkload.LOCKS: (settings.DATABASE_LOCK_POOL_SIZE, settings.DATABASE_LOCK_MAX_OVERFLOW),
+        }
+        self.engines: dict[DatabaseWorkload, AsyncEngine] = {
+            workload: self._create_engine(settings, url, workload.value, *pool_limits[workload])
+            for workload in DatabaseWorkload
+        }
+        self.session_makers: dict[DatabaseWorkload, async_sessionmaker[AsyncSession]] = {
+            workload: self._create_session_maker(engine) for workload, engine in self.engines.items()
+        }
+        self.engine = self.engines[DatabaseWorkload.BOT]
+        self.async_session_maker = self.session_makers[DatabaseWorkload.BOT]
+
+        # Чтение: реплика, если она настроена, иначе основной пул бота. В обоих случаях READ ONLY транзакции.
+        replica_url = settings.SQLALCHEMY_REPLICA_DATABASE_URI
+        self.replica_engine: AsyncEngine | None = None
+        if replica_url is not None:
+            self.replica_engine = self._create_engine(
+                settings,
+                str(replica_url),
+                "replica",
+                *pool_limits[DatabaseWorkload.BOT],
+            )
+        self.readonly_engine = (self.replica_engine or self.engine).execution_options(postgresql_readonly=True)
+        self.readonly_session_maker = self._create_session_maker(self.readonly_engine)
+
+    def get_session_maker(self, workload: DatabaseWorkload) -> async_sessionmaker[AsyncSession]:
+        return self.session_makers[workload]
+
+    @staticmethod
+    def _create_session_maker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+        return async_sessionmaker(
+            engine,
             class_=AsyncSession,
             expire_on_commit=False,
             autoflush=False,
             autocommit=False,
         )
 
+    @staticmethod
+    def _create_engine(settings: Settings, url: str, label: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+        engine = create_async_engine(
+            url,
+            connect_args={
+                "server_settings": {
+                    "search_path": settings.DATABASE_SCHEMA,
+                    "application_name": f"{settings.APP_NAME}:{label}"[:63],
+                },
+                "prepared_statement_cache_size": settings.DATABASE_PREPARED_STATEMENT_CACHE_SIZE,
+            },
+            echo=settings.DATABASE_ECHO,
+            query_cache_size=settings.DATABASE_QUERY_CACHE_SIZE,
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            pool_logging_name=label,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+            pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        )
+        instrument_engine(engine, workload=label, capacity=pool_size + max_overflow)
+        if settings.DATABASE_SQL_STATS:
+            instrument_sql(engine)
+        return engine
+
     async def close_db(self) -> None:
-        await self.engine.dispose()
+        for engine in self.engines.values():
+            await engine.dispose()
+        if self.replica_engine is not None:
+            await self.replica_engine.dispose()
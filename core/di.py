@@ -1,14 +1,19 @@
 from collections.abc import AsyncGenerator
+from typing import Annotated
 
-from dishka import Provider, Scope, from_context, provide
+from dishka import FromComponent, Provider, Scope, from_context, provide
 from dishka.async_container import make_async_container
 from loguru import logger
+from redis.asyncio import Redis
 
+from bot.utils.album_collector import AlbumCollector, MemoryAlbumCollector, RedisAlbumCollector
 from bot.utils.deep_link_codec import DeepLinkCodec
 from core.config import Settings
-from core.database import DatabaseManager
-from core.unit_of_work import IUnitOfWork, SqlAlchemyUnitOfWork
+from core.database import DatabaseManager, DatabaseWorkload
+from core.unit_of_work import IReadOnlyUnitOfWork, IUnitOfWork, SqlAlchemyReadOnlyUnitOfWork, SqlAlchemyUnitOfWork
+from core.utils.locks import LockManager, PostgresLockManager, RedisLockManager
 from core.utils.nextcloud import NextcloudUtils
+from core.utils.study_queue import StudyReadyQueue
 
 
 class SQLARepoProvider(Provider):
@@ -40,20 +45,117 @@ class SQLARepoProvider(Provider):
     async def get_nextcloud_util(
         self,
         settings: Settings,
-    ) -> NextcloudUtils:
-        return NextcloudUtils(settings=settings)
+    ) -> AsyncGenerator[NextcloudUtils]:
+        nc_util = NextcloudUtils(settings=settings)
+        yield nc_util
+        await nc_util.aclose()
+
+    @provide(scope=Scope.APP)
+    async def get_redis(
+        self,
+        settings: Settings,
+    ) -> AsyncGenerator[Redis]:
+        redis = Redis.from_url(str(settings.REDIS_URI), decode_responses=True)
+        yield redis
+        await redis.aclose()
+
+    @provide(scope=Scope.APP)
+    async def get_study_ready_queue(
+        self,
+        redis: Redis,
+    ) -> StudyReadyQueue:
+        return StudyReadyQueue(redis)
+
+    @provide(scope=Scope.APP)
+    async def get_lock_manager(
+        self,
+        settings: Settings,
+        db_manager: DatabaseManager,
+        redis: Redis,
+    ) -> LockManager:
+        if settings.LOCK_BACKEND == "postgres":
+            return PostgresLockManager(
+                db_manager.engines[DatabaseWorkload.LOCKS],
+                timeout=settings.LOCK_TIMEOUT,
+                ttl=settings.LOCK_TTL,
+            )
+        return RedisLockManager(redis, timeout=settings.LOCK_TIMEOUT, ttl=settings.LOCK_TTL)
+
+    @provide(scope=Scope.APP)
+    async def get_album_collector(
+        self,
+        settings: Settings,
+        redis: Redis,
+    ) -> AlbumCollector:
+        if settings.BOT_ALBUM_BACKEND == "redis":
+            return RedisAlbumCollector(redis, quiet=settings.BOT_ALBUM_QUIET, max_wait=settings.BOT_ALBUM_MAX_WAIT)
+        return MemoryAlbumCollector(
+            quiet=settings.BOT_ALBUM_QUIET,
+            max_wait=settings.BOT_ALBUM_MAX_WAIT,
+            max_pending=settings.BOT_ALBUM_MAX_PENDING,
+        )
 
     @provide(scope=Scope.REQUEST)
     async def get_sqla_unit_of_work(
         self,
         db_manager: DatabaseManager,
+        settings: Settings,
     ) -> IUnitOfWork:
         logger.debug("UoW creation...")
-        return SqlAlchemyUnitOfWork(db_manager.async_session_maker)
+        return SqlAlchemyUnitOfWork(
+            db_manager.get_session_maker(DatabaseWorkload.BOT),
+            lazy=settings.DATABASE_LAZY_UOW,
+        )
+
+    @provide(scope=Scope.REQUEST)
+    async def get_sqla_readonly_unit_of_work(
+        self,
+        db_manager: DatabaseManager,
+        settings: Settings,
+    ) -> IReadOnlyUnitOfWork:
+        logger.debug("Read-only UoW creation...")
+        return SqlAlchemyReadOnlyUnitOfWork(
+            db_manager.readonly_session_maker,
+            lazy=settings.DATABASE_LAZY_UOW,
+        )
+
+
+class WebhookRepoProvider(Provider):
+    component = DatabaseWorkload.WEBHOOK
+
+    @provide(scope=Scope.REQUEST)
+    async def get_sqla_unit_of_work(
+        self,
+        db_manager: Annotated[DatabaseManager, FromComponent()],
+        settings: Annotated[Settings, FromComponent()],
+    ) -> IUnitOfWork:
+        logger.debug("Webhook UoW creation...")
+        return SqlAlchemyUnitOfWork(
+            db_manager.get_session_maker(DatabaseWorkload.WEBHOOK),
+            lazy=settings.DATABASE_LAZY_UOW,
+        )
+
+
+class BackgroundRepoProvider(Provider):
+    component = DatabaseWorkload.BACKGROUND
+
+    @provide(scope=Scope.REQUEST)
+    async def get_sqla_unit_of_work(
+        self,
+        db_manager: Annotated[DatabaseManager, FromComponent()],
+        settings: Annotated[Settings, FromComponent()],
+    ) -> IUnitOfWork:
+        logger.debug("Background UoW creation...")
+        return SqlAlchemyUnitOfWork(
+            db_manager.get_session_maker(DatabaseWorkload.BACKGROUND),
+            lazy=settings.DATABASE_LAZY_UOW,
+        )
 
 
 container = make_async_container(
     SQLARepoProvider(),
+    WebhookRepoProvider(),
+    BackgroundRepoProvider(),
     context={
         Settings: Settings(),
     },
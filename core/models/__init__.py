@@ -1,9 +1,23 @@
 from core.models.base import BaseModel
 from core.models.batch import Batch
+from core.models.outbox import OutboxMessage
 from core.models.project import Project
 from core.models.study import Study
 from core.models.study_category import StudyCategory
+from core.models.study_stats import StudyStateDurationDaily, StudyStatsWatermark, StudyTransitionDaily
 from core.models.study_status_history import StudyStatusHistory
 from core.models.user import User
 
-__all__ = ["BaseModel", "Batch", "Project", "Study", "StudyCategory", "StudyStatusHistory", "User"]
+__all__ = [
+    "BaseModel",
+    "Batch",
+    "OutboxMessage",
+    "Project",
+    "Study",
+    "StudyCategory",
+    "StudyStateDurationDaily",
+    "StudyStatsWatermark",
+    "StudyStatusHistory",
+    "StudyTransitionDaily",
+    "User",
+]
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, String, func
+from sqlalchemy import DateTime, String, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql.schema import ForeignKey
 
@@ -14,6 +14,9 @@ if TYPE_CHECKING:
 
 
 class Batch(BaseModel):
+    # Цель составного внешнего ключа study (batch_id, project_id)
+    __table_args__ = (UniqueConstraint("id", "project_id", name="batch_id_project_id_key"),)
+
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(128), nullable=False, unique=True)
     project_id: Mapped[int] = mapped_column(ForeignKey("project.id"), nullable=False, index=True)
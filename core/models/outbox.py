@@ -0,0 +1,51 @@
+import enum
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import BigInteger, DateTime, Enum, Index, SmallInteger, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.models.base import BaseModel
+
+
+class OutboxKind(enum.Enum):
+    TELEGRAM = "telegram"
+    NEXTCLOUD_COPY = "nextcloud_copy"
+
+
+class OutboxStatus(enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"
+
+
+class OutboxMessage(BaseModel):
+    """Побочный эффект, записанный в одной транзакции со сменой состояния.
+
+    Доставляет диспетчер outbox: по каждому ``recipient`` строго по порядку ``id``,
+    с повторами. ``dedup_key`` не даёт поставить один и тот же эффект дважды.
+    """
+
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # Очередь маленькая, поэтому оба индекса частичные - только по ожидающим строкам
+        Index("outbox_pending_idx", "id", postgresql_where=text("status = 'PENDING'")),
+        Index("outbox_pending_recipient_idx", "recipient", "id", postgresql_where=text("status = 'PENDING'")),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    kind: Mapped[OutboxKind] = mapped_column(Enum(OutboxKind, name="outbox_kind"), nullable=False)
+    recipient: Mapped[str] = mapped_column(String(255), nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    dedup_key: Mapped[str | None] = mapped_column(String(255), unique=True, nullable=True)
+    status: Mapped[OutboxStatus] = mapped_column(
+        Enum(OutboxStatus, name="outbox_status"),
+        nullable=False,
+        default=OutboxStatus.PENDING,
+    )
+    attempts: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    processed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -1,7 +1,7 @@
 import enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Enum, ForeignKey, SmallInteger, String
+from sqlalchemy import Enum, ForeignKey, ForeignKeyConstraint, Index, SmallInteger, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.models.base import BaseModel
@@ -27,10 +27,57 @@ class StudyStatusEnum(enum.Enum):
     CLOSED_F = "closed_f"
 
 
+_ACTIVE_STATUSES = frozenset(
+    {
+        StudyStatusEnum.ASSIGNED,
+        StudyStatusEnum.WAITING_REVIEW,
+        StudyStatusEnum.IN_REVIEW,
+        StudyStatusEnum.WAITING_REWORK,
+        StudyStatusEnum.REWORK,
+        StudyStatusEnum.PENDING_CONFIRMATION,
+    },
+)
+# Допустимые переходы: целевой статус -> статусы, из которых в него можно перейти.
+# Репозиторий применяет переход условным UPDATE, поэтому гонки между обработчиками
+# и процессами разрешает база, а не блокировки в памяти.
+STUDY_TRANSITIONS: dict[StudyStatusEnum, frozenset[StudyStatusEnum]] = {
+    StudyStatusEnum.NEW: _ACTIVE_STATUSES,  # сброс администратором
+    StudyStatusEnum.ASSIGNED: frozenset({StudyStatusEnum.NEW}),
+    StudyStatusEnum.WAITING_REVIEW: frozenset({StudyStatusEnum.ASSIGNED, StudyStatusEnum.REWORK}),
+    StudyStatusEnum.PENDING_CONFIRMATION: frozenset({StudyStatusEnum.ASSIGNED, StudyStatusEnum.REWORK}),
+    StudyStatusEnum.IN_REVIEW: frozenset({StudyStatusEnum.WAITING_REVIEW, StudyStatusEnum.PENDING_CONFIRMATION}),
+    StudyStatusEnum.WAITING_REWORK: frozenset({StudyStatusEnum.IN_REVIEW}),
+    StudyStatusEnum.REWORK: frozenset({StudyStatusEnum.WAITING_REWORK}),
+    StudyStatusEnum.APPROVED: frozenset({StudyStatusEnum.IN_REVIEW}),
+    StudyStatusEnum.APPROVED_F: frozenset({StudyStatusEnum.IN_REVIEW}),
+    StudyStatusEnum.CLOSED_N: frozenset({StudyStatusEnum.IN_REVIEW}),
+    StudyStatusEnum.CLOSED_I: frozenset({StudyStatusEnum.IN_REVIEW}),
+    StudyStatusEnum.CLOSED_OP: frozenset({StudyStatusEnum.IN_REVIEW}),
+    StudyStatusEnum.CLOSED_F: frozenset({StudyStatusEnum.IN_REVIEW}),
+}
+
+
 class Study(BaseModel):
+    __table_args__ = (
+        # project_id дублирует batch.project_id, чтобы горячие запросы обходились без join;
+        # составной ключ не даёт им разойтись
+        ForeignKeyConstraint(
+            ["batch_id", "project_id"],
+            ["batch.id", "batch.project_id"],
+            name="study_batch_id_project_id_fkey",
+            ondelete="RESTRICT",
+            onupdate="CASCADE",
+        ),
+        # Очередь на разметку: только NEW, в порядке id - размер не растёт вместе с закрытыми исследованиями
+        Index("study_project_id_id_new_idx", "project_id", "id", postgresql_where=text("status = 'NEW'")),
+        Index("study_annotator_id_status_idx", "annotator_id", "status"),
+        Index("study_expert_id_status_idx", "expert_id", "status"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     study_iuid: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
-    batch_id: Mapped[int] = mapped_column(ForeignKey("batch.id", ondelete="RESTRICT"), nullable=False, index=True)
+    batch_id: Mapped[int] = mapped_column(nullable=False, index=True)
+    project_id: Mapped[int] = mapped_column(nullable=False)
     study_path: Mapped[str] = mapped_column(nullable=False)
     status: Mapped[StudyStatusEnum] = mapped_column(
         Enum(StudyStatusEnum, name="study_status"),
@@ -38,8 +85,8 @@ class Study(BaseModel):
         index=True,
     )
     iteration_count: Mapped[int] = mapped_column(SmallInteger, default=0, nullable=False)
-    annotator_id: Mapped[int | None] = mapped_column(ForeignKey("user.tg_id"), nullable=True, index=True)
-    expert_id: Mapped[int | None] = mapped_column(ForeignKey("user.tg_id"), nullable=True, index=True)
+    annotator_id: Mapped[int | None] = mapped_column(ForeignKey("user.tg_id"), nullable=True)
+    expert_id: Mapped[int | None] = mapped_column(ForeignKey("user.tg_id"), nullable=True)
     nc_share_link: Mapped[str | None] = mapped_column(nullable=True)
     nc_upload_link: Mapped[str | None] = mapped_column(nullable=True)
     nc_last_upload_link: Mapped[str | None] = mapped_column(nullable=True)
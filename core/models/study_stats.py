@@ -0,0 +1,42 @@
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Date, DateTime, Enum, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.models.base import BaseModel
+from core.models.study import StudyStatusEnum
+
+# Сводные таблицы пополняются функцией study_stats_refresh из новых строк study_status_history
+# (после водяного знака), поэтому чтение статистики не зависит от размера истории.
+# annotator_id - разметчик на момент перехода (study_status_history.annotator_id), 0 - разметчика не было;
+# день - по UTC.
+
+
+class StudyTransitionDaily(BaseModel):
+    """Число переходов в статус за день по проекту и разметчику."""
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    project_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    annotator_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    to_status: Mapped[StudyStatusEnum] = mapped_column(Enum(StudyStatusEnum, name="study_status"), primary_key=True)
+    transitions: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class StudyStateDurationDaily(BaseModel):
+    """Суммарное время в статусе для исследований, вышедших из него за день."""
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    project_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    annotator_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    status: Mapped[StudyStatusEnum] = mapped_column(Enum(StudyStatusEnum, name="study_status"), primary_key=True)
+    total_seconds: Mapped[float] = mapped_column(Float, nullable=False)
+    exits: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class StudyStatsWatermark(BaseModel):
+    """Последняя учтённая строка истории: (changed_at, id)."""
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    last_changed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    refreshed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, Enum, ForeignKey, SmallInteger, func
+from sqlalchemy import BigInteger, DateTime, Enum, ForeignKey, Index, SmallInteger, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.models.base import BaseModel
@@ -12,7 +12,15 @@ if TYPE_CHECKING:
 
 
 class StudyStatusHistory(BaseModel):
-    id: Mapped[int] = mapped_column(primary_key=True)
+    # Таблица разбита на месячные партиции по changed_at, поэтому changed_at входит в первичный ключ.
+    # Партиции создаёт и удаляет функция study_status_history_maintain; строки месяцев без партиции
+    # попадают в study_status_history_default и переносятся в свою партицию при её создании.
+    __table_args__ = (
+        Index("study_status_history_changed_at_idx", "changed_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (changed_at)"},
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     study_id: Mapped[int] = mapped_column(ForeignKey("study.id", ondelete="CASCADE"), index=True)
     from_status: Mapped[StudyStatusEnum | None] = mapped_column(
         Enum(StudyStatusEnum, name="study_status"),
@@ -23,6 +31,14 @@ class StudyStatusHistory(BaseModel):
         nullable=False,
         index=True,
     )
-    changed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        primary_key=True,
+        server_default=func.now(),
+        nullable=False,
+    )
     iteration_count: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    # Разметчик на момент перехода (при отмене задачи - тот, с кого её сняли); по нему считается статистика.
+    # Без внешнего ключа: история не должна мешать удалению пользователя
+    annotator_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     study: Mapped["Study"] = relationship(backref="status_history")
@@ -1,6 +1,7 @@
+from collections.abc import AsyncIterator
 from typing import Any, Protocol, TypeVar, runtime_checkable
 
-from sqlalchemy import Integer, delete, func, inspect, select, update
+from sqlalchemy import delete, func, inspect, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.schema import Column
 
@@ -9,26 +10,48 @@ from core.models.base import BaseModel
 ModelType = TypeVar("ModelType", bound=BaseModel)
 
 
+# Первичный ключ модели не меняется, а inspect() на каждом обращении к model_pk заметен в горячих запросах
+_primary_keys: dict[type[BaseModel], Column[int]] = {}
+
+
+def _primary_key(model: type[BaseModel]) -> Column[int]:
+    pk = _primary_keys.get(model)
+    if pk is None:
+        pk = _primary_keys[model] = inspect(model).primary_key[0]
+    return pk
+
+
 @runtime_checkable
-class RepositoryProtocol(Protocol[ModelType]):
+class ReadRepositoryProtocol(Protocol[ModelType]):
+    """Только чтение: столько репозиторий отдаёт через ``IReadOnlyUnitOfWork``."""
+
     @property
     def model(self) -> type[ModelType]: ...
 
     @property
-    def model_pk(self) -> Column[Integer]: ...
-
-    def create(self, obj_data: dict[str, Any]) -> ModelType: ...
+    def model_pk(self) -> Column[int]: ...
 
     async def get_by_id(self, obj_id: int) -> ModelType | None: ...
 
-    async def get_all(self, limit: int = 100, offset: int = 0) -> list[ModelType]: ...
+    async def get_all(self, limit: int | None = None, offset: int = 0) -> list[ModelType]: ...
 
-    async def update(self, obj_id: int, obj_data: dict[str, Any]) -> ModelType | None: ...
+    async def get_page(self, after_id: int | None = None, limit: int = 100) -> list[ModelType]: ...
 
-    async def delete(self, obj_id: int) -> bool: ...
+    def iter_all(self, fetch_size: int = 1000) -> AsyncIterator[ModelType]: ...
 
     async def count(self) -> int: ...
 
+
+@runtime_checkable
+class RepositoryProtocol(ReadRepositoryProtocol[ModelType], Protocol[ModelType]):
+    def create(self, obj_data: dict[str, Any]) -> ModelType: ...
+
+    async def update(self, obj_id: int, obj_data: dict[str, Any]) -> ModelType | None: ...
+
+    async def update_many(self, obj_ids: list[int], obj_data: dict[str, Any]) -> list[ModelType]: ...
+
+    async def delete(self, obj_id: int) -> bool: ...
+
     def bulk_create(self, objects_data: list[dict[str, Any]]) -> list[ModelType]: ...
 
 
@@ -42,8 +65,8 @@ class BaseSQLAlchemyRepository[ModelType: BaseModel](RepositoryProtocol[ModelTyp
         return self._model
 
     @property
-    def model_pk(self) -> Column[Integer]:
-        return inspect(self.model).primary_key[0]
+    def model_pk(self) -> Column[int]:
+        return _primary_key(self.model)
 
     def create(self, obj_data: dict[str, Any]) -> ModelType:
         obj = self.model(**obj_data)
@@ -55,16 +78,60 @@ class BaseSQLAlchemyRepository[ModelType: BaseModel](RepositoryProtocol[ModelTyp
         res = await self.session.execute(q)
         return res.scalar_one_or_none()
 
-    async def get_all(self, limit: int = 100, offset: int = 0) -> list[ModelType]:
-        q = select(self.model).limit(limit).offset(offset)
+    async def get_all(self, limit: int | None = None, offset: int = 0) -> list[ModelType]:
+        # По умолчанию без LIMIT: списки вроде проектов не должны молча обрезаться.
+        # Для больших таблиц - get_page или iter_all.
+        q = select(self.model).order_by(self.model_pk).limit(limit).offset(offset)
+        res = await self.session.execute(q)
+        return list(res.scalars().all())
+
+    async def get_page(self, after_id: int | None = None, limit: int = 100) -> list[ModelType]:
+        """Keyset-пагинация по первичному ключу.
+
+        Следующая страница запрашивается с ``after_id`` = id последней строки текущей.
+        В отличие от OFFSET, стоимость не растёт с номером страницы.
+        """
+        q = select(self.model).order_by(self.model_pk).limit(limit)
+        if after_id is not None:
+            q = q.where(self.model_pk > after_id)
         res = await self.session.execute(q)
         return list(res.scalars().all())
 
+    async def iter_all(self, fetch_size: int = 1000) -> AsyncIterator[ModelType]:
+        """Обходит всю таблицу через серверный курсор, держа в памяти не больше ``fetch_size`` строк.
+
+        Курсор живёт внутри транзакции UoW, поэтому обход нужно закончить до commit.
+        """
+        q = select(self.model).order_by(self.model_pk).execution_options(yield_per=fetch_size)
+        res = await self.session.stream_scalars(q)
+        async for obj in res:
+            yield obj
+
     async def update(self, obj_id: int, obj_data: dict[str, Any]) -> ModelType | None:
-        await self.session.execute(
-            update(self.model).where(self.model_pk == obj_id).values(**obj_data),
+        # RETURNING отдаёт обновлённую строку сразу, без повторного SELECT.
+        # populate_existing перезаписывает объект, если он уже есть в identity map сессии.
+        q = (
+            update(self.model)
+            .where(self.model_pk == obj_id)
+            .values(**obj_data)
+            .returning(self.model)
+            .execution_options(populate_existing=True)
         )
-        return await self.get_by_id(obj_id)
+        res = await self.session.execute(q)
+        return res.scalar_one_or_none()
+
+    async def update_many(self, obj_ids: list[int], obj_data: dict[str, Any]) -> list[ModelType]:
+        if not obj_ids:
+            return []
+        q = (
+            update(self.model)
+            .where(self.model_pk.in_(obj_ids))
+            .values(**obj_data)
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        res = await self.session.execute(q)
+        return list(res.scalars().all())
 
     async def delete(self, obj_id: int) -> bool:
         res = await self.session.execute(delete(self.model).where(self.model_pk == obj_id))
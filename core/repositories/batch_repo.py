@@ -5,11 +5,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from core.models.batch import Batch
-from core.repositories.base import BaseSQLAlchemyRepository, RepositoryProtocol
+from core.repositories.base import BaseSQLAlchemyRepository, ReadRepositoryProtocol, RepositoryProtocol
 
 
 @runtime_checkable
-class BatchRepositoryProtocol(RepositoryProtocol[Batch], Protocol):
+class BatchReaderProtocol(ReadRepositoryProtocol[Batch], Protocol):
     async def get_by_name(self, name: str) -> Batch | None: ...
 
     async def get_with_categories(self, batch_id: int) -> Batch | None: ...
@@ -17,6 +17,10 @@ class BatchRepositoryProtocol(RepositoryProtocol[Batch], Protocol):
     async def exists(self, name: str) -> bool: ...
 
 
+@runtime_checkable
+class BatchRepositoryProtocol(BatchReaderProtocol, RepositoryProtocol[Batch], Protocol): ...
+
+
 class BatchSQLAlchemyRepository(BaseSQLAlchemyRepository[Batch], BatchRepositoryProtocol):
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(Batch, session)
@@ -0,0 +1,156 @@
+from collections.abc import Callable, Sequence
+from datetime import timedelta
+from typing import Any, Protocol, runtime_checkable
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from core.models.outbox import OutboxKind, OutboxMessage, OutboxStatus
+from core.repositories.base import BaseSQLAlchemyRepository, RepositoryProtocol
+
+# Флаг в session.info: транзакция добавила сообщения, после commit нужно разбудить диспетчер
+_OUTBOX_ADDED = "outbox_added"
+_commit_listeners: list[Callable[[], None]] = []
+
+
+def add_commit_listener(callback: Callable[[], None]) -> None:
+    """Колбэк вызывается после commit каждой транзакции, записавшей что-то в outbox (в этом процессе)."""
+    _commit_listeners.append(callback)
+
+
+def remove_commit_listener(callback: Callable[[], None]) -> None:
+    _commit_listeners.remove(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_commit_listeners(session: Session) -> None:
+    if session.info.pop(_OUTBOX_ADDED, False):
+        for callback in tuple(_commit_listeners):
+            callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_outbox_added(session: Session) -> None:
+    session.info.pop(_OUTBOX_ADDED, None)
+
+
+@runtime_checkable
+class OutboxRepositoryProtocol(RepositoryProtocol[OutboxMessage], Protocol):
+    async def add(
+        self,
+        kind: OutboxKind,
+        recipient: str,
+        payload: dict[str, Any],
+        *,
+        dedup_key: str | None = None,
+    ) -> bool: ...
+
+    async def claim(self, limit: int, lease_seconds: float) -> list[OutboxMessage]: ...
+
+    async def mark_sent(self, message_ids: Sequence[int]) -> None: ...
+
+    async def retry(self, message_id: int, delay_seconds: float, error: str) -> None: ...
+
+    async def mark_dead(self, message_id: int, error: str) -> None: ...
+
+    async def purge(self, retention_days: int) -> int: ...
+
+
+class OutboxSQLAlchemyRepository(BaseSQLAlchemyRepository[OutboxMessage], OutboxRepositoryProtocol):
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(OutboxMessage, session)
+
+    async def add(
+        self,
+        kind: OutboxKind,
+        recipient: str,
+        payload: dict[str, Any],
+        *,
+        dedup_key: str | None = None,
+    ) -> bool:
+        """Добавляет сообщение в текущую транзакцию; False, если ``dedup_key`` уже встречался."""
+        q = (
+            insert(self.model)
+            .values(kind=kind, recipient=recipient, payload=payload, dedup_key=dedup_key)
+            .on_conflict_do_nothing(index_elements=[self.model.dedup_key])
+        )
+        res = await self.session.execute(q)
+        self.session.sync_session.info[_OUTBOX_ADDED] = True
+        return (res.rowcount or 0) > 0
+
+    async def claim(self, limit: int, lease_seconds: float) -> list[OutboxMessage]:
+        """Забирает готовые к доставке сообщения на ``lease_seconds``.
+
+        Берётся только первое недоставленное сообщение каждого получателя, поэтому порядок
+        внутри получателя сохраняется и при нескольких процессах. Если обработчик упадёт,
+        аренда истечёт и сообщение будет доставлено повторно.
+        """
+        earlier = aliased(self.model)
+        has_earlier = (
+            select(earlier.id)
+            .where(
+                earlier.recipient == self.model.recipient,
+                earlier.status == OutboxStatus.PENDING,
+                earlier.id < self.model.id,
+            )
+            .exists()
+        )
+        ready_ids = (
+            select(self.model.id)
+            .where(self.model.status == OutboxStatus.PENDING, self.model.available_at <= func.now(), ~has_earlier)
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        q = (
+            update(self.model)
+            .where(self.model.id.in_(ready_ids.scalar_subquery()))
+            .values(
+                attempts=self.model.attempts + 1,
+                available_at=func.now() + timedelta(seconds=lease_seconds),
+            )
+            .returning(self.model)
+            .execution_options(synchronize_session=False)
+        )
+        res = await self.session.scalars(q)
+        return sorted(res.all(), key=lambda message: message.id)
+
+    async def mark_sent(self, message_ids: Sequence[int]) -> None:
+        if not message_ids:
+            return
+        q = (
+            update(self.model)
+            .where(self.model.id.in_(message_ids))
+            .values(status=OutboxStatus.SENT, processed_at=func.now(), last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(q)
+
+    async def retry(self, message_id: int, delay_seconds: float, error: str) -> None:
+        q = (
+            update(self.model)
+            .where(self.model.id == message_id)
+            .values(available_at=func.now() + timedelta(seconds=delay_seconds), last_error=error)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(q)
+
+    async def mark_dead(self, message_id: int, error: str) -> None:
+        q = (
+            update(self.model)
+            .where(self.model.id == message_id)
+            .values(status=OutboxStatus.DEAD, processed_at=func.now(), last_error=error)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(q)
+
+    async def purge(self, retention_days: int) -> int:
+        """Удаляет обработанные сообщения старше срока; пока строка жива, её ``dedup_key`` занят."""
+        q = delete(self.model).where(
+            self.model.status != OutboxStatus.PENDING,
+            self.model.processed_at < func.now() - timedelta(days=retention_days),
+        )
+        res = await self.session.execute(q)
+        return res.rowcount or 0
@@ -4,13 +4,16 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.models.study_category import StudyCategory
-from core.repositories.base import BaseSQLAlchemyRepository, RepositoryProtocol
+from core.repositories.base import BaseSQLAlchemyRepository, ReadRepositoryProtocol, RepositoryProtocol
 
 
 @runtime_checkable
-class StudyCategoryRepositoryProtocol(RepositoryProtocol[StudyCategory], Protocol):
+class StudyCategoryReaderProtocol(ReadRepositoryProtocol[StudyCategory], Protocol):
     async def get_by_ids(self, category_ids: list[int]) -> list[StudyCategory]: ...
 
+
+@runtime_checkable
+class StudyCategoryRepositoryProtocol(StudyCategoryReaderProtocol, RepositoryProtocol[StudyCategory], Protocol):
     async def get_or_create_many(self, names: list[str]) -> list[StudyCategory]: ...
 
 
@@ -1,32 +1,325 @@
-from typing import Protocol, runtime_checkable
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Protocol, runtime_checkable
 
-from sqlalchemy import exists, select, update
+from sqlalchemy import ColumnElement, Select, bindparam, exists, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased, joinedload
 
 from core.models.batch import Batch
-from core.models.study import Study, StudyStatusEnum
-from core.repositories.base import BaseSQLAlchemyRepository, RepositoryProtocol
+from core.models.project import Project
+from core.models.study import STUDY_TRANSITIONS, Study, StudyStatusEnum
+from core.models.study_category import StudyCategory, study_category_study_association
+from core.models.study_status_history import StudyStatusHistory
+from core.models.user import User
+from core.repositories.base import BaseSQLAlchemyRepository, ReadRepositoryProtocol, RepositoryProtocol
+from core.repositories.study_stats_repo import DONE_STATUSES
+
+
+@dataclass(frozen=True, slots=True)
+class StudyContext:
+    """Исследование вместе со всем, что нужно обработчикам ревью и уведомлений."""
+
+    study: Study
+    batch: Batch
+    project: Project
+    annotator: User | None
+    expert: User | None
+
+    @property
+    def categories(self) -> list[StudyCategory]:
+        return self.study.categories
+
+    def user(self, tg_id: int) -> User | None:
+        """Разметчик или эксперт исследования с данным tg_id, если он уже загружен."""
+        for user in (self.annotator, self.expert):
+            if user is not None and user.tg_id == tg_id:
+                return user
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class StudyTransitionResult:
+    """Итог перехода: ``study`` - обновлённое исследование, если переход применён.
+
+    При конфликте ``study`` пуст, а ``current_status`` - статус, в котором исследование оказалось.
+    Если исследования нет, пусты оба поля.
+    """
+
+    study: Study | None
+    current_status: StudyStatusEnum | None = None
+
+    @property
+    def applied(self) -> bool:
+        return self.study is not None
+
+    @property
+    def not_found(self) -> bool:
+        return self.study is None and self.current_status is None
+
+
+@dataclass(frozen=True, slots=True)
+class StudyExportFilter:
+    """Фильтр выгрузки; ``finished_from``/``finished_to`` ограничивают время перехода в финальный статус."""
+
+    project_id: int | None = None
+    batch_id: int | None = None
+    finished_from: datetime | None = None
+    finished_to: datetime | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class StudyExportRow:
+    id: int
+    study_iuid: str
+    study_path: str
+    status: str
+    iteration_count: int
+    project_id: int
+    project: str
+    batch_id: int
+    batch: str
+    categories: list[str]
+    annotator_id: int | None
+    annotator: str | None
+    expert_id: int | None
+    expert: str | None
+    started_at: datetime | None
+    finished_at: datetime | None
+
+
+# Самые частые запросы собраны один раз на уровне модуля с bind-параметрами:
+# конструкция не пересобирается на каждый вызов, а ключ кеша компиляции SQLAlchemy
+# и текст для кеша prepared statements asyncpg остаются одинаковыми.
+_ASSIGNED_FOR_ANNOTATOR_Q = (
+    select(Study)
+    .where(
+        Study.annotator_id == bindparam("user_id"),
+        Study.status.in_((StudyStatusEnum.ASSIGNED, StudyStatusEnum.WAITING_REWORK, StudyStatusEnum.REWORK)),
+    )
+    .limit(1)
+    .order_by(Study.status)
+)
+
+_IN_REVIEW_FOR_EXPERT_Q = (
+    select(Study)
+    .where(
+        Study.expert_id == bindparam("user_id"),
+        Study.status.in_((StudyStatusEnum.WAITING_REVIEW, StudyStatusEnum.IN_REVIEW)),
+    )
+    .limit(1)
+)
+
+# Locks the next available NEW study for the project and assigns it to the annotator in a single statement.
+_next_new_study = (
+    select(Study.id)
+    .where(
+        Study.project_id == bindparam("target_project_id"),
+        Study.status == StudyStatusEnum.NEW,
+    )
+    .order_by(Study.id)
+    .limit(1)
+    .with_for_update(skip_locked=True)
+    .cte("c")
+)
+_ASSIGN_TO_USER_Q = (
+    update(Study)
+    .where(Study.id == select(_next_new_study.c.id).scalar_subquery())
+    .values(
+        annotator_id=bindparam("user_id"),
+        status=StudyStatusEnum.ASSIGNED,
+        iteration_count=Study.iteration_count + 1,
+    )
+    .returning(Study)
+)
+
+_Annotator = aliased(User, name="annotator")
+_Expert = aliased(User, name="expert")
+# Один запрос вместо отдельных get для исследования, категорий, проекта и пользователей
+_STUDY_CONTEXT_Q = (
+    select(Study, Batch, Project, _Annotator, _Expert)
+    .join(Batch, Study.batch_id == Batch.id)
+    .join(Project, Study.project_id == Project.id)
+    .outerjoin(_Annotator, Study.annotator_id == _Annotator.tg_id)
+    .outerjoin(_Expert, Study.expert_id == _Expert.tg_id)
+    .where(Study.id == bindparam("study_id"))
+    .options(joinedload(Study.categories))
+)
+
+# Подтверждение id, взятого из очереди готовых: исследование могли уже забрать или сбросить
+_ASSIGN_BY_ID_Q = (
+    update(Study)
+    .where(
+        Study.id == bindparam("study_id"),
+        Study.project_id == bindparam("target_project_id"),
+        Study.status == StudyStatusEnum.NEW,
+    )
+    .values(
+        annotator_id=bindparam("user_id"),
+        status=StudyStatusEnum.ASSIGNED,
+        iteration_count=Study.iteration_count + 1,
+    )
+    .returning(Study)
+)
+
+
+_CATEGORY_SEPARATOR = "\x1f"
+_export_categories = (
+    select(func.aggregate_strings(StudyCategory.name, _CATEGORY_SEPARATOR))
+    .select_from(study_category_study_association)
+    .join(StudyCategory, StudyCategory.id == study_category_study_association.c.study_category_id)
+    .where(study_category_study_association.c.study_id == Study.id)
+    .scalar_subquery()
+)
+_export_started_at = (
+    select(func.min(StudyStatusHistory.changed_at)).where(StudyStatusHistory.study_id == Study.id).scalar_subquery()
+)
+# Время перехода в текущий (финальный) статус
+_export_finished_at = (
+    select(func.max(StudyStatusHistory.changed_at))
+    .where(StudyStatusHistory.study_id == Study.id, StudyStatusHistory.to_status == Study.status)
+    .scalar_subquery()
+)
+
+
+def _finished_between(finished_from: datetime | None, finished_to: datetime | None) -> ColumnElement[bool]:
+    """Последний переход в текущий статус попал в ``[finished_from, finished_to)``.
+
+    Вместо сравнения с ``_export_finished_at`` - EXISTS с диапазоном по ``changed_at``:
+    так PostgreSQL отсекает лишние месячные партиции и может использовать BRIN-индекс.
+    """
+    to_current_status = (StudyStatusHistory.study_id == Study.id, StudyStatusHistory.to_status == Study.status)
+    in_range = [*to_current_status]
+    if finished_from is not None:
+        in_range.append(StudyStatusHistory.changed_at >= finished_from)
+    if finished_to is None:
+        return exists().where(*in_range)
+    in_range.append(StudyStatusHistory.changed_at < finished_to)
+    # Повторный переход в тот же статус после finished_to сдвигает время завершения за границу
+    return exists().where(*in_range) & ~exists().where(
+        *to_current_status,
+        StudyStatusHistory.changed_at >= finished_to,
+    )
+
+
+# Колонки _EXPORT_Q по порядку; названия - как у полей StudyExportRow
+type _ExportColumns = tuple[
+    int,
+    str,
+    str,
+    StudyStatusEnum,
+    int,
+    int,
+    str,
+    int,
+    str,
+    str | None,
+    int | None,
+    str | None,
+    int | None,
+    str | None,
+    datetime | None,
+    datetime | None,
+]
+# Только скалярные колонки, без ORM-объектов: identity map не растёт при обходе всей таблицы
+_EXPORT_Q: Select[_ExportColumns] = (
+    select(
+        Study.id,
+        Study.study_iuid,
+        Study.study_path,
+        Study.status,
+        Study.iteration_count,
+        Study.project_id,
+        Project.name.label("project"),
+        Study.batch_id,
+        Batch.name.label("batch"),
+        _export_categories.label("categories"),
+        Study.annotator_id,
+        _Annotator.name.label("annotator"),
+        Study.expert_id,
+        _Expert.name.label("expert"),
+        _export_started_at.label("started_at"),
+        _export_finished_at.label("finished_at"),
+    )
+    .join(Batch, Study.batch_id == Batch.id)
+    .join(Project, Study.project_id == Project.id)
+    .outerjoin(_Annotator, Study.annotator_id == _Annotator.tg_id)
+    .outerjoin(_Expert, Study.expert_id == _Expert.tg_id)
+    .where(Study.status.in_(DONE_STATUSES))
+    .order_by(Study.id)
+)
+
+
+def _export_query(export_filter: StudyExportFilter, after_id: int | None) -> Select[_ExportColumns]:
+    q = _EXPORT_Q
+    if after_id is not None:
+        q = q.where(Study.id > after_id)
+    if export_filter.project_id is not None:
+        q = q.where(Study.project_id == export_filter.project_id)
+    if export_filter.batch_id is not None:
+        q = q.where(Study.batch_id == export_filter.batch_id)
+    if export_filter.finished_from is not None or export_filter.finished_to is not None:
+        q = q.where(_finished_between(export_filter.finished_from, export_filter.finished_to))
+    return q
 
 
 @runtime_checkable
-class StudyRepositoryProtocol(RepositoryProtocol[Study], Protocol):
+class StudyReaderProtocol(ReadRepositoryProtocol[Study], Protocol):
     async def get_by_iuid(self, iuid: str) -> Study | None: ...
 
     async def exists(self, iuid: str) -> bool: ...
 
-    async def get_with_categories(self, study_id: int) -> Batch | None: ...
+    async def get_with_categories(self, study_id: int) -> Study | None: ...
+
+    async def get_context(self, study_id: int) -> StudyContext | None: ...
 
     async def get_assigned_for_annotator(self, user_id: int) -> Study | None: ...
 
     async def get_in_review_for_expert(self, user_id: int) -> Study | None: ...
 
+    async def get_new_ids_by_project(self) -> dict[int, list[int]]: ...
+
+    def iter_export(
+        self,
+        export_filter: StudyExportFilter,
+        after_id: int | None = None,
+        fetch_size: int = 1000,
+    ) -> AsyncIterator[StudyExportRow]: ...
+
+
+@runtime_checkable
+class StudyRepositoryProtocol(StudyReaderProtocol, RepositoryProtocol[Study], Protocol):
     async def assign_to_user(
         self,
         project_id: int,
         user_id: int,
     ) -> Study | None: ...
 
+    async def assign_by_id(
+        self,
+        study_id: int,
+        project_id: int,
+        user_id: int,
+    ) -> Study | None: ...
+
+    async def transition(
+        self,
+        study_id: int,
+        to_status: StudyStatusEnum,
+        values: dict[str, Any] | None = None,
+        *,
+        conditions: Sequence[ColumnElement[bool]] = (),
+    ) -> StudyTransitionResult: ...
+
+    async def advance_iteration(
+        self,
+        study_id: int,
+        expected_iteration: int,
+        *,
+        conditions: Sequence[ColumnElement[bool]] = (),
+    ) -> Study | None: ...
+
 
 class StudySQLAlchemyRepository(BaseSQLAlchemyRepository[Study], StudyRepositoryProtocol):
     def __init__(self, session: AsyncSession) -> None:
@@ -42,36 +335,25 @@ class StudySQLAlchemyRepository(BaseSQLAlchemyRepository[Study], StudyRepository
         res = await self.session.execute(q)
         return bool(res.scalar())
 
-    async def get_with_categories(self, study_id: int) -> Batch | None:
+    async def get_with_categories(self, study_id: int) -> Study | None:
         q = select(self.model).where(self.model_pk == study_id).options(joinedload(self.model.categories))
         res = await self.session.execute(q)
         return res.unique().scalar_one_or_none()
 
+    async def get_context(self, study_id: int) -> StudyContext | None:
+        res = await self.session.execute(_STUDY_CONTEXT_Q, {"study_id": study_id})
+        row = res.unique().one_or_none()
+        if row is None:
+            return None
+        study, batch, project, annotator, expert = row
+        return StudyContext(study=study, batch=batch, project=project, annotator=annotator, expert=expert)
+
     async def get_assigned_for_annotator(self, user_id: int) -> Study | None:
-        q = (
-            select(self.model)
-            .where(
-                self.model.annotator_id == user_id,
-                self.model.status.in_(
-                    (StudyStatusEnum.ASSIGNED, StudyStatusEnum.WAITING_REWORK, StudyStatusEnum.REWORK),
-                ),
-            )
-            .limit(1)
-            .order_by(self.model.status)
-        )
-        res = await self.session.execute(q)
+        res = await self.session.execute(_ASSIGNED_FOR_ANNOTATOR_Q, {"user_id": user_id})
         return res.scalar_one_or_none()
 
     async def get_in_review_for_expert(self, user_id: int) -> Study | None:
-        q = (
-            select(self.model)
-            .where(
-                self.model.expert_id == user_id,
-                self.model.status.in_((StudyStatusEnum.WAITING_REVIEW, StudyStatusEnum.IN_REVIEW)),
-            )
-            .limit(1)
-        )
-        res = await self.session.execute(q)
+        res = await self.session.execute(_IN_REVIEW_FOR_EXPERT_Q, {"user_id": user_id})
         return res.scalar_one_or_none()
 
     async def assign_to_user(
@@ -79,28 +361,102 @@ class StudySQLAlchemyRepository(BaseSQLAlchemyRepository[Study], StudyRepository
         project_id: int,
         user_id: int,
     ) -> Study | None:
-        # Locks the next available NEW study for the project and assigns it to the annotator in a single statement.
-        c = (
-            select(self.model.id)
-            .join(Batch, self.model.batch_id == Batch.id)
-            .where(
-                Batch.project_id == project_id,
-                self.model.status == StudyStatusEnum.NEW,
-            )
-            .order_by(self.model_pk)
-            .limit(1)
-            .with_for_update(skip_locked=True)
-            .cte("c")
+        res = await self.session.execute(_ASSIGN_TO_USER_Q, {"target_project_id": project_id, "user_id": user_id})
+        return res.scalar_one_or_none()
+
+    async def assign_by_id(
+        self,
+        study_id: int,
+        project_id: int,
+        user_id: int,
+    ) -> Study | None:
+        res = await self.session.execute(
+            _ASSIGN_BY_ID_Q,
+            {"study_id": study_id, "target_project_id": project_id, "user_id": user_id},
         )
-        stmt = (
+        return res.scalar_one_or_none()
+
+    async def get_new_ids_by_project(self) -> dict[int, list[int]]:
+        q = (
+            select(self.model.project_id, self.model_pk)
+            .where(self.model.status == StudyStatusEnum.NEW)
+            .order_by(self.model.project_id, self.model_pk)
+        )
+        res = await self.session.execute(q)
+        ids_by_project: dict[int, list[int]] = {}
+        for project_id, study_id in res.tuples():
+            ids_by_project.setdefault(project_id, []).append(study_id)
+        return ids_by_project
+
+    async def transition(
+        self,
+        study_id: int,
+        to_status: StudyStatusEnum,
+        values: dict[str, Any] | None = None,
+        *,
+        conditions: Sequence[ColumnElement[bool]] = (),
+    ) -> StudyTransitionResult:
+        """Переводит исследование в ``to_status`` одним условным UPDATE.
+
+        Строка обновляется, только если текущий статус допускает переход по ``STUDY_TRANSITIONS``
+        и выполнены дополнительные ``conditions``; вместе со статусом записываются ``values``.
+        Конкурентный обработчик, успевший первым, выигрывает, остальные получают конфликт.
+        Без populate_existing: уже загруженный объект получает новые значения через синхронизацию
+        сессии, а загруженные связи (например, categories) не сбрасываются.
+        """
+        q = (
             update(self.model)
-            .where(self.model.id == select(c.c.id).scalar_subquery())
-            .values(
-                annotator_id=user_id,
-                status=StudyStatusEnum.ASSIGNED,
-                iteration_count=self.model.iteration_count + 1,
-            )
+            .where(self.model_pk == study_id, self.model.status.in_(STUDY_TRANSITIONS[to_status]), *conditions)
+            .values(status=to_status, **(values or {}))
             .returning(self.model)
         )
-        res = await self.session.execute(stmt)
+        res = await self.session.execute(q)
+        study = res.scalar_one_or_none()
+        if study is not None:
+            return StudyTransitionResult(study)
+        # Конфликт: второй запрос только чтобы отличить чужой статус от отсутствующего исследования
+        current_status = await self.session.scalar(select(self.model.status).where(self.model_pk == study_id))
+        return StudyTransitionResult(None, current_status)
+
+    async def advance_iteration(
+        self,
+        study_id: int,
+        expected_iteration: int,
+        *,
+        conditions: Sequence[ColumnElement[bool]] = (),
+    ) -> Study | None:
+        """Увеличивает ``iteration_count`` на 1, только если он всё ещё равен ``expected_iteration``.
+
+        Как и ``transition``, это один условный UPDATE: из двух одинаковых запросов итерацию
+        поднимет только первый, второй получит None.
+        """
+        q = (
+            update(self.model)
+            .where(self.model_pk == study_id, self.model.iteration_count == expected_iteration, *conditions)
+            .values(iteration_count=expected_iteration + 1)
+            .returning(self.model)
+        )
+        res = await self.session.execute(q)
         return res.scalar_one_or_none()
+
+    async def iter_export(
+        self,
+        export_filter: StudyExportFilter,
+        after_id: int | None = None,
+        fetch_size: int = 1000,
+    ) -> AsyncIterator[StudyExportRow]:
+        """Завершённые исследования в порядке id через серверный курсор.
+
+        Прерванную выгрузку можно продолжить, передав ``after_id`` = id последней полученной строки.
+        """
+        q = _export_query(export_filter, after_id).execution_options(yield_per=fetch_size)
+        res = await self.session.stream(q)
+        async for row in res.mappings():
+            categories = row["categories"]
+            yield StudyExportRow(
+                **{
+                    **row,
+                    "status": row["status"].value,
+                    "categories": sorted(categories.split(_CATEGORY_SEPARATOR)) if categories else [],
+                },
+            )
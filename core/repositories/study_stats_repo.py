@@ -0,0 +1,149 @@
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Protocol, runtime_checkable
+
+from sqlalchemy import Select, SQLColumnExpression, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models.project import Project
+from core.models.study import StudyStatusEnum
+from core.models.study_stats import StudyStateDurationDaily, StudyStatsWatermark, StudyTransitionDaily
+from core.models.user import User
+
+DONE_STATUSES = (
+    StudyStatusEnum.APPROVED,
+    StudyStatusEnum.APPROVED_F,
+    StudyStatusEnum.CLOSED_N,
+    StudyStatusEnum.CLOSED_I,
+    StudyStatusEnum.CLOSED_OP,
+    StudyStatusEnum.CLOSED_F,
+)
+
+
+@dataclass(slots=True)
+class ThroughputStats:
+    """Сводка по проекту или разметчику за период."""
+
+    key: int
+    name: str
+    days: int
+    transitions: dict[StudyStatusEnum, int] = field(default_factory=dict)
+    state_seconds: dict[StudyStatusEnum, tuple[float, int]] = field(default_factory=dict)
+
+    @property
+    def done(self) -> int:
+        return sum(self.transitions.get(status, 0) for status in DONE_STATUSES)
+
+    @property
+    def done_per_day(self) -> float:
+        return self.done / self.days if self.days else 0.0
+
+    @property
+    def rework_rate(self) -> float | None:
+        """Доля отправок на проверку, вернувшихся на доработку."""
+        submitted = self.transitions.get(StudyStatusEnum.WAITING_REVIEW, 0)
+        if not submitted:
+            return None
+        return self.transitions.get(StudyStatusEnum.WAITING_REWORK, 0) / submitted
+
+    def avg_seconds(self, status: StudyStatusEnum) -> float | None:
+        total, exits = self.state_seconds.get(status, (0.0, 0))
+        return total / exits if exits else None
+
+    @property
+    def review_turnaround(self) -> float | None:
+        """Среднее время от отправки на проверку до решения эксперта."""
+        parts = [self.avg_seconds(StudyStatusEnum.WAITING_REVIEW), self.avg_seconds(StudyStatusEnum.IN_REVIEW)]
+        known = [part for part in parts if part is not None]
+        return sum(known) if known else None
+
+
+@runtime_checkable
+class StudyStatsReaderProtocol(Protocol):
+    async def get_by_project(self, days: int) -> list[ThroughputStats]: ...
+
+    async def get_by_annotator(self, days: int, project_id: int | None = None) -> list[ThroughputStats]: ...
+
+    async def get_refreshed_at(self) -> StudyStatsWatermark | None: ...
+
+
+@runtime_checkable
+class StudyStatsRepositoryProtocol(StudyStatsReaderProtocol, Protocol):
+    async def refresh(self, lag_seconds: int) -> int: ...
+
+
+class StudyStatsSQLAlchemyRepository(StudyStatsRepositoryProtocol):
+    """Чтение сводных таблиц статистики; история переходов здесь не читается."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def refresh(self, lag_seconds: int) -> int:
+        q = select(func.study_stats_refresh(timedelta(seconds=lag_seconds)))
+        res = await self.session.execute(q)
+        return int(res.scalar_one())
+
+    async def get_by_project(self, days: int) -> list[ThroughputStats]:
+        return await self._collect(
+            days,
+            key_column=StudyTransitionDaily.project_id,
+            duration_key_column=StudyStateDurationDaily.project_id,
+            names=select(Project.id, Project.name),
+        )
+
+    async def get_by_annotator(self, days: int, project_id: int | None = None) -> list[ThroughputStats]:
+        return await self._collect(
+            days,
+            key_column=StudyTransitionDaily.annotator_id,
+            duration_key_column=StudyStateDurationDaily.annotator_id,
+            names=select(User.tg_id, User.name),
+            project_id=project_id,
+        )
+
+    async def get_refreshed_at(self) -> StudyStatsWatermark | None:
+        return await self.session.get(StudyStatsWatermark, "study_status_history")
+
+    async def _collect(
+        self,
+        days: int,
+        *,
+        key_column: SQLColumnExpression[int],
+        duration_key_column: SQLColumnExpression[int],
+        names: Select[tuple[int, str]],
+        project_id: int | None = None,
+    ) -> list[ThroughputStats]:
+        # Дни в сводных таблицах - по UTC
+        since = datetime.now(UTC).date() - timedelta(days=days - 1)
+
+        transitions_q = (
+            select(key_column, StudyTransitionDaily.to_status, func.sum(StudyTransitionDaily.transitions))
+            .where(StudyTransitionDaily.day >= since)
+            .group_by(key_column, StudyTransitionDaily.to_status)
+        )
+        durations_q = (
+            select(
+                duration_key_column,
+                StudyStateDurationDaily.status,
+                func.sum(StudyStateDurationDaily.total_seconds),
+                func.sum(StudyStateDurationDaily.exits),
+            )
+            .where(StudyStateDurationDaily.day >= since)
+            .group_by(duration_key_column, StudyStateDurationDaily.status)
+        )
+        if project_id is not None:
+            transitions_q = transitions_q.where(StudyTransitionDaily.project_id == project_id)
+            durations_q = durations_q.where(StudyStateDurationDaily.project_id == project_id)
+
+        stats: dict[int, ThroughputStats] = {}
+        for key, status, count in (await self.session.execute(transitions_q)).tuples():
+            stats.setdefault(key, ThroughputStats(key=key, name=str(key), days=days)).transitions[status] = int(count)
+        for key, status, total, exits in (await self.session.execute(durations_q)).tuples():
+            stats.setdefault(key, ThroughputStats(key=key, name=str(key), days=days)).state_seconds[status] = (
+                float(total),
+                int(exits),
+            )
+        if stats:
+            names_q = names.where(names.selected_columns[0].in_(stats))
+            for key, name in (await self.session.execute(names_q)).tuples():
+                stats[key].name = name
+        return sorted(stats.values(), key=lambda item: item.done, reverse=True)
@@ -0,0 +1,26 @@
+from typing import Protocol, runtime_checkable
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models.study_status_history import StudyStatusHistory
+from core.repositories.base import BaseSQLAlchemyRepository, RepositoryProtocol
+
+
+@runtime_checkable
+class StudyStatusHistoryRepositoryProtocol(RepositoryProtocol[StudyStatusHistory], Protocol):
+    async def maintain_partitions(self, months_ahead: int, retention_months: int | None, *, archive: bool) -> int: ...
+
+
+class StudyStatusHistorySQLAlchemyRepository(
+    BaseSQLAlchemyRepository[StudyStatusHistory],
+    StudyStatusHistoryRepositoryProtocol,
+):
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(StudyStatusHistory, session)
+
+    async def maintain_partitions(self, months_ahead: int, retention_months: int | None, *, archive: bool) -> int:
+        """Создаёт месячные партиции наперёд и убирает просроченные; возвращает число убранных партиций."""
+        q = select(func.study_status_history_maintain(months_ahead, retention_months, archive))
+        res = await self.session.execute(q)
+        return int(res.scalar_one())
@@ -5,16 +5,20 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from core.models.user import User
-from core.repositories.base import BaseSQLAlchemyRepository, RepositoryProtocol
+from core.repositories.base import BaseSQLAlchemyRepository, ReadRepositoryProtocol, RepositoryProtocol
 
 
 @runtime_checkable
-class UserRepositoryProtocol(RepositoryProtocol[User], Protocol):
+class UserReaderProtocol(ReadRepositoryProtocol[User], Protocol):
     async def get_by_tg_id_with_projects(self, tg_id: int) -> User | None: ...
 
     async def exists(self, tg_id: int) -> bool: ...
 
 
+@runtime_checkable
+class UserRepositoryProtocol(UserReaderProtocol, RepositoryProtocol[User], Protocol): ...
+
+
 class UserSQLAlchemyRepository(BaseSQLAlchemyRepository[User], UserRepositoryProtocol):
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(User, session)
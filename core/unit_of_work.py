@@ -5,36 +5,61 @@ from typing import Self
 
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction
 
-from core.repositories.batch_repo import BatchRepositoryProtocol, BatchSQLAlchemyRepository
-from core.repositories.project_repo import ProjectRepositoryProtocol, ProjectSQLAlchemyRepository
+from core.repositories.batch_repo import BatchReaderProtocol, BatchRepositoryProtocol, BatchSQLAlchemyRepository
+from core.repositories.outbox_repo import OutboxRepositoryProtocol, OutboxSQLAlchemyRepository
+from core.repositories.project_repo import (
+    ProjectReaderProtocol,
+    ProjectRepositoryProtocol,
+    ProjectSQLAlchemyRepository,
+)
 from core.repositories.study_category_repo import (
+    StudyCategoryReaderProtocol,
     StudyCategoryRepositoryProtocol,
     StudyCategorySQLAlchemyRepository,
 )
-from core.repositories.study_repo import StudyRepositoryProtocol, StudySQLAlchemyRepository
-from core.repositories.user_repo import UserRepositoryProtocol, UserSQLAlchemyRepository
+from core.repositories.study_repo import StudyReaderProtocol, StudyRepositoryProtocol, StudySQLAlchemyRepository
+from core.repositories.study_stats_repo import (
+    StudyStatsReaderProtocol,
+    StudyStatsRepositoryProtocol,
+    StudyStatsSQLAlchemyRepository,
+)
+from core.repositories.study_status_history_repo import (
+    StudyStatusHistoryRepositoryProtocol,
+    StudyStatusHistorySQLAlchemyRepository,
+)
+from core.repositories.user_repo import UserReaderProtocol, UserRepositoryProtocol, UserSQLAlchemyRepository
+
+
+class IReadOnlyUnitOfWork(abc.ABC):
+    """UoW только для чтения: транзакции READ ONLY, при наличии реплики запросы идут на неё.
 
+    Подходит для экранов просмотра, где данные могут отставать на время репликации.
+    Репозитории отдают только методы чтения, commit нет.
+    """
 
-class IUnitOfWork(abc.ABC):
     @property
     @abc.abstractmethod
-    def projects(self) -> ProjectRepositoryProtocol: ...
+    def projects(self) -> ProjectReaderProtocol: ...
 
     @property
     @abc.abstractmethod
-    def batches(self) -> BatchRepositoryProtocol: ...
+    def batches(self) -> BatchReaderProtocol: ...
 
     @property
     @abc.abstractmethod
-    def studies(self) -> StudyRepositoryProtocol: ...
+    def studies(self) -> StudyReaderProtocol: ...
 
     @property
     @abc.abstractmethod
-    def users(self) -> UserRepositoryProtocol: ...
+    def users(self) -> UserReaderProtocol: ...
 
     @property
     @abc.abstractmethod
-    def categories(self) -> StudyCategoryRepositoryProtocol: ...
+    def categories(self) -> StudyCategoryReaderProtocol: ...
+
+    @property
+    @abc.abstractmethod
+    def stats(self) -> StudyStatsReaderProtocol: ...
 
     @abc.abstractmethod
     async def __aenter__(self) -> Self: ...
@@ -47,6 +72,40 @@ class IUnitOfWork(abc.ABC):
         tb: TracebackType | None,
     ) -> None: ...
 
+
+class IUnitOfWork(IReadOnlyUnitOfWork):
+    @property
+    @abc.abstractmethod
+    def projects(self) -> ProjectRepositoryProtocol: ...
+
+    @property
+    @abc.abstractmethod
+    def batches(self) -> BatchRepositoryProtocol: ...
+
+    @property
+    @abc.abstractmethod
+    def studies(self) -> StudyRepositoryProtocol: ...
+
+    @property
+    @abc.abstractmethod
+    def users(self) -> UserRepositoryProtocol: ...
+
+    @property
+    @abc.abstractmethod
+    def categories(self) -> StudyCategoryRepositoryProtocol: ...
+
+    @property
+    @abc.abstractmethod
+    def status_history(self) -> StudyStatusHistoryRepositoryProtocol: ...
+
+    @property
+    @abc.abstractmethod
+    def stats(self) -> StudyStatsRepositoryProtocol: ...
+
+    @property
+    @abc.abstractmethod
+    def outbox(self) -> OutboxRepositoryProtocol: ...
+
     @abc.abstractmethod
     async def commit(self) -> None: ...
 
@@ -54,34 +113,46 @@ class IUnitOfWork(abc.ABC):
     async def rollback(self) -> None: ...
 
 
-class SqlAlchemyUnitOfWork(IUnitOfWork):
+class SqlAlchemyReadOnlyUnitOfWork(IReadOnlyUnitOfWork):
+    """UoW поверх AsyncSession, без commit: транзакция всегда откатывается на выходе.
+
+    Репозитории создаются при первом обращении. В ленивом режиме (``lazy=True``)
+    сессия и транзакция тоже открываются только при первом обращении к репозиторию,
+    поэтому обработчик, вышедший раньше, не трогает пул соединений.
+    """
+
     def __init__(
         self,
         session_factory: Callable[[], AsyncSession],
+        *,
+        lazy: bool = False,
     ) -> None:
         self._session_factory = session_factory
+        self._lazy = lazy
+        self._entered = False
         self.session: AsyncSession | None = None
         self._tx: AsyncSessionTransaction | None = None
-        self._projects: ProjectRepositoryProtocol | None = None
-        self._batches: BatchRepositoryProtocol | None = None
-        self._studies: StudyRepositoryProtocol | None = None
-        self._users: UserRepositoryProtocol | None = None
-        self._categories: StudyCategoryRepositoryProtocol | None = None
+        self._reset_repositories()
+
+    def _reset_repositories(self) -> None:
+        self._projects: ProjectSQLAlchemyRepository | None = None
+        self._batches: BatchSQLAlchemyRepository | None = None
+        self._studies: StudySQLAlchemyRepository | None = None
+        self._users: UserSQLAlchemyRepository | None = None
+        self._categories: StudyCategorySQLAlchemyRepository | None = None
+        self._stats: StudyStatsSQLAlchemyRepository | None = None
 
     async def __aenter__(self) -> Self:
-        self.session = self._session_factory()
-        try:
-            self._tx = await self.session.begin()
-        except Exception:
-            await self.session.close()
-            self.session = None
-            self._tx = None
-            raise
-        self._projects = ProjectSQLAlchemyRepository(self.session)
-        self._batches = BatchSQLAlchemyRepository(self.session)
-        self._studies = StudySQLAlchemyRepository(self.session)
-        self._users = UserSQLAlchemyRepository(self.session)
-        self._categories = StudyCategorySQLAlchemyRepository(self.session)
+        if not self._lazy:
+            self.session = self._session_factory()
+            try:
+                self._tx = await self.session.begin()
+            except Exception:
+                await self.session.close()
+                self.session = None
+                self._tx = None
+                raise
+        self._entered = True
         return self
 
     async def __aexit__(
@@ -94,60 +165,96 @@ class SqlAlchemyUnitOfWork(IUnitOfWork):
             if self._tx is not None and self._tx.is_active:
                 # Если транзакция открыта и не был сделан commit
                 await self._tx.rollback()
+            elif self.session is not None and self.session.in_transaction():
+                await self.session.rollback()
         finally:
             if self.session is not None:
                 await self.session.close()
+            self._entered = False
             self._tx = None
             self.session = None
-            self._projects = None
-            self._batches = None
-            self._studies = None
-            self._users = None
-            self._categories = None
+            self._reset_repositories()
 
-    @property
-    def projects(self) -> ProjectRepositoryProtocol:
-        if self._projects is None:
+    def _get_session(self) -> AsyncSession:
+        if not self._entered:
             msg = "UnitOfWork is closed; repositories are not available"
             raise RuntimeError(msg)
+        if self.session is None:
+            # Ленивый режим: транзакция начнётся сама (autobegin) на первом запросе
+            self.session = self._session_factory()
+        return self.session
+
+    # Свойства возвращают конкретные репозитории, поэтому их же наследует SqlAlchemyUnitOfWork
+
+    @property
+    def projects(self) -> ProjectSQLAlchemyRepository:
+        if self._projects is None:
+            self._projects = ProjectSQLAlchemyRepository(self._get_session())
         return self._projects
 
     @property
-    def batches(self) -> BatchRepositoryProtocol:
+    def batches(self) -> BatchSQLAlchemyRepository:
         if self._batches is None:
-            msg = "UnitOfWork is closed; repositories are not available"
-            raise RuntimeError(msg)
+            self._batches = BatchSQLAlchemyRepository(self._get_session())
         return self._batches
 
     @property
-    def studies(self) -> StudyRepositoryProtocol:
+    def studies(self) -> StudySQLAlchemyRepository:
         if self._studies is None:
-            msg = "UnitOfWork is closed; repositories are not available"
-            raise RuntimeError(msg)
+            self._studies = StudySQLAlchemyRepository(self._get_session())
         return self._studies
 
     @property
-    def users(self) -> UserRepositoryProtocol:
+    def users(self) -> UserSQLAlchemyRepository:
         if self._users is None:
-            msg = "UnitOfWork is closed; repositories are not available"
-            raise RuntimeError(msg)
+            self._users = UserSQLAlchemyRepository(self._get_session())
         return self._users
 
     @property
-    def categories(self) -> StudyCategoryRepositoryProtocol:
+    def categories(self) -> StudyCategorySQLAlchemyRepository:
         if self._categories is None:
-            msg = "UnitOfWork is closed; repositories are not available"
-            raise RuntimeError(msg)
+            self._categories = StudyCategorySQLAlchemyRepository(self._get_session())
         return self._categories
 
+    @property
+    def stats(self) -> StudyStatsSQLAlchemyRepository:
+        if self._stats is None:
+            self._stats = StudyStatsSQLAlchemyRepository(self._get_session())
+        return self._stats
+
+
+class SqlAlchemyUnitOfWork(SqlAlchemyReadOnlyUnitOfWork, IUnitOfWork):
+    """UoW поверх AsyncSession с записью: изменения фиксирует ``commit``."""
+
+    def _reset_repositories(self) -> None:
+        super()._reset_repositories()
+        self._status_history: StudyStatusHistoryRepositoryProtocol | None = None
+        self._outbox: OutboxRepositoryProtocol | None = None
+
+    @property
+    def status_history(self) -> StudyStatusHistoryRepositoryProtocol:
+        if self._status_history is None:
+            self._status_history = StudyStatusHistorySQLAlchemyRepository(self._get_session())
+        return self._status_history
+
+    @property
+    def outbox(self) -> OutboxRepositoryProtocol:
+        if self._outbox is None:
+            self._outbox = OutboxSQLAlchemyRepository(self._get_session())
+        return self._outbox
+
     async def commit(self) -> None:
-        if self._tx is None or self.session is None:
+        if not self._entered:
             msg = "UnitOfWork is not active or already closed"
             raise RuntimeError(msg)
-        await self._tx.commit()
+        if self._tx is not None:
+            await self._tx.commit()
+        elif self.session is not None:
+            await self.session.commit()
 
     async def rollback(self) -> None:
-        if self._tx is None or self.session is None:
-            return
-        if self._tx.is_active:
-            await self._tx.rollback()
+        if self._tx is not None:
+            if self._tx.is_active:
+                await self._tx.rollback()
+        elif self.session is not None:
+            await self.session.rollback()
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from dataclasses import asdict, fields
+from datetime import datetime
+from enum import StrEnum
+from typing import Any
+
+from core.repositories.study_repo import StudyExportRow
+
+EXPORT_FIELDS = tuple(field.name for field in fields(StudyExportRow))
+# Строки копятся в буфере и отдаются кусками примерно такого размера, а не по одной
+_CHUNK_SIZE = 64 * 1024
+
+
+class ExportFormat(StrEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return "application/x-ndjson" if self is ExportFormat.NDJSON else "text/csv"
+
+
+def _json_default(value: Any) -> str:  # noqa: ANN401
+    if isinstance(value, datetime):
+        return value.isoformat()
+    msg = f"Object of type {type(value).__name__} is not JSON serializable"
+    raise TypeError(msg)
+
+
+def _csv_value(value: Any) -> Any:  # noqa: ANN401
+    if isinstance(value, list):
+        return ";".join(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def encode_export(rows: AsyncIterable[StudyExportRow], export_format: ExportFormat) -> AsyncIterator[bytes]:
+    """Кодирует строки выгрузки в NDJSON или CSV, отдавая куски по ~64 КБ."""
+    buffer = io.StringIO()
+    writer = None
+    if export_format is ExportFormat.CSV:
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+
+    async for row in rows:
+        if writer is None:
+            buffer.write(json.dumps(asdict(row), ensure_ascii=False, default=_json_default))
+            buffer.write("\n")
+        else:
+            writer.writerow([_csv_value(getattr(row, name)) for name in EXPORT_FIELDS])
+        if buffer.tell() >= _CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
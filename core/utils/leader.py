@@ -0,0 +1,78 @@
+import asyncio
+import time
+import uuid
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from core.utils.metrics import BACKGROUND_LEADER
+
+# Продлеваем лидерство, только если оно всё ещё наше (могло истечь и достаться другому)
+_REDIS_REFRESH = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_REDIS_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderElection:
+    """Выбирает один процесс сервиса, который выполняет общие фоновые задачи.
+
+    Лидер держит ключ ``<key_prefix>:<name>`` в Redis и продлевает его каждую треть ``ttl``;
+    остальные процессы раз в тот же интервал пробуют его поставить. Упавший лидер
+    освобождает место через ``ttl``. Если Redis не отвечает дольше, чем ключ мог
+    прожить, процесс перестаёт считать себя лидером.
+    """
+
+    def __init__(self, redis: Redis, *, name: str, ttl: float = 30.0, key_prefix: str = "leader") -> None:
+        self._redis = redis
+        self._key = f"{key_prefix}:{name}"
+        self._owner = uuid.uuid4().hex
+        self._ttl = ttl
+        self._interval = ttl / 3
+        # Момент, до которого ключ гарантированно наш
+        self._lease_until = 0.0
+        self._refresh = redis.register_script(_REDIS_REFRESH)
+        self._release = redis.register_script(_REDIS_RELEASE)
+
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._lease_until
+
+    async def run(self) -> None:
+        """Держит или ждёт лидерство до отмены задачи; при отмене отдаёт ключ."""
+        try:
+            while True:
+                await self._elect()
+                BACKGROUND_LEADER.set(int(self.is_leader()))
+                await asyncio.sleep(self._interval)
+        finally:
+            if self.is_leader():
+                self._lease_until = 0.0
+                BACKGROUND_LEADER.set(0)
+                await self._release(keys=[self._key], args=[self._owner])
+
+    async def _elect(self) -> None:
+        was_leader = self.is_leader()
+        started = time.monotonic()
+        try:
+            if was_leader:
+                owned = bool(await self._refresh(keys=[self._key], args=[self._owner, int(self._ttl * 1000)]))
+            else:
+                owned = bool(await self._redis.set(self._key, self._owner, nx=True, px=int(self._ttl * 1000)))
+        except RedisError:
+            logger.exception("Leader election {} failed", self._key)
+            return
+        # Срок считается от отправки команды: ключ мог начать истекать ещё до ответа
+        self._lease_until = started + self._ttl if owned else 0.0
+        if owned and not was_leader:
+            logger.info("This process is the leader of {}", self._key)
+        elif was_leader and not owned:
+            logger.warning("Lost leadership of {}", self._key)
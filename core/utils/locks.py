@@ -0,0 +1,190 @@
+import abc
+import asyncio
+import time
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from redis.asyncio import Redis
+from sqlalchemy import String, cast, func, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from core.utils.metrics import LOCK_HELD, LOCK_TIMEOUTS, LOCK_WAIT
+from core.utils.update_timing import record_time
+
+# SQLSTATE lock_not_available: истёк lock_timeout
+_PG_LOCK_NOT_AVAILABLE = "55P03"
+
+
+class LockTimeoutError(Exception):
+    def __init__(self, name: str, timeout: float) -> None:
+        super().__init__(f"Lock {name!r} was not acquired within {timeout}s")
+        self.name = name
+        self.timeout = timeout
+
+
+@dataclass(frozen=True, slots=True)
+class LockLease:
+    """Захваченная блокировка.
+
+    ``token`` - fencing token: строго растёт с каждым захватом одного ключа. Внешний ресурс
+    может отвергать запись с токеном меньше уже виденного, если владелец потерял блокировку
+    по TTL, но продолжил работу.
+    """
+
+    name: str
+    token: int
+    handle: Any = field(default=None, repr=False, compare=False)
+
+
+class LockManager(abc.ABC):
+    """Блокировки по ключу (``scope`` + ``key``), общие для всех процессов бота.
+
+    ``scope`` - вид ключа (``study``, ``user``); он же метка метрик, поэтому набор значений
+    должен быть небольшим, а id идут в ``key``.
+    """
+
+    backend: str
+
+    def __init__(self, *, timeout: float, ttl: float) -> None:
+        self._timeout = timeout
+        self._ttl = ttl
+
+    @asynccontextmanager
+    async def lock(self, scope: str, key: int | str, *, wait: float | None = None) -> AsyncIterator[LockLease]:
+        """Держит блокировку на время блока; ``wait`` - сколько ждать захвата (по умолчанию общий таймаут)."""
+        name = f"{scope}:{key}"
+        timeout = self._timeout if wait is None else wait
+        started = time.perf_counter()
+        try:
+            lease = await self._acquire(name, timeout)
+        finally:
+            waited = time.perf_counter() - started
+            LOCK_WAIT.labels(backend=self.backend, scope=scope).observe(waited)
+            record_time("lock_wait", waited)
+        if lease is None:
+            LOCK_TIMEOUTS.labels(backend=self.backend, scope=scope).inc()
+            raise LockTimeoutError(name, timeout)
+
+        acquired = time.perf_counter()
+        try:
+            yield lease
+        finally:
+            LOCK_HELD.labels(backend=self.backend, scope=scope).observe(time.perf_counter() - acquired)
+            await self._release(lease)
+
+    @abc.abstractmethod
+    async def _acquire(self, name: str, wait: float) -> LockLease | None:
+        """Возвращает None, если блокировку не удалось взять за ``wait`` секунд."""
+
+    @abc.abstractmethod
+    async def _release(self, lease: LockLease) -> None: ...
+
+
+# Захват и выдача fencing token атомарно: токен получает только тот, кто поставил ключ
+_REDIS_ACQUIRE = """
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+  local token = redis.call('incr', KEYS[2])
+  redis.call('pexpire', KEYS[2], ARGV[3])
+  return token
+end
+return false
+"""
+# Снимаем блокировку, только если она всё ещё наша (могла истечь и достаться другому)
+_REDIS_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# Счётчик токенов живёт много дольше любой блокировки, иначе токены начнутся заново
+_FENCE_TTL_MS = 7 * 24 * 3600 * 1000
+
+
+class RedisLockManager(LockManager):
+    """SET NX PX с опросом; блокировка истекает через ``ttl``, даже если владелец упал."""
+
+    backend = "redis"
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        timeout: float,
+        ttl: float,
+        poll_interval: float = 0.05,
+        key_prefix: str = "lock",
+    ) -> None:
+        super().__init__(timeout=timeout, ttl=ttl)
+        self._redis = redis
+        self._poll_interval = poll_interval
+        self._key_prefix = key_prefix
+        self._acquire_script = redis.register_script(_REDIS_ACQUIRE)
+        self._release_script = redis.register_script(_REDIS_RELEASE)
+
+    async def _acquire(self, name: str, wait: float) -> LockLease | None:
+        key = f"{self._key_prefix}:{name}"
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        while True:
+            token = await self._acquire_script(
+                keys=[key, f"{key}:fence"],
+                args=[owner, int(self._ttl * 1000), _FENCE_TTL_MS],
+            )
+            if token is not None:
+                return LockLease(name=name, token=int(token), handle=(key, owner))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(self._poll_interval, remaining))
+
+    async def _release(self, lease: LockLease) -> None:
+        key, owner = lease.handle
+        await self._release_script(keys=[key], args=[owner])
+
+
+class PostgresLockManager(LockManager):
+    """Advisory-блокировка уровня транзакции на отдельном соединении.
+
+    Ожидание ограничивает lock_timeout, поэтому опроса нет. Блокировка снимается
+    с концом транзакции, в том числе при обрыве соединения; ``ttl`` не используется.
+    Fencing token - id транзакции, которая держит блокировку.
+    """
+
+    backend = "postgres"
+
+    def __init__(self, engine: AsyncEngine, *, timeout: float, ttl: float) -> None:
+        super().__init__(timeout=timeout, ttl=ttl)
+        self._engine = engine
+
+    async def _acquire(self, name: str, wait: float) -> LockLease | None:
+        conn = await self._engine.connect()
+        try:
+            await conn.begin()
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{max(int(wait * 1000), 1)}ms'"))
+            res = await conn.execute(
+                select(
+                    func.pg_advisory_xact_lock(func.hashtextextended(name, 0)),
+                    cast(func.pg_current_xact_id(), String),
+                ),
+            )
+            token = int(res.one()[1])
+        except DBAPIError as e:
+            await conn.close()
+            if getattr(e.orig, "sqlstate", None) == _PG_LOCK_NOT_AVAILABLE:
+                return None
+            raise
+        except BaseException:
+            await conn.close()
+            raise
+        return LockLease(name=name, token=token, handle=conn)
+
+    async def _release(self, lease: LockLease) -> None:
+        conn: AsyncConnection = lease.handle
+        try:
+            await conn.rollback()
+        finally:
+            await conn.close()
@@ -0,0 +1,149 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["workload"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Pool checkouts that failed because the pool was exhausted",
+    ["workload"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out from the pool",
+    ["workload"],
+)
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation_ratio",
+    "Checked out connections relative to pool_size + max_overflow",
+    ["workload"],
+)
+DB_POOL_CONNECTIONS_CREATED = Counter(
+    "db_pool_connections_created_total",
+    "New DBAPI connections opened by the pool",
+    ["workload"],
+)
+DB_CONNECTION_AGE = Histogram(
+    "db_connection_age_seconds",
+    "Age of a pooled connection at checkout",
+    ["workload"],
+    buckets=(1, 10, 60, 300, 900, 1800, 3600, 7200, 21600, 86400),
+)
+DB_CONNECTION_HOLD = Histogram(
+    "db_connection_hold_seconds",
+    "Time a connection stays checked out of the pool",
+    ["workload"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_SCOPE_STATEMENTS = Histogram(
+    "db_scope_statements",
+    "SQL statements issued while handling one bot update or HTTP request",
+    ["scope"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_SCOPE_TIME = Histogram(
+    "db_scope_time_seconds",
+    "Total SQL execution time while handling one bot update or HTTP request",
+    ["scope"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_SCOPE_N_PLUS_ONE = Counter(
+    "db_scope_n_plus_one_total",
+    "Updates or requests that repeated the same SQL statement at least the configured number of times",
+    ["scope"],
+)
+LOCK_WAIT = Histogram(
+    "lock_wait_seconds",
+    "Time spent waiting to acquire a keyed lock",
+    ["backend", "scope"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+LOCK_TIMEOUTS = Counter(
+    "lock_timeouts_total",
+    "Keyed lock acquisitions that gave up after the timeout",
+    ["backend", "scope"],
+)
+LOCK_HELD = Histogram(
+    "lock_held_seconds",
+    "Time a keyed lock stays held",
+    ["backend", "scope"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+TELEGRAM_SEND_QUEUE = Gauge(
+    "telegram_send_queue_size",
+    "Outgoing Telegram requests waiting for the rate limiter",
+    ["priority"],
+)
+TELEGRAM_SEND_WAIT = Histogram(
+    "telegram_send_wait_seconds",
+    "Time an outgoing Telegram request waited for the rate limiter",
+    ["priority"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+TELEGRAM_RETRY_AFTER = Counter(
+    "telegram_retry_after_total",
+    "Telegram flood control (retry_after) responses",
+    ["method"],
+)
+OUTBOX_PROCESSED = Counter(
+    "outbox_processed_total",
+    "Outbox messages handled by the dispatcher",
+    ["kind", "outcome"],
+)
+OUTBOX_LAG = Histogram(
+    "outbox_delivery_lag_seconds",
+    "Time from writing an outbox message to its successful delivery",
+    ["kind"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+BOT_UPDATE_LAG = Histogram(
+    "bot_update_lag_seconds",
+    "Time from publishing an update to the stream until a worker starts processing it",
+    ["shard"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+BOT_UPDATE_DURATION = Histogram(
+    "bot_update_duration_seconds",
+    "End-to-end time of handling one update, by handler and callback data prefix",
+    ["handler", "prefix"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+BOT_UPDATE_COMPONENT_TIME = Histogram(
+    "bot_update_component_seconds",
+    "Time one update spent in a dependency (db, nextcloud, telegram, lock_wait), by handler",
+    ["handler", "component"],
+    buckets=(0, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+FSM_SESSION_ROUND_TRIPS = Histogram(
+    "fsm_session_round_trips",
+    "Redis round trips made by the FSM session per update",
+    buckets=(0, 1, 2, 3, 4, 5, 10),
+)
+ALBUMS_COLLECTED = Counter(
+    "albums_collected_total",
+    "Media groups assembled into one album",
+    ["backend"],
+)
+ALBUM_PARTS = Histogram(
+    "album_parts",
+    "Messages in an assembled album",
+    ["backend"],
+    buckets=(1, 2, 3, 4, 5, 6, 7, 8, 9, 10),
+)
+FSM_KEYS = Gauge(
+    "fsm_keys",
+    "FSM state and data keys in Redis by current state",
+    ["state"],
+)
+FSM_BYTES = Gauge(
+    "fsm_bytes",
+    "Size of FSM state and data values in Redis by current state",
+    ["state"],
+)
+BACKGROUND_LEADER = Gauge(
+    "background_jobs_leader",
+    "1 if this process runs the background jobs that must run in one process only",
+)
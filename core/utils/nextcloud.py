@@ -1,4 +1,5 @@
 from pathlib import PurePosixPath
+from typing import Any
 from urllib.parse import quote
 
 import httpx
@@ -6,6 +7,7 @@ from loguru import logger
 from lxml import etree
 
 from core.config import Settings
+from core.utils.update_timing import timed
 
 
 class NextcloudError(Exception):
@@ -20,9 +22,38 @@ class NextcloudNotFoundError(NextcloudError):
     """Raised when a resource not found."""
 
 
+class _TimedAsyncClient(httpx.AsyncClient):
+    """Время запросов (вместе с чтением ответа) попадает в разбивку апдейта бота."""
+
+    async def send(self, request: httpx.Request, **kwargs: Any) -> httpx.Response:  # noqa: ANN401
+        with timed("nextcloud"):
+            return await super().send(request, **kwargs)
+
+
 class NextcloudUtils:
+    """Клиент Nextcloud поверх одного httpx.AsyncClient.
+
+    Соединения переиспользуются между вызовами (keep-alive), поэтому TCP и TLS
+    устанавливаются один раз, а не на каждый запрос. Клиент закрывает ``aclose``.
+    """
+
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
+        self._client = _TimedAsyncClient(
+            auth=settings.NEXTCLOUD_AUTH,
+            limits=httpx.Limits(
+                max_connections=settings.NEXTCLOUD_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.NEXTCLOUD_MAX_CONNECTIONS,
+            ),
+        )
+
+    async def warm_up(self) -> None:
+        """Открывает соединение с Nextcloud заранее, чтобы первый обработчик не ждал рукопожатия."""
+        response = await self._client.request("PROPFIND", self.settings.NEXTCLOUD_WEBDAV_URL, headers={"Depth": "0"})
+        response.raise_for_status()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
 
     async def create_public_link(
         self,
@@ -47,13 +78,7 @@ class NextcloudUtils:
             "Accept": "application/xml",
         }
 
-        async with httpx.AsyncClient(timeout=timeout_s) as client:
-            response = await client.post(
-                share_api_url,
-                headers=headers,
-                data=data,
-                auth=self.settings.NEXTCLOUD_AUTH,
-            )
+        response = await self._client.post(share_api_url, headers=headers, data=data, timeout=timeout_s)
         response.raise_for_status()
 
         try:
@@ -77,14 +102,13 @@ class NextcloudUtils:
         headers = {"Depth": "0"}
         body = '<?xml version="1.0"?><d:propfind xmlns:d="DAV:"><d:prop><d:resourcetype/></d:prop></d:propfind>'
 
-        async with httpx.AsyncClient(timeout=timeout_s) as client:
-            resp = await client.request(
-                method="PROPFIND",
-                url=webdav_url,
-                content=body,
-                headers=headers,
-                auth=self.settings.NEXTCLOUD_AUTH,
-            )
+        resp = await self._client.request(
+            method="PROPFIND",
+            url=webdav_url,
+            content=body,
+            headers=headers,
+            timeout=timeout_s,
+        )
         if resp.status_code == 404:
             error_text = "Path-resource not found"
             raise NextcloudNotFoundError(error_text)
@@ -106,12 +130,11 @@ class NextcloudUtils:
 
     async def download_nc_files(self, file_urls_to_fetch: list[str], timeout_s: float = 10.0) -> dict[str, bytes]:
         files_content: dict[str, bytes] = {}
-        async with httpx.AsyncClient(timeout=timeout_s) as client:
-            for file_url in file_urls_to_fetch:
-                response = await client.get(file_url, auth=self.settings.NEXTCLOUD_AUTH)
-                response.raise_for_status()
-                file_name = file_url.rsplit("/", 1)[-1]
-                files_content[file_name] = response.content
+        for file_url in file_urls_to_fetch:
+            response = await self._client.get(file_url, timeout=timeout_s)
+            response.raise_for_status()
+            file_name = file_url.rsplit("/", 1)[-1]
+            files_content[file_name] = response.content
         return files_content
 
     async def create_folder(
@@ -127,8 +150,7 @@ class NextcloudUtils:
             new_folder += "/"
         folder_url = f"{self.settings.NEXTCLOUD_WEBDAV_URL}{path}{new_folder}"
 
-        async with httpx.AsyncClient(auth=self.settings.NEXTCLOUD_AUTH) as client:
-            response = await client.request("MKCOL", folder_url)
+        response = await self._client.request("MKCOL", folder_url)
 
         match response.status_code:
             case 201 | 200:
@@ -156,16 +178,15 @@ class NextcloudUtils:
         <d:prop><d:displayname/></d:prop>
         </d:propfind>"""
 
-        async with httpx.AsyncClient(auth=self.settings.NEXTCLOUD_AUTH) as client:
-            response = await client.request(
-                "PROPFIND",
-                f"{self.settings.NEXTCLOUD_WEBDAV_URL}{path}",
-                headers={
-                    "Depth": "1",
-                    "Content-Type": "application/xml; charset=utf-8",
-                },
-                content=body,
-            )
+        response = await self._client.request(
+            "PROPFIND",
+            f"{self.settings.NEXTCLOUD_WEBDAV_URL}{path}",
+            headers={
+                "Depth": "1",
+                "Content-Type": "application/xml; charset=utf-8",
+            },
+            content=body,
+        )
         response.raise_for_status()
 
         doc = etree.fromstring(response.content)
@@ -180,16 +201,15 @@ class NextcloudUtils:
         src_url = f"{base}/{self._encode_path(src_dir, ensure_trailing_slash=True)}"
         dst_url = f"{base}/{self._encode_path(dst_dir, ensure_trailing_slash=True)}"
 
-        async with httpx.AsyncClient(auth=self.settings.NEXTCLOUD_AUTH) as client:
-            resp = await client.request(
-                "COPY",
-                src_url,
-                headers={
-                    "Destination": dst_url,
-                    "Depth": "infinity",
-                    "Overwrite": "T",
-                },
-            )
+        resp = await self._client.request(
+            "COPY",
+            src_url,
+            headers={
+                "Destination": dst_url,
+                "Depth": "infinity",
+                "Overwrite": "T",
+            },
+        )
         resp.raise_for_status()
 
     def _encode_path(self, path: str, *, ensure_trailing_slash: bool = False) -> str:
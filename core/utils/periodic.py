@@ -0,0 +1,35 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from loguru import logger
+
+# Как часто пропущенная задача проверяет, не пора ли ей работать: новый лидер не ждёт полный интервал
+_SKIP_RECHECK = 5.0
+
+
+async def run_periodic(
+    name: str,
+    interval: float,
+    job: Callable[[], Awaitable[None]],
+    *,
+    should_run: Callable[[], bool] | None = None,
+) -> None:
+    """Запускает ``job`` каждые ``interval`` секунд, первый раз - сразу.
+
+    Если задан ``should_run``, прогон пропускается, пока он возвращает False (например,
+    процесс не лидер), и выполняется сразу, как только он вернёт True. Ошибка одного
+    прогона логируется и не останавливает цикл; остановка - через отмену задачи.
+    """
+    while True:
+        if should_run is not None and not should_run():
+            await asyncio.sleep(min(interval, _SKIP_RECHECK))
+            continue
+        started = time.perf_counter()
+        try:
+            await job()
+        except Exception:  # noqa: BLE001
+            logger.exception("Periodic job {} failed", name)
+        else:
+            logger.debug("Periodic job {} finished in {:.3f}s", name, time.perf_counter() - started)
+        await asyncio.sleep(interval)
@@ -0,0 +1,79 @@
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine.interfaces import DBAPIConnection
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, PoolProxiedConnection
+
+from core.utils.metrics import (
+    DB_CONNECTION_AGE,
+    DB_CONNECTION_HOLD,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_TIMEOUTS,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_CONNECTIONS_CREATED,
+    DB_POOL_SATURATION,
+)
+
+_CONNECTED_AT_KEY = "telemetry_connected_at"
+_CHECKED_OUT_AT_KEY = "telemetry_checked_out_at"
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, замеряющий время ожидания соединения.
+
+    В событиях пула нет точки "до checkout", поэтому ожидание меряется здесь.
+    Метка workload берётся из ``pool_logging_name`` - он переживает ``recreate()``.
+    """
+
+    def connect(self) -> PoolProxiedConnection:
+        workload = self.logging_name or "default"
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(workload=workload).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(workload=workload).observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine, *, workload: str, capacity: int) -> None:
+    """Вешает обработчики событий пула, экспортирующие метрики в prometheus."""
+    sync_engine = engine.sync_engine
+
+    def observe_checked_out(returning: int = 0) -> None:
+        pool = sync_engine.pool
+        if not isinstance(pool, AsyncAdaptedQueuePool):
+            return
+        checked_out = pool.checkedout() - returning
+        DB_POOL_CHECKED_OUT.labels(workload=workload).set(checked_out)
+        DB_POOL_SATURATION.labels(workload=workload).set(checked_out / capacity if capacity else 0)
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection: DBAPIConnection, connection_record: ConnectionPoolEntry) -> None:  # noqa: ARG001
+        connection_record.info[_CONNECTED_AT_KEY] = time.monotonic()
+        DB_POOL_CONNECTIONS_CREATED.labels(workload=workload).inc()
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(
+        dbapi_connection: DBAPIConnection,  # noqa: ARG001
+        connection_record: ConnectionPoolEntry,
+        connection_proxy: Any,  # noqa: ANN401, ARG001
+    ) -> None:
+        now = time.monotonic()
+        connection_record.info[_CHECKED_OUT_AT_KEY] = now
+        connected_at = connection_record.info.get(_CONNECTED_AT_KEY)
+        if connected_at is not None:
+            DB_CONNECTION_AGE.labels(workload=workload).observe(now - connected_at)
+        observe_checked_out()
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection: DBAPIConnection | None, connection_record: ConnectionPoolEntry) -> None:  # noqa: ARG001
+        checked_out_at = connection_record.info.pop(_CHECKED_OUT_AT_KEY, None)
+        if checked_out_at is not None:
+            DB_CONNECTION_HOLD.labels(workload=workload).observe(time.monotonic() - checked_out_at)
+        # checkin срабатывает до возврата соединения в пул, и checkedout() его ещё считает
+        observe_checked_out(returning=1)
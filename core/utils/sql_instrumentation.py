@@ -0,0 +1,129 @@
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.utils.metrics import DB_SCOPE_N_PLUS_ONE, DB_SCOPE_STATEMENTS, DB_SCOPE_TIME
+from core.utils.update_timing import record_time
+
+# Время начала хранится на контексте выполнения: он живёт одно выполнение, даже если запрос упал
+_STARTED_AT_ATTR = "sql_stats_started_at"
+_STATEMENT_LOG_LIMIT = 300
+
+
+@dataclass(slots=True)
+class SqlStats:
+    """Статистика SQL в рамках одного апдейта бота или HTTP-запроса."""
+
+    scope: str
+    statements: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: str | None = None
+    repeats: Counter[str] = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.statements += 1
+        self.total_time += elapsed
+        self.repeats[statement] += 1
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Одинаковые запросы, выполненные не меньше ``threshold`` раз - вероятный N+1."""
+        return {statement: count for statement, count in self.repeats.items() if count >= threshold}
+
+
+_current_stats: ContextVar[SqlStats | None] = ContextVar("sql_stats", default=None)
+
+
+@contextmanager
+def sql_scope(scope: str, *, n_plus_one_threshold: int) -> Iterator[SqlStats]:
+    """Собирает статистику запросов, выполненных внутри блока, и отправляет её в метрики и лог.
+
+    Имя ``scope`` можно уточнить через возвращённый объект до выхода из блока.
+    """
+    stats = SqlStats(scope=scope)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        _report(stats, n_plus_one_threshold)
+
+
+def instrument_sql(engine: AsyncEngine) -> None:
+    """Вешает обработчики cursor_execute, которые пишут запросы в статистику текущего scope."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn: Connection,  # noqa: ARG001
+        cursor: Any,  # noqa: ANN401, ARG001
+        statement: str,  # noqa: ARG001
+        parameters: Any,  # noqa: ANN401, ARG001
+        context: ExecutionContext | None,
+        executemany: bool,  # noqa: ARG001, FBT001
+    ) -> None:
+        if context is not None:
+            setattr(context, _STARTED_AT_ATTR, time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Connection,  # noqa: ARG001
+        cursor: Any,  # noqa: ANN401, ARG001
+        statement: str,
+        parameters: Any,  # noqa: ANN401, ARG001
+        context: ExecutionContext | None,
+        executemany: bool,  # noqa: ARG001, FBT001
+    ) -> None:
+        started = getattr(context, _STARTED_AT_ATTR, None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        record_time("db", elapsed)
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+
+def _shorten(statement: str | None) -> str | None:
+    if statement is None:
+        return None
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= _STATEMENT_LOG_LIMIT else f"{statement[:_STATEMENT_LOG_LIMIT]}..."
+
+
+def _report(stats: SqlStats, n_plus_one_threshold: int) -> None:
+    DB_SCOPE_STATEMENTS.labels(scope=stats.scope).observe(stats.statements)
+    DB_SCOPE_TIME.labels(scope=stats.scope).observe(stats.total_time)
+    if not stats.statements:
+        return
+
+    fields = {
+        "sql_scope": stats.scope,
+        "sql_statements": stats.statements,
+        "sql_time_ms": round(stats.total_time * 1000, 2),
+        "sql_slowest_ms": round(stats.slowest_time * 1000, 2),
+        "sql_slowest": _shorten(stats.slowest_statement),
+    }
+    repeated = stats.repeated(n_plus_one_threshold)
+    if repeated:
+        DB_SCOPE_N_PLUS_ONE.labels(scope=stats.scope).inc()
+        statement, count = max(repeated.items(), key=lambda item: item[1])
+        logger.bind(**fields, sql_repeated=_shorten(statement), sql_repeated_count=count).warning(
+            "Possible N+1 in {}: statement repeated {} times",
+            stats.scope,
+            count,
+        )
+    else:
+        logger.bind(**fields).debug("SQL stats for {}", stats.scope)
@@ -0,0 +1,84 @@
+from collections.abc import AsyncIterator, Awaitable, Iterable
+from contextlib import asynccontextmanager
+from typing import cast
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from core.models.study import Study
+from core.unit_of_work import IUnitOfWork
+
+
+class StudyReadyQueue:
+    """Очередь готовых к разметке исследований: по списку Redis на проект.
+
+    Список - только подсказка: каждый id подтверждается условным UPDATE в Postgres.
+    Лишние id отбрасываются при назначении. Id, снятый процессом, который упал до commit,
+    пропадает из списка, и исследование не выдаётся до следующего ``reconcile``.
+    """
+
+    def __init__(self, redis: Redis, *, key_prefix: str = "study_ready") -> None:
+        self._redis = redis
+        self._key_prefix = key_prefix
+
+    def _key(self, project_id: int) -> str:
+        return f"{self._key_prefix}:{project_id}"
+
+    async def push(self, project_id: int, study_ids: Iterable[int]) -> None:
+        ids = list(study_ids)
+        if ids:
+            # Асинхронный клиент всегда возвращает awaitable, но команды redis-py типизированы для обоих клиентов
+            await cast("Awaitable[int]", self._redis.rpush(self._key(project_id), *ids))
+
+    async def push_front(self, project_id: int, study_id: int) -> None:
+        # Сброшенное исследование старше новых, поэтому уходит в начало, как и при выборке по id
+        await cast("Awaitable[int]", self._redis.lpush(self._key(project_id), study_id))
+
+    async def pop(self, project_id: int) -> int | None:
+        value = await cast("Awaitable[str | None]", self._redis.lpop(self._key(project_id)))
+        return int(value) if value is not None else None
+
+    @asynccontextmanager
+    async def assign(self, uow: IUnitOfWork, project_id: int, user_id: int) -> AsyncIterator[Study | None]:
+        """Назначает пользователю следующее исследование проекта.
+
+        Вызывается внутри открытого ``uow``; назначение фиксирует commit внутри блока. Если блок
+        завершился исключением (в том числе отменой или ошибкой commit), транзакция откатится,
+        поэтому id возвращается в начало списка. Для пустого проекта это один LPOP без обращения к Postgres.
+        """
+        study = await self._assign(uow, project_id, user_id)
+        try:
+            yield study
+        except BaseException:
+            if study is not None:
+                # Если исключение случилось уже после commit, лишний id отбросит следующее назначение
+                await self.push_front(project_id, study.id)
+            raise
+
+    async def _assign(self, uow: IUnitOfWork, project_id: int, user_id: int) -> Study | None:
+        while (study_id := await self.pop(project_id)) is not None:
+            study = await uow.studies.assign_by_id(study_id=study_id, project_id=project_id, user_id=user_id)
+            if study:
+                return study
+            logger.debug("Skipped stale study id={} from ready queue of project {}", study_id, project_id)
+        return None
+
+    async def reconcile(self, uow: IUnitOfWork) -> None:
+        """Пересобирает списки по NEW исследованиям из Postgres.
+
+        Id, добавленные между чтением и записью, вернутся на следующем проходе;
+        лишние будут отброшены при назначении.
+        """
+        async with uow:
+            ids_by_project = await uow.studies.get_new_ids_by_project()
+
+        actual_keys = {self._key(project_id) for project_id in ids_by_project}
+        stale_keys = {key async for key in self._redis.scan_iter(match=f"{self._key_prefix}:*")} - actual_keys
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for project_id, study_ids in ids_by_project.items():
+                pipe.delete(self._key(project_id))
+                pipe.rpush(self._key(project_id), *study_ids)
+            for key in stale_keys:
+                pipe.delete(key)
+            await pipe.execute()
+        logger.debug("Ready queues reconciled for {} projects", len(ids_by_project))
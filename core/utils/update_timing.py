@@ -0,0 +1,61 @@
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+# Зависимости, время в которых считается для каждого апдейта
+COMPONENTS = ("db", "nextcloud", "telegram", "lock_wait")
+
+
+@dataclass(slots=True)
+class UpdateTiming:
+    """Время обработки одного апдейта бота с разбивкой по зависимостям.
+
+    Вызовы, выполняемые параллельно (``asyncio.gather``), суммируются, поэтому сумма
+    по зависимостям может превышать общее время.
+    """
+
+    handler: str
+    prefix: str = ""
+    components: defaultdict[str, float] = field(default_factory=lambda: defaultdict(float))
+    calls: Counter[str] = field(default_factory=Counter)
+
+    def record(self, component: str, elapsed: float) -> None:
+        self.components[component] += elapsed
+        self.calls[component] += 1
+
+
+_current_timing: ContextVar[UpdateTiming | None] = ContextVar("update_timing", default=None)
+
+
+@contextmanager
+def update_timing(handler: str) -> Iterator[UpdateTiming]:
+    """Собирает время зависимостей, потраченное внутри блока; ``handler`` можно уточнить позже."""
+    timing = UpdateTiming(handler=handler)
+    token = _current_timing.set(timing)
+    try:
+        yield timing
+    finally:
+        _current_timing.reset(token)
+
+
+def current_timing() -> UpdateTiming | None:
+    return _current_timing.get()
+
+
+def record_time(component: str, elapsed: float) -> None:
+    """Добавляет время к апдейту, который обрабатывается в этой задаче; вне апдейта ничего не делает."""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.record(component, elapsed)
+
+
+@contextmanager
+def timed(component: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(component, time.perf_counter() - started)
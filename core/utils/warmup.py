@@ -0,0 +1,87 @@
+import time
+from collections.abc import Iterator
+from contextlib import AsyncExitStack, contextmanager
+
+from dishka import AsyncContainer
+from loguru import logger
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from bot.utils.deep_link_codec import DeepLinkCodec
+from core.config import Settings
+from core.database import DatabaseManager
+from core.unit_of_work import SqlAlchemyUnitOfWork
+from core.utils.locks import LockManager
+from core.utils.nextcloud import NextcloudUtils
+from core.utils.study_queue import StudyReadyQueue
+
+# Заведомо несуществующий id: запросы проходят разбор и планирование, но ничего не находят
+_MISSING_ID = 0
+
+
+@contextmanager
+def _step(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    yield
+    logger.info("Warm-up: {} done in {:.1f} ms", name, (time.perf_counter() - started) * 1000)
+
+
+async def _prepare_hot_statements(conn: AsyncConnection, *, readonly: bool) -> None:
+    """Выполняет горячие запросы обработчиков на соединении и откатывает транзакцию.
+
+    SQLAlchemy кладёт скомпилированный SQL в кэш движка, asyncpg - подготовленные
+    выражения в кэш соединения, поэтому первый живой апдейт не платит за то и другое.
+    """
+    uow = SqlAlchemyUnitOfWork(lambda: AsyncSession(bind=conn))
+    async with uow:
+        await uow.users.get_by_tg_id_with_projects(_MISSING_ID)
+        await uow.users.get_by_id(_MISSING_ID)
+        await uow.studies.get_context(_MISSING_ID)
+        await uow.studies.get_assigned_for_annotator(_MISSING_ID)
+        await uow.studies.get_in_review_for_expert(_MISSING_ID)
+        if not readonly:
+            # UPDATE ... RETURNING без подходящих строк; транзакция всё равно откатывается
+            await uow.studies.assign_to_user(_MISSING_ID, _MISSING_ID)
+
+
+async def _prefill_pool(engine: AsyncEngine, size: int, *, readonly: bool = False) -> None:
+    # Все соединения берутся одновременно, иначе пул отдавал бы одно и то же
+    async with AsyncExitStack() as stack:
+        connections = [await stack.enter_async_context(engine.connect()) for _ in range(size)]
+        for conn in connections:
+            await _prepare_hot_statements(conn, readonly=readonly)
+
+
+async def warm_up(container: AsyncContainer, settings: Settings) -> None:
+    """Готовит процесс к первому апдейту: зависимости, пулы соединений, подготовленные запросы.
+
+    Ошибки базы и Redis пробрасываются - без них бот не работает. Недоступный Nextcloud
+    только логируется: большая часть сценариев обходится без него.
+    """
+    started = time.perf_counter()
+    with _step("APP dependencies"):
+        db_manager = await container.get(DatabaseManager)
+        nc_util = await container.get(NextcloudUtils)
+        await container.get(DeepLinkCodec)
+        redis = await container.get(Redis)
+        await container.get(StudyReadyQueue)
+        await container.get(LockManager)
+
+    size = min(settings.DATABASE_WARMUP_CONNECTIONS, settings.DATABASE_POOL_SIZE)
+    if size > 0:
+        with _step(f"{size} bot pool connections"):
+            await _prefill_pool(db_manager.engine, size)
+        if db_manager.replica_engine is not None:
+            with _step(f"{size} replica pool connections"):
+                await _prefill_pool(db_manager.replica_engine, size, readonly=True)
+
+    with _step("Redis"):
+        await redis.ping()
+
+    with _step("Nextcloud"):
+        try:
+            await nc_util.warm_up()
+        except Exception:  # noqa: BLE001
+            logger.opt(exception=True).warning("Warm-up: Nextcloud is unavailable")
+
+    logger.info("Warm-up finished in {:.1f} ms", (time.perf_counter() - started) * 1000)
@@ -1,57 +1,204 @@
 import asyncio
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Awaitable, Callable
 from contextlib import asynccontextmanager, suppress
+from functools import partial
 
 from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.base import DefaultKeyBuilder
-from aiogram.fsm.storage.redis import RedisStorage
-from aiogram.utils.callback_answer import CallbackAnswerMiddleware
-from dishka.integrations.aiogram import setup_dishka as setup_dishka_aiogram
 from dishka.integrations.fastapi import setup_dishka as setup_dishka_fastapi
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
+from redis.asyncio import Redis
 
-from bot.register_handlers import register_handlers
+from bot.factory import create_bot, create_dispatcher, create_fsm_storage
+from bot.outbox import OutboxDispatcher
+from bot.update_stream import UpdateStreamPublisher, run_polling_ingress
 from bot.utils.commands import set_commands
+from bot.utils.fsm_storage import CompactRedisStorage, report_fsm_usage
+from bot.webhook import WebhookUpdateFeeder
 from core.config import Settings
+from core.database import DatabaseWorkload
 from core.di import container
+from core.unit_of_work import IUnitOfWork
+from core.utils.leader import LeaderElection
 from core.utils.logging_config import setup_logging
-from web_api import routes
+from core.utils.nextcloud import NextcloudUtils
+from core.utils.periodic import run_periodic
+from core.utils.study_queue import StudyReadyQueue
+from core.utils.warmup import warm_up
+from web_api import export, health, metrics, routes, telegram
+from web_api.utils.sql_stats import SqlStatsMiddleware
 
 _settings = Settings()
+_OUTBOX_PURGE_INTERVAL = 3600.0
+
+
+async def _reconcile_ready_queues() -> None:
+    async with container() as request_container:
+        uow = await request_container.get(IUnitOfWork, component=DatabaseWorkload.BACKGROUND)
+        ready_queue = await request_container.get(StudyReadyQueue)
+        await ready_queue.reconcile(uow)
+
+
+async def _maintain_status_history() -> None:
+    async with container() as request_container:
+        uow = await request_container.get(IUnitOfWork, component=DatabaseWorkload.BACKGROUND)
+        async with uow:
+            removed = await uow.status_history.maintain_partitions(
+                _settings.STATUS_HISTORY_PARTITIONS_AHEAD,
+                _settings.STATUS_HISTORY_RETENTION_MONTHS,
+                archive=_settings.STATUS_HISTORY_ARCHIVE,
+            )
+            await uow.commit()
+    if removed:
+        logger.info("Removed {} expired study_status_history partitions", removed)
+
+
+async def _refresh_stats() -> None:
+    async with container() as request_container:
+        uow = await request_container.get(IUnitOfWork, component=DatabaseWorkload.BACKGROUND)
+        async with uow:
+            rows = await uow.stats.refresh(_settings.STATS_REFRESH_LAG_SECONDS)
+            await uow.commit()
+    logger.debug("Stats rollups refreshed with {} history rows", rows)
+
+
+async def _purge_outbox() -> None:
+    async with container() as request_container:
+        uow = await request_container.get(IUnitOfWork, component=DatabaseWorkload.BACKGROUND)
+        async with uow:
+            removed = await uow.outbox.purge(_settings.OUTBOX_RETENTION_DAYS)
+            await uow.commit()
+    if removed:
+        logger.info("Purged {} processed outbox messages", removed)
+
+
+async def _start_webhook(
+    app: FastAPI,
+    dp: Dispatcher,
+    bot: Bot,
+    publisher: UpdateStreamPublisher | None,
+) -> WebhookUpdateFeeder:
+    if not _settings.BOT_WEBHOOK_BASE_URL or _settings.BOT_WEBHOOK_SECRET is None:
+        msg = "BOT_WEBHOOK_BASE_URL and BOT_WEBHOOK_SECRET are required when BOT_MODE=webhook"
+        raise RuntimeError(msg)
+    secret_token = _settings.BOT_WEBHOOK_SECRET.get_secret_value()
+    feeder = WebhookUpdateFeeder(
+        dp,
+        bot,
+        secret_token=secret_token,
+        max_in_flight=_settings.BOT_WEBHOOK_MAX_IN_FLIGHT,
+        publisher=publisher,
+        settings=_settings,
+    )
+    if publisher is None:
+        await dp.emit_startup(bot=bot, settings=_settings)
+    app.state.webhook_feeder = feeder
+    # Каждый процесс ставит один и тот же webhook, повторный вызов ничего не меняет
+    await bot.set_webhook(
+        url=f"{_settings.BOT_WEBHOOK_BASE_URL.rstrip('/')}/api/v1/telegram/webhook",
+        secret_token=secret_token,
+        max_connections=_settings.BOT_WEBHOOK_MAX_CONNECTIONS,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logger.info("Telegram webhook is set")
+    return feeder
+
+
+async def _start_background_tasks(bot: Bot, fsm_storage: CompactRedisStorage) -> list[asyncio.Task[None]]:
+    outbox_dispatcher = OutboxDispatcher(
+        container,
+        bot,
+        await container.get(NextcloudUtils),
+        poll_interval=_settings.OUTBOX_POLL_INTERVAL,
+        batch_size=_settings.OUTBOX_BATCH_SIZE,
+        lease_seconds=_settings.OUTBOX_LEASE_SECONDS,
+        max_attempts=_settings.OUTBOX_MAX_ATTEMPTS,
+    )
+    # Обслуживание общее для всех процессов сервиса, его выполняет только лидер.
+    # Outbox разбирают все процессы: сообщения захватываются с FOR UPDATE SKIP LOCKED
+    leader = LeaderElection(await container.get(Redis), name="background_jobs")
+    periodic_jobs: list[tuple[str, float, Callable[[], Awaitable[None]]]] = [
+        ("maintain_status_history", _settings.STATUS_HISTORY_MAINTENANCE_INTERVAL, _maintain_status_history),
+        ("refresh_stats", _settings.STATS_REFRESH_INTERVAL, _refresh_stats),
+        ("purge_outbox", _OUTBOX_PURGE_INTERVAL, _purge_outbox),
+        # Метрики одни на весь Redis: с одного процесса они не задваиваются при суммировании
+        ("fsm_usage", _settings.BOT_FSM_STATS_INTERVAL, partial(report_fsm_usage, fsm_storage)),
+    ]
+    if _settings.ASSIGNMENT_ENGINE == "redis":
+        periodic_jobs.append(
+            ("reconcile_ready_queues", _settings.ASSIGNMENT_RECONCILE_INTERVAL, _reconcile_ready_queues),
+        )
+    return [
+        asyncio.create_task(leader.run()),
+        *(
+            asyncio.create_task(run_periodic(name, interval, job, should_run=leader.is_leader))
+            for name, interval, job in periodic_jobs
+        ),
+        asyncio.create_task(outbox_dispatcher.run()),
+    ]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     setup_logging(_settings)
+    app.state.ready = False
+    # Прогрев до начала polling: первый апдейт не ждёт соединений и подготовки запросов
+    await warm_up(container, _settings)
 
     logger.info("Starting telegram bot..")
-    bot_properties = DefaultBotProperties(parse_mode="html", link_preview_is_disabled=True)
-    bot = Bot(token=_settings.BOT_TOKEN, default=bot_properties)
-    storage = RedisStorage.from_url(str(_settings.REDIS_URI), key_builder=DefaultKeyBuilder(with_destiny=True))
-    dp = Dispatcher(storage=storage)
-    dp.callback_query.middleware(CallbackAnswerMiddleware())
-    register_handlers(dp)
+    bot = create_bot(_settings)
+    fsm_storage = create_fsm_storage(_settings)
+    dp = create_dispatcher(_settings, container, fsm_storage)
     await set_commands(bot)
-    polling_task = asyncio.create_task(
-        dp.start_polling(
-            bot,
-            allowed_updates=dp.resolve_used_update_types(),
-            settings=_settings,
-            handle_signals=False,
-        ),
-    )
-    setup_dishka_aiogram(container=container, router=dp, auto_inject=True)
+    # С шардированием этот процесс только принимает апдейты, обрабатывают их воркеры (bot/worker.py)
+    publisher: UpdateStreamPublisher | None = None
+    if _settings.BOT_UPDATE_SHARDS > 0:
+        publisher = UpdateStreamPublisher(
+            await container.get(Redis),
+            shards=_settings.BOT_UPDATE_SHARDS,
+            maxlen=_settings.BOT_UPDATE_STREAM_MAXLEN,
+        )
+    polling_task: asyncio.Task[None] | None = None
+    webhook_feeder: WebhookUpdateFeeder | None = None
+    if _settings.BOT_MODE == "webhook":
+        webhook_feeder = await _start_webhook(app, dp, bot, publisher)
+    else:
+        # getUpdates не работает, пока у бота установлен webhook
+        await bot.delete_webhook()
+        if publisher is not None:
+            polling = run_polling_ingress(bot, publisher, allowed_updates=dp.resolve_used_update_types())
+        else:
+            polling = dp.start_polling(
+                bot,
+                allowed_updates=dp.resolve_used_update_types(),
+                settings=_settings,
+                handle_signals=False,
+            )
+        polling_task = asyncio.create_task(polling)
 
+    background_tasks = await _start_background_tasks(bot, fsm_storage)
+
+    app.state.ready = True
+    logger.info("Service is ready")
     try:
         yield
     finally:
+        app.state.ready = False
+        for task in background_tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
         if polling_task and not polling_task.done():
             polling_task.cancel()
             with suppress(asyncio.CancelledError):
                 await polling_task
+        if webhook_feeder is not None:
+            # Webhook не снимается: остальные процессы продолжают принимать апдейты
+            app.state.webhook_feeder = None
+            await webhook_feeder.close()
+            if publisher is None:
+                await dp.emit_shutdown(bot=bot, settings=_settings)
         await bot.session.close()
         await dp.storage.close()
         await app.state.dishka_container.close()
@@ -70,7 +217,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if _settings.DATABASE_SQL_STATS:
+    app.add_middleware(SqlStatsMiddleware, n_plus_one_threshold=_settings.DATABASE_N_PLUS_ONE_THRESHOLD)
 app.include_router(routes.router, prefix="/api/v1")
+app.include_router(export.router, prefix="/api/v1")
+app.include_router(telegram.router, prefix="/api/v1")
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 setup_dishka_fastapi(container=container, app=app)
 
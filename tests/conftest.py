@@ -0,0 +1,124 @@
+import importlib.util
+import os
+from collections.abc import AsyncIterator, Awaitable, Callable
+from itertools import count
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from core.database import metadata
+from core.models import Batch, Project, Study
+from core.models.project import ProductEnum
+from core.models.study import StudyStatusEnum
+
+# Settings() создаётся при импорте core.di, поэтому обязательные переменные задаются до импорта модулей бота
+for name, value in {
+    "BOT_TOKEN": "123456:test-token",
+    "BOT_SECRET": "test-secret",
+    "DATABASE_HOST": "localhost",
+    "DATABASE_USER": "test",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "NEXTCLOUD_WEBHOOK_TOKEN": "test",
+    "NEXTCLOUD_WEBDAV_URL": "http://nextcloud.test/remote.php/dav/files/bot/",
+    "NEXTCLOUD_OCS_URL": "http://nextcloud.test/ocs/v2.php/apps",
+    "NEXTCLOUD_AUTH": '["bot", "password"]',
+    "NEXTCLOUD_DIRECTORIES": '["projects/ct"]',
+}.items():
+    os.environ.setdefault(name, value)
+
+MakeStudy = Callable[..., Awaitable[Study]]
+
+_MIGRATIONS_DIR = Path(__file__).parent.parent / "alembic" / "versions"
+
+
+def load_migration(name: str) -> ModuleType:
+    """Модуль миграции по имени файла без ``.py``: из него берутся SQL функций и ``upgrade``."""
+    path = _MIGRATIONS_DIR / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    assert spec is not None
+    assert spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def run_upgrade(session: AsyncSession, migration: ModuleType) -> None:
+    """Выполняет ``upgrade()`` миграции в транзакции теста.
+
+    Годится для миграций, которые только создают функции: схема теста собрана ``metadata.create_all``.
+    """
+
+    def upgrade(sync_session: Session) -> None:
+        with Operations.context(MigrationContext.configure(sync_session.connection())):
+            migration.upgrade()
+
+    await session.run_sync(upgrade)
+
+
+@pytest.fixture
+async def pg_session() -> AsyncIterator[AsyncSession]:
+    """Сессия PostgreSQL из ``TEST_DATABASE_URL``; без неё тест пропускается.
+
+    Схема создаётся внутри транзакции теста и откатывается вместе с ней, поэтому база
+    остаётся пустой. ``commit`` в коде под тестом фиксирует только точку сохранения.
+    Триггеры и функции миграций не создаются.
+    """
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_async_engine(url, poolclass=NullPool)
+    try:
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            await conn.run_sync(metadata.create_all)
+            session = AsyncSession(
+                bind=conn,
+                join_transaction_mode="create_savepoint",
+                expire_on_commit=False,
+                autoflush=False,
+            )
+            try:
+                yield session
+            finally:
+                await session.close()
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def make_study(pg_session: AsyncSession) -> MakeStudy:
+    """Создаёт исследование; проект и партия создаются по номеру проекта при первом обращении."""
+    ids = count(1)
+    batches: dict[int, Batch] = {}
+
+    async def make(project_id: int = 1, status: StudyStatusEnum = StudyStatusEnum.NEW, **values: object) -> Study:
+        if project_id not in batches:
+            pg_session.add(
+                Project(id=project_id, name=f"project-{project_id}", tg_group_id=-project_id, product=ProductEnum.DX),
+            )
+            await pg_session.flush()
+            batch = batches[project_id] = Batch(name=f"batch-{project_id}", project_id=project_id)
+            pg_session.add(batch)
+            await pg_session.flush()
+        number = next(ids)
+        study = Study(
+            study_iuid=f"1.2.840.{number}",
+            batch_id=batches[project_id].id,
+            project_id=project_id,
+            study_path=f"projects/ct/1-original-data/{number:04d}",
+            status=status,
+            **values,
+        )
+        pg_session.add(study)
+        await pg_session.flush()
+        return study
+
+    return make
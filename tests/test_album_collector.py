@@ -0,0 +1,106 @@
+import asyncio
+from contextlib import suppress
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+import pytest
+from aiogram.types import Chat, Message
+from fakeredis.aioredis import FakeRedis
+
+from bot.utils.album_collector import MAX_ALBUM_SIZE, MemoryAlbumCollector, RedisAlbumCollector
+
+GROUP = "album-1"
+
+
+def _part(message_id: int, group: str | None = GROUP) -> Message:
+    return Message(
+        message_id=message_id,
+        date=datetime.now(UTC),
+        chat=Chat(id=1, type="private"),
+        media_group_id=group,
+    )
+
+
+def _ids(album: list[Message] | None) -> list[int]:
+    assert album is not None
+    return [part.message_id for part in album]
+
+
+def _redis_collector(redis: FakeRedis, monkeypatch: pytest.MonkeyPatch) -> RedisAlbumCollector:
+    collector = RedisAlbumCollector(redis, quiet=0.1, max_wait=1.0, poll_interval=0.01)
+
+    # Шаги скрипта _add_part в одной транзакции MULTI: добавить часть, отметить время, занять лидерство
+    async def add_part(keys: list[str], args: list[object]) -> int:
+        parts_key, last_key, leader_key = keys
+        payload, leader, ttl_ms, now_ms = args
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(parts_key, str(payload))
+            pipe.pexpire(parts_key, int(str(ttl_ms)))
+            pipe.set(last_key, str(now_ms), px=int(str(ttl_ms)))
+            pipe.set(leader_key, str(leader), nx=True, px=int(str(ttl_ms)))
+            *_, is_leader = await pipe.execute()
+        return 1 if is_leader else 0
+
+    monkeypatch.setattr(collector, "_add_part", add_part)
+    return collector
+
+
+async def test_memory_leader_gets_whole_album_in_order() -> None:
+    collector = MemoryAlbumCollector(quiet=0.1, max_wait=1.0, max_pending=10)
+    bot = MagicMock()
+
+    leader = asyncio.create_task(collector.collect(_part(3), bot))
+    await asyncio.sleep(0.02)
+    assert await collector.collect(_part(1), bot) is None
+    await asyncio.sleep(0.02)
+    assert await collector.collect(_part(2), bot) is None
+
+    assert _ids(await leader) == [1, 2, 3]
+    single = _part(4, group=None)
+    assert await collector.collect(single, bot) == [single]
+
+
+async def test_memory_album_ends_at_max_size_and_late_part_starts_new_one() -> None:
+    collector = MemoryAlbumCollector(quiet=10.0, max_wait=10.0, max_pending=10)
+    bot = MagicMock()
+
+    leader = asyncio.create_task(collector.collect(_part(1), bot))
+    await asyncio.sleep(0)
+    for message_id in range(2, MAX_ALBUM_SIZE + 1):
+        assert await collector.collect(_part(message_id), bot) is None
+
+    # Альбом собран, не дожидаясь тишины
+    assert _ids(await asyncio.wait_for(leader, 1.0)) == list(range(1, MAX_ALBUM_SIZE + 1))
+    late = asyncio.create_task(collector.collect(_part(MAX_ALBUM_SIZE + 1), bot))
+    await asyncio.sleep(0)
+    assert not late.done()
+    late.cancel()
+    with suppress(asyncio.CancelledError):
+        await late
+
+
+async def test_memory_parts_over_pending_limit_are_handled_alone() -> None:
+    collector = MemoryAlbumCollector(quiet=0.1, max_wait=1.0, max_pending=1)
+    bot = MagicMock()
+
+    leader = asyncio.create_task(collector.collect(_part(1), bot))
+    await asyncio.sleep(0)
+    other = _part(2, group="album-2")
+    assert await collector.collect(other, bot) == [other]
+    assert _ids(await leader) == [1]
+
+
+async def test_redis_parts_from_other_processes_reach_leader(monkeypatch: pytest.MonkeyPatch) -> None:
+    redis = FakeRedis()
+    first, second = _redis_collector(redis, monkeypatch), _redis_collector(redis, monkeypatch)
+    bot = MagicMock()
+
+    leader = asyncio.create_task(first.collect(_part(2), bot))
+    await asyncio.sleep(0.02)
+    assert await second.collect(_part(3), bot) is None
+    assert await second.collect(_part(1), bot) is None
+
+    assert _ids(await leader) == [1, 2, 3]
+    # Альбом забран вместе с ключом ведущего: запоздавшая часть начнёт новый
+    assert await redis.keys() == []
+    assert _ids(await second.collect(_part(4), bot)) == [4]
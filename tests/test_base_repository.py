@@ -0,0 +1,126 @@
+from collections.abc import AsyncIterator
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy import Update, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models.study import Study
+from core.repositories.study_repo import StudySQLAlchemyRepository
+from tests.conftest import MakeStudy
+
+
+def _session(result: object = None) -> MagicMock:
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(**{"scalar_one_or_none.return_value": result}))
+    return session
+
+
+async def test_update_is_a_single_update_returning() -> None:
+    study = Study(id=1)
+    session = _session(study)
+
+    assert await StudySQLAlchemyRepository(session).update(1, {"nc_upload_link": "link"}) is study
+
+    session.execute.assert_awaited_once()
+    stmt = session.execute.await_args.args[0]
+    assert isinstance(stmt, Update)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE study SET nc_upload_link=")
+    assert "RETURNING study.id" in sql
+    # Объект из identity map сессии перезаписывается значениями из RETURNING
+    assert stmt.get_execution_options()["populate_existing"] is True
+
+
+async def test_update_many_is_one_statement_and_none_for_empty_ids() -> None:
+    session = _session()
+    repo = StudySQLAlchemyRepository(session)
+
+    assert await repo.update_many([], {"nc_upload_link": None}) == []
+    session.execute.assert_not_awaited()
+
+    await repo.update_many([1, 2, 3], {"nc_upload_link": None})
+    session.execute.assert_awaited_once()
+    sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "WHERE study.id IN" in sql
+    assert "RETURNING" in sql
+
+
+async def test_update_sends_one_statement_to_postgres(pg_session: AsyncSession, make_study: MakeStudy) -> None:
+    study = await make_study()
+    statements: list[str] = []
+
+    def record(*args: object) -> None:
+        statements.append(str(args[2]))
+
+    sync_engine = pg_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        updated = await StudySQLAlchemyRepository(pg_session).update(study.id, {"nc_upload_link": "link"})
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+
+    assert updated is study
+    assert study.nc_upload_link == "link"
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE study")
+
+
+async def test_get_page_continues_after_the_last_id() -> None:
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(**{"scalars.return_value.all.return_value": []}))
+    repo = StudySQLAlchemyRepository(session)
+
+    await repo.get_page(limit=50)
+    await repo.get_page(after_id=120, limit=50)
+
+    first, following = (
+        str(call.args[0].compile(dialect=postgresql.dialect())) for call in session.execute.await_args_list
+    )
+    assert "WHERE" not in first
+    assert "WHERE study.id > %(id_1)s ORDER BY study.id" in following
+    assert "OFFSET" not in following
+
+
+async def test_iter_all_streams_with_yield_per() -> None:
+    studies = [Study(id=1), Study(id=2)]
+
+    async def stream() -> AsyncIterator[Study]:
+        for study in studies:
+            yield study
+
+    session = MagicMock()
+    session.stream_scalars = AsyncMock(return_value=stream())
+
+    assert [study async for study in StudySQLAlchemyRepository(session).iter_all(fetch_size=2)] == studies
+    stmt = session.stream_scalars.await_args.args[0]
+    assert stmt.get_execution_options()["yield_per"] == 2
+    assert str(stmt.compile(dialect=postgresql.dialect())).endswith("ORDER BY study.id")
+
+
+async def test_pages_and_stream_cover_the_table_once(pg_session: AsyncSession, make_study: MakeStudy) -> None:
+    first = await make_study()
+    repo = StudySQLAlchemyRepository(pg_session)
+    repo.bulk_create(
+        [
+            {
+                "study_iuid": f"2.25.{number}",
+                "batch_id": first.batch_id,
+                "project_id": first.project_id,
+                "study_path": f"projects/ct/bulk/{number}",
+            }
+            for number in range(6)
+        ],
+    )
+    await pg_session.flush()
+    expected = [study.id for study in await repo.get_all()]
+
+    paged: list[int] = []
+    after_id = None
+    while page := await repo.get_page(after_id=after_id, limit=3):
+        paged.extend(study.id for study in page)
+        after_id = page[-1].id
+
+    assert len(expected) == 7
+    assert paged == expected
+    assert [study.id async for study in repo.iter_all(fetch_size=2)] == expected
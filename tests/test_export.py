@@ -0,0 +1,165 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Iterable
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from dishka import Provider, Scope, make_async_container
+from dishka.integrations.fastapi import setup_dishka
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import Settings
+from core.models.study import StudyStatusEnum
+from core.models.study_status_history import StudyStatusHistory
+from core.repositories.study_repo import StudyExportFilter, StudyExportRow, StudySQLAlchemyRepository
+from core.unit_of_work import IReadOnlyUnitOfWork
+from core.utils import export as export_utils
+from core.utils.export import EXPORT_FIELDS, ExportFormat, encode_export
+from tests.conftest import MakeStudy
+from web_api import export
+
+FINISHED_AT = datetime(2025, 11, 3, 12, 30, tzinfo=UTC)
+TOKEN = "export-token"  # noqa: S105
+
+
+def _row(study_id: int, categories: list[str], annotator: str | None = "Анна") -> StudyExportRow:
+    return StudyExportRow(
+        id=study_id,
+        study_iuid=f"1.2.3.{study_id}",
+        study_path=f"projects/ct/{study_id}",
+        status="approved",
+        iteration_count=1,
+        project_id=1,
+        project="ct",
+        batch_id=2,
+        batch="batch, первая",
+        categories=categories,
+        annotator_id=10 if annotator else None,
+        annotator=annotator,
+        expert_id=None,
+        expert=None,
+        started_at=None,
+        finished_at=FINISHED_AT,
+    )
+
+
+async def _rows(rows: Iterable[StudyExportRow]) -> AsyncIterator[StudyExportRow]:
+    for row in rows:
+        yield row
+
+
+async def _encode(rows: Iterable[StudyExportRow], export_format: ExportFormat) -> bytes:
+    return b"".join([chunk async for chunk in encode_export(_rows(rows), export_format)])
+
+
+async def test_ndjson_is_one_object_per_line() -> None:
+    body = await _encode([_row(1, ["rib", "lung"]), _row(2, [], annotator=None)], ExportFormat.NDJSON)
+
+    lines = body.decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2]
+    first = json.loads(lines[0])
+    assert first["categories"] == ["rib", "lung"]
+    assert first["finished_at"] == "2025-11-03T12:30:00+00:00"
+    assert first["batch"] == "batch, первая"
+    assert json.loads(lines[1])["annotator"] is None
+
+
+async def test_csv_has_header_and_joins_categories() -> None:
+    body = await _encode([_row(1, ["rib", "lung"]), _row(2, [], annotator=None)], ExportFormat.CSV)
+
+    reader = csv.reader(io.StringIO(body.decode()))
+    assert tuple(next(reader)) == EXPORT_FIELDS
+    records = [dict(zip(EXPORT_FIELDS, values, strict=True)) for values in reader]
+    assert [record["categories"] for record in records] == ["rib;lung", ""]
+    assert records[0]["batch"] == "batch, первая"
+    assert records[0]["finished_at"] == "2025-11-03T12:30:00+00:00"
+    assert records[1]["annotator"] == ""
+
+
+async def test_empty_export_is_only_the_csv_header() -> None:
+    assert await _encode([], ExportFormat.NDJSON) == b""
+    assert (await _encode([], ExportFormat.CSV)).decode().splitlines() == [",".join(EXPORT_FIELDS)]
+
+
+async def test_rows_are_sent_in_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(export_utils, "_CHUNK_SIZE", 1)
+
+    chunks = [chunk async for chunk in encode_export(_rows([_row(1, []), _row(2, [])]), ExportFormat.NDJSON)]
+
+    assert len(chunks) == 2
+    assert all(chunk.endswith(b"\n") for chunk in chunks)
+
+
+def _client(settings: Settings, rows: list[StudyExportRow]) -> TestClient:
+    uow = MagicMock()
+    uow.studies.iter_export.side_effect = lambda *_, **__: _rows(rows)
+    provider = Provider(scope=Scope.APP)
+    provider.provide(lambda: settings, provides=Settings)
+    provider.provide(lambda: uow, provides=IReadOnlyUnitOfWork, scope=Scope.REQUEST)
+    app = FastAPI()
+    app.include_router(export.router)
+    setup_dishka(make_async_container(provider), app)
+    return TestClient(app)
+
+
+def test_export_is_hidden_without_configured_token() -> None:
+    client = _client(Settings(EXPORT_API_TOKEN=None), [])
+
+    assert client.get("/export/studies").status_code == 404
+    assert client.get("/export/studies", headers={"X-Export-Token": TOKEN}).status_code == 404
+
+
+def test_export_requires_matching_token() -> None:
+    client = _client(Settings(EXPORT_API_TOKEN=TOKEN), [_row(7, ["rib"])])
+
+    assert client.get("/export/studies").status_code == 401
+    assert client.get("/export/studies", headers={"X-Export-Token": "wrong"}).status_code == 401
+
+    response = client.get("/export/studies", params={"format": "csv"}, headers={"X-Export-Token": TOKEN})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines()[1].startswith("7,")
+
+
+async def test_finished_range_uses_last_transition_to_current_status(
+    pg_session: AsyncSession,
+    make_study: MakeStudy,
+) -> None:
+    # Схему создаёт metadata.create_all, без партиций; строкам истории нужна хотя бы DEFAULT
+    await pg_session.execute(
+        text("CREATE TABLE study_status_history_default PARTITION OF study_status_history DEFAULT"),
+    )
+    day = timedelta(days=1)
+    inside = await make_study(status=StudyStatusEnum.APPROVED)
+    before = await make_study(status=StudyStatusEnum.APPROVED)
+    reapproved = await make_study(status=StudyStatusEnum.APPROVED)
+    closed = await make_study(project_id=2, status=StudyStatusEnum.CLOSED_N)
+    history = [
+        (inside, StudyStatusEnum.APPROVED, FINISHED_AT),
+        (before, StudyStatusEnum.APPROVED, FINISHED_AT - 10 * day),
+        # Одобрено внутри диапазона, но потом возвращалось на доработку и одобрено позже
+        (reapproved, StudyStatusEnum.APPROVED, FINISHED_AT),
+        (reapproved, StudyStatusEnum.APPROVED, FINISHED_AT + 10 * day),
+        # Переход не в текущий статус не считается завершением
+        (closed, StudyStatusEnum.APPROVED, FINISHED_AT),
+        (closed, StudyStatusEnum.CLOSED_N, FINISHED_AT - 10 * day),
+    ]
+    pg_session.add_all(
+        StudyStatusHistory(study_id=study.id, to_status=to_status, changed_at=changed_at, iteration_count=1)
+        for study, to_status, changed_at in history
+    )
+    await pg_session.flush()
+    repo = StudySQLAlchemyRepository(pg_session)
+
+    async def exported(export_filter: StudyExportFilter) -> list[int]:
+        return [row.id async for row in repo.iter_export(export_filter)]
+
+    week = StudyExportFilter(finished_from=FINISHED_AT - 3 * day, finished_to=FINISHED_AT + 3 * day)
+    assert await exported(week) == [inside.id]
+    assert await exported(StudyExportFilter(finished_from=FINISHED_AT)) == [inside.id, reapproved.id]
+    assert await exported(StudyExportFilter(finished_to=FINISHED_AT)) == [before.id, closed.id]
@@ -0,0 +1,92 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from aiogram.fsm.storage.base import StorageKey
+from fakeredis.aioredis import FakeRedis
+
+from bot.middleware.fsm_session import FSMSessionStorage, _Session, _session
+from bot.utils.fsm_storage import CompactRedisStorage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=20)
+STATE = "RejectState:waiting_for_comment"
+
+
+def _storage() -> FSMSessionStorage:
+    return FSMSessionStorage(CompactRedisStorage(FakeRedis(), default_ttl=600, state_ttls={"RejectState": 3600}))
+
+
+@contextmanager
+def _open_session() -> Iterator[_Session]:
+    # То же, что делает FSMSessionMiddleware на время апдейта
+    session = _Session()
+    token = _session.set(session)
+    try:
+        yield session
+    finally:
+        _session.reset(token)
+
+
+async def test_changes_are_buffered_until_flush() -> None:
+    storage = _storage()
+    redis = storage.storage.redis
+
+    with _open_session() as session:
+        await storage.set_state(KEY, STATE)
+        await storage.update_data(KEY, {"study_id": 5})
+        await storage.update_data(KEY, {"comment": "Нет разметки"})
+        assert await storage.get_state(KEY) == STATE
+        assert await storage.get_data(KEY) == {"study_id": 5, "comment": "Нет разметки"}
+        assert await redis.keys() == []
+
+        await storage.flush(session)
+
+    # Одно чтение при первом обращении и одна транзакция в конце
+    assert session.round_trips == 2
+    assert await storage.storage.get_state(KEY) == STATE
+    assert await storage.storage.get_data(KEY) == {"study_id": 5, "comment": "Нет разметки"}
+    assert await redis.ttl(storage.storage.key_builder.build(KEY, "data")) == 3600
+
+
+async def test_read_only_session_writes_nothing() -> None:
+    storage = _storage()
+    await storage.storage.set_state(KEY, STATE)
+    await storage.storage.set_data(KEY, {"study_id": 5})
+
+    with _open_session() as session:
+        data = await storage.get_data(KEY)
+        # Изменения копии без set_data/update_data не сохраняются
+        data["study_id"] = 6
+        assert await storage.get_value(KEY, "study_id") == 5
+        await storage.flush(session)
+
+    assert session.round_trips == 1
+    assert await storage.storage.get_data(KEY) == {"study_id": 5}
+
+
+async def test_state_change_moves_data_ttl() -> None:
+    storage = _storage()
+    await storage.storage.set_data(KEY, {"study_id": 5})
+    data_key = storage.storage.key_builder.build(KEY, "data")
+    assert await storage.storage.redis.ttl(data_key) == 600
+
+    with _open_session() as session:
+        await storage.set_state(KEY, STATE)
+        await storage.flush(session)
+
+    assert await storage.storage.redis.ttl(data_key) == 3600
+    assert await storage.storage.get_data(KEY) == {"study_id": 5}
+
+
+async def test_calls_go_to_redis_outside_session_and_after_flush() -> None:
+    storage = _storage()
+
+    await storage.set_state(KEY, STATE)
+    assert await storage.storage.get_state(KEY) == STATE
+
+    with _open_session() as session:
+        await storage.flush(session)
+        # Задача, запущенная обработчиком, пережила запись сессии
+        await storage.update_data(KEY, {"study_id": 5})
+        assert await storage.storage.get_data(KEY) == {"study_id": 5}
+
+    assert session.entries == {}
@@ -0,0 +1,88 @@
+import json
+
+import msgpack
+from aiogram.fsm.storage.base import StorageKey
+from fakeredis.aioredis import FakeRedis
+
+from bot.fsm_compact import _migrate_legacy, _Stats
+from bot.utils.fsm_storage import CompactRedisStorage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=20)
+
+
+def _storage() -> CompactRedisStorage:
+    return CompactRedisStorage(
+        FakeRedis(),
+        default_ttl=600,
+        state_ttls={"RejectState": 3600, "RejectState:waiting_for_comment": 60, "CheckCategoriesView": 0},
+    )
+
+
+def test_ttl_for_prefers_full_state_then_group_then_default() -> None:
+    storage = _storage()
+
+    assert storage.ttl_for("RejectState:waiting_for_comment") == 60
+    assert storage.ttl_for("RejectState:waiting_for_photo") == 3600
+    assert storage.ttl_for("Unknown:state") == 600
+    assert storage.ttl_for(None) == 600
+    # 0 в настройках - без срока, а не значение по умолчанию
+    assert storage.ttl_for("CheckCategoriesView:from_default_approve") is None
+
+
+async def test_data_round_trips_through_msgpack_with_state_ttl() -> None:
+    storage = _storage()
+    data = {"study_id": 5, "comment": "Нет разметки", "ids": [1, 2], "nested": {"ok": True}}
+
+    await storage.set_state(KEY, "RejectState:waiting_for_comment")
+    await storage.set_data(KEY, data)
+
+    assert await storage.get_state(KEY) == "RejectState:waiting_for_comment"
+    assert await storage.get_data(KEY) == data
+    raw = await storage.redis.get("f:10:20:d")
+    assert msgpack.unpackb(raw) == data
+    assert len(raw) < len(json.dumps(data).encode())
+    assert 0 < await storage.redis.ttl("f:10:20:s") <= 60
+    assert 0 < await storage.redis.ttl("f:10:20:d") <= 60
+
+    # Срок данных следует за новым состоянием
+    await storage.set_state(KEY, "CheckCategoriesView:from_default_approve")
+    assert await storage.redis.ttl("f:10:20:d") == -1
+
+    await storage.set_data(KEY, {})
+    assert await storage.redis.exists("f:10:20:d") == 0
+
+
+async def test_legacy_keys_are_migrated_without_overwriting_new_ones() -> None:
+    storage = _storage()
+    redis = storage.redis
+    await redis.set("fsm:10:20:default:state", "RejectState:waiting_for_comment")
+    await redis.set("fsm:10:20:default:data", json.dumps({"study_id": 5}))
+    # Контекст в теме форума: chat:thread:user
+    await redis.set("fsm:-100:7:30:default:data", json.dumps({"study_id": 6}))
+    # Новый ключ записан после старого и главнее его
+    await redis.set("fsm:11:21:default:state", "RejectState:waiting_for_comment")
+    await redis.set("f:11:21:s", "CheckCategoriesView:from_default_approve")
+    stats = _Stats()
+
+    await _migrate_legacy(storage, stats, dry_run=False)
+
+    assert stats.contexts == 3
+    assert await redis.keys("fsm:*") == []
+    assert await storage.get_state(KEY) == "RejectState:waiting_for_comment"
+    assert await storage.get_data(KEY) == {"study_id": 5}
+    assert 0 < await redis.ttl("f:10:20:d") <= 60
+    thread_key = StorageKey(bot_id=1, chat_id=-100, user_id=30, thread_id=7)
+    assert await storage.get_data(thread_key) == {"study_id": 6}
+    assert await redis.get("f:11:21:s") == b"CheckCategoriesView:from_default_approve"
+
+
+async def test_legacy_migration_dry_run_changes_nothing() -> None:
+    storage = _storage()
+    await storage.redis.set("fsm:10:20:default:data", json.dumps({"study_id": 5}))
+    stats = _Stats()
+
+    await _migrate_legacy(storage, stats, dry_run=True)
+
+    assert stats.contexts == 1
+    assert stats.bytes_after < stats.bytes_before
+    assert await storage.redis.keys("*") == [b"fsm:10:20:default:data"]
@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+
+from core.utils import periodic
+from core.utils.leader import LeaderElection
+from core.utils.periodic import run_periodic
+
+
+def _election(redis: FakeRedis, monkeypatch: pytest.MonkeyPatch) -> LeaderElection:
+    election = LeaderElection(redis, name="jobs", ttl=0.3)
+
+    # Lua-скрипты fakeredis не выполняет, поэтому сравнение владельца повторено здесь
+    async def refresh(keys: list[str], args: list[Any]) -> int:
+        if await redis.get(keys[0]) != args[0]:
+            return 0
+        return int(await redis.pexpire(keys[0], args[1]))
+
+    async def release(keys: list[str], args: list[Any]) -> int:
+        if await redis.get(keys[0]) != args[0]:
+            return 0
+        return await redis.delete(keys[0])
+
+    monkeypatch.setattr(election, "_refresh", refresh)
+    monkeypatch.setattr(election, "_release", release)
+    return election
+
+
+async def test_only_one_process_is_leader_and_standby_takes_over_after_release(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    redis = FakeRedis(decode_responses=True)
+    first, second = _election(redis, monkeypatch), _election(redis, monkeypatch)
+
+    first_task = asyncio.create_task(first.run())
+    await asyncio.sleep(0.01)
+    second_task = asyncio.create_task(second.run())
+    # Несколько продлений: лидер не меняется, пока держит ключ
+    await asyncio.sleep(0.5)
+    assert first.is_leader()
+    assert not second.is_leader()
+
+    first_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first_task
+    assert not first.is_leader()
+    await asyncio.sleep(0.15)
+    assert second.is_leader()
+
+    second_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await second_task
+    assert await redis.get("leader:jobs") is None
+
+
+async def test_leadership_expires_when_it_cannot_be_refreshed(monkeypatch: pytest.MonkeyPatch) -> None:
+    redis = FakeRedis(decode_responses=True)
+    election = _election(redis, monkeypatch)
+    task = asyncio.create_task(election.run())
+    await asyncio.sleep(0.01)
+    assert election.is_leader()
+
+    # Ключ достался другому процессу
+    await redis.set("leader:jobs", "other")
+    await asyncio.sleep(0.15)
+    assert not election.is_leader()
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert await redis.get("leader:jobs") == "other"
+
+
+async def test_periodic_job_runs_only_while_should_run(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(periodic, "_SKIP_RECHECK", 0.01)
+    runs = 0
+    leader = False
+
+    async def job() -> None:
+        nonlocal runs
+        runs += 1
+
+    task = asyncio.create_task(run_periodic("job", 3600, job, should_run=lambda: leader))
+    await asyncio.sleep(0.05)
+    assert runs == 0
+
+    # Ставший лидером процесс выполняет задачу сразу, не дожидаясь полного интервала
+    leader = True
+    await asyncio.sleep(0.05)
+    assert runs == 1
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
@@ -0,0 +1,125 @@
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, call
+
+import httpx
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.outbox import _MAX_BACKOFF, OutboxDispatcher, _Outcome
+from core.models.outbox import OutboxKind, OutboxMessage
+from core.repositories.outbox_repo import OutboxSQLAlchemyRepository
+
+MAX_ATTEMPTS = 5
+
+
+def _dispatcher(nc_util: MagicMock | None = None) -> OutboxDispatcher:
+    return OutboxDispatcher(
+        MagicMock(),
+        AsyncMock(),
+        nc_util or MagicMock(),
+        poll_interval=1.0,
+        batch_size=10,
+        lease_seconds=60.0,
+        max_attempts=MAX_ATTEMPTS,
+    )
+
+
+def _message(message_id: int, attempts: int = 1, kind: OutboxKind = OutboxKind.TELEGRAM) -> OutboxMessage:
+    return OutboxMessage(
+        id=message_id,
+        kind=kind,
+        recipient=f"tg:{message_id}",
+        payload={},
+        attempts=attempts,
+        created_at=datetime.now(UTC),
+    )
+
+
+def _uow() -> MagicMock:
+    uow = MagicMock()
+    uow.outbox.mark_sent = AsyncMock()
+    uow.outbox.retry = AsyncMock()
+    uow.outbox.mark_dead = AsyncMock()
+    return uow
+
+
+async def test_record_retries_with_backoff_and_gives_up() -> None:
+    uow = _uow()
+    outcomes = [
+        _Outcome(_message(1)),
+        _Outcome(_message(2, attempts=3), error="timeout"),
+        _Outcome(_message(3, attempts=2), error="flood", retry_after=42),
+        _Outcome(_message(4, attempts=MAX_ATTEMPTS - 1), error="timeout"),
+        _Outcome(_message(5, attempts=MAX_ATTEMPTS), error="timeout"),
+        _Outcome(_message(6), error="blocked", permanent=True),
+    ]
+
+    await _dispatcher()._record(uow, outcomes)
+
+    uow.outbox.mark_sent.assert_awaited_once_with([1])
+    assert uow.outbox.retry.await_args_list == [
+        call(2, 8.0, "timeout"),
+        call(3, 42, "flood"),
+        call(4, min(2.0 ** (MAX_ATTEMPTS - 1), _MAX_BACKOFF), "timeout"),
+    ]
+    assert uow.outbox.mark_dead.await_args_list == [call(5, "timeout"), call(6, "blocked")]
+
+
+async def test_record_caps_backoff() -> None:
+    uow = _uow()
+    dispatcher = _dispatcher()
+    dispatcher._max_attempts = 100
+
+    await dispatcher._record(uow, [_Outcome(_message(1, attempts=20), error="timeout")])
+
+    uow.outbox.retry.assert_awaited_once_with(1, _MAX_BACKOFF, "timeout")
+
+
+async def test_deliver_classifies_errors() -> None:
+    nc_util = MagicMock()
+    dispatcher = _dispatcher(nc_util)
+    message = _message(1, kind=OutboxKind.NEXTCLOUD_COPY)
+    message.payload = {"src_dir": "a", "dst_dir": "b"}
+    request = httpx.Request("MOVE", "http://nextcloud.test/")
+
+    def status_error(code: int) -> httpx.HTTPStatusError:
+        return httpx.HTTPStatusError("failed", request=request, response=httpx.Response(code, request=request))
+
+    nc_util.copy_directory = AsyncMock(side_effect=status_error(404))
+    assert (await dispatcher._deliver(message)).permanent
+    nc_util.copy_directory = AsyncMock(side_effect=status_error(503))
+    assert not (await dispatcher._deliver(message)).permanent
+    nc_util.copy_directory = AsyncMock(side_effect=status_error(429))
+    assert not (await dispatcher._deliver(message)).permanent
+
+    telegram = _message(2)
+    telegram.payload = {"method": "sendMessage", "params": {"chat_id": 1, "text": "hi"}}
+    method = SendMessage(chat_id=1, text="hi")
+    dispatcher._bot = AsyncMock(side_effect=TelegramRetryAfter(method, "flood", retry_after=7))
+    outcome = await dispatcher._deliver(telegram)
+    assert (outcome.retry_after, outcome.permanent) == (7, False)
+    dispatcher._bot = AsyncMock(side_effect=TelegramForbiddenError(method, "blocked"))
+    assert (await dispatcher._deliver(telegram)).permanent
+
+
+async def test_claim_takes_first_pending_message_per_recipient(pg_session: AsyncSession) -> None:
+    repo = OutboxSQLAlchemyRepository(pg_session)
+    for recipient in ("tg:1", "tg:1", "tg:2", "tg:1"):
+        await repo.add(OutboxKind.TELEGRAM, recipient, {})
+    first, second, other, third = await pg_session.scalars(select(OutboxMessage.id).order_by(OutboxMessage.id))
+
+    claimed = await repo.claim(10, lease_seconds=60)
+    assert [message.id for message in claimed] == [first, other]
+    assert [message.attempts for message in claimed] == [1, 1]
+    # Арендованные не выдаются повторно, следующие за ними ждут
+    assert await repo.claim(10, lease_seconds=60) == []
+
+    await repo.mark_sent([first])
+    assert [message.id for message in await repo.claim(10, lease_seconds=60)] == [second]
+
+    await repo.mark_dead(second, "blocked")
+    await repo.retry(other, 60, "timeout")
+    # Мёртвое сообщение не держит очередь получателя; отложенное ждёт своего времени
+    assert [message.id for message in await repo.claim(10, lease_seconds=60)] == [third]
@@ -0,0 +1,101 @@
+import sqlite3
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, cast
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from core.config import Settings
+from core.database import DatabaseManager, DatabaseWorkload
+from core.utils.pool_telemetry import InstrumentedAsyncAdaptedQueuePool, instrument_engine
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.engine.interfaces import DBAPIConnection
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+def _value(name: str, workload: str) -> float:
+    return REGISTRY.get_sample_value(name, {"workload": workload}) or 0.0
+
+
+def _engine(workload: str, pool_size: int) -> "Engine":
+    # Асинхронного драйвера для SQLite нет, поэтому пул с asyncio-очередью подставляется в синхронный engine,
+    # а сам код выполняется в greenlet - как под AsyncEngine
+    engine = create_engine("sqlite://")
+    engine.pool = InstrumentedAsyncAdaptedQueuePool(
+        lambda: cast("DBAPIConnection", sqlite3.connect(":memory:")),
+        pool_size=pool_size,
+        max_overflow=0,
+        timeout=0.05,
+        logging_name=workload,
+    )
+    instrument_engine(cast("AsyncEngine", SimpleNamespace(sync_engine=engine)), workload=workload, capacity=pool_size)
+    return engine
+
+
+async def test_checked_out_connections_and_saturation() -> None:
+    engine = _engine("test-saturation", pool_size=2)
+    observed: list[tuple[float, float]] = []
+
+    def hold_connection() -> None:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            observed.append(
+                (
+                    _value("db_pool_checked_out_connections", "test-saturation"),
+                    _value("db_pool_saturation_ratio", "test-saturation"),
+                ),
+            )
+
+    await greenlet_spawn(hold_connection)
+
+    assert observed == [(1.0, 0.5)]
+    assert _value("db_pool_checked_out_connections", "test-saturation") == 0
+    assert _value("db_pool_saturation_ratio", "test-saturation") == 0
+    assert _value("db_connection_hold_seconds_count", "test-saturation") == 1
+    # Второй checkout берёт то же соединение: новое не открывается, возраст меряется
+    await greenlet_spawn(hold_connection)
+    assert _value("db_pool_connections_created_total", "test-saturation") == 1
+    assert _value("db_connection_age_seconds_count", "test-saturation") == 2
+
+
+async def test_exhausted_pool_counts_timeout_and_wait() -> None:
+    engine = _engine("test-exhausted", pool_size=1)
+
+    def connect_twice() -> None:
+        with engine.connect(), pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    await greenlet_spawn(connect_twice)
+
+    assert _value("db_pool_checkout_timeouts_total", "test-exhausted") == 1
+    assert _value("db_pool_checkout_wait_seconds_count", "test-exhausted") == 2
+    assert _value("db_pool_checkout_wait_seconds_sum", "test-exhausted") >= 0.05
+
+
+def test_each_workload_gets_its_own_sized_pool() -> None:
+    settings = Settings(
+        DATABASE_USER="test",
+        DATABASE_POOL_SIZE=7,
+        DATABASE_MAX_OVERFLOW=3,
+        DATABASE_WEBHOOK_POOL_SIZE=2,
+        DATABASE_WEBHOOK_MAX_OVERFLOW=0,
+    )
+
+    manager = DatabaseManager(settings)
+
+    pools = {workload: engine.sync_engine.pool for workload, engine in manager.engines.items()}
+    assert set(pools) == set(DatabaseWorkload)
+    assert len({id(pool) for pool in pools.values()}) == len(pools)
+    assert all(isinstance(pool, InstrumentedAsyncAdaptedQueuePool) for pool in pools.values())
+    bot, webhook = pools[DatabaseWorkload.BOT], pools[DatabaseWorkload.WEBHOOK]
+    assert isinstance(bot, InstrumentedAsyncAdaptedQueuePool)
+    assert isinstance(webhook, InstrumentedAsyncAdaptedQueuePool)
+    assert (bot.size(), bot._max_overflow) == (7, 3)
+    assert (webhook.size(), webhook._max_overflow) == (2, 0)
+    assert webhook.logging_name == DatabaseWorkload.WEBHOOK.value
+    assert manager.async_session_maker is manager.get_session_maker(DatabaseWorkload.BOT)
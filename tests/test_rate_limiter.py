@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from bot.utils.rate_limiter import SendPriority, TelegramRateLimiter, TokenBucket
+
+
+def test_bucket_pause_delays_next_token() -> None:
+    bucket = TokenBucket(rate=1.0, capacity=3.0)
+    now = bucket.updated
+
+    bucket.pause(5.0, now)
+
+    # Запас бакета не переживает flood control: следующий токен - ровно через паузу, за ним по одному в секунду
+    assert bucket.reserve(1, now) == 5.0
+    assert bucket.reserve(1, now) == 6.0
+
+
+async def test_interactive_overtakes_queued_notifications() -> None:
+    limiter = TelegramRateLimiter(global_rate=50.0, chat_rate=1000.0, group_rate=1000.0)
+    limiter._global.tokens = 0
+    done: list[str] = []
+
+    async def send(name: str, chat_id: int, priority: SendPriority) -> None:
+        await limiter.acquire(chat_id, priority)
+        done.append(name)
+
+    await asyncio.gather(
+        send("notification-1", 1, SendPriority.NOTIFICATION),
+        send("notification-2", 2, SendPriority.NOTIFICATION),
+        send("interactive", 3, SendPriority.INTERACTIVE),
+    )
+
+    assert done == ["interactive", "notification-1", "notification-2"]
+
+
+async def test_pause_holds_only_the_paused_chat() -> None:
+    limiter = TelegramRateLimiter(global_rate=1000.0, chat_rate=1000.0, group_rate=1000.0)
+    finished: dict[int, float] = {}
+    started = time.monotonic()
+    limiter.pause(1, 0.2)
+
+    async def send(chat_id: int) -> None:
+        await limiter.acquire(chat_id, SendPriority.INTERACTIVE)
+        finished[chat_id] = time.monotonic() - started
+
+    await asyncio.gather(send(1), send(2))
+
+    # Таймеры цикла событий могут сработать на долю миллисекунды раньше
+    assert finished[1] > 0.19
+    assert finished[2] < 0.1
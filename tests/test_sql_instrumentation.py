@@ -0,0 +1,61 @@
+from collections.abc import Iterator
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, cast
+
+import pytest
+from sqlalchemy import Engine, create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from core.utils.metrics import DB_SCOPE_N_PLUS_ONE
+from core.utils.sql_instrumentation import instrument_sql, sql_scope
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@pytest.fixture
+def engine() -> Iterator[Engine]:
+    # instrument_sql использует только sync_engine, поэтому хватает синхронного SQLite
+    engine = create_engine("sqlite://")
+    instrument_sql(cast("AsyncEngine", SimpleNamespace(sync_engine=engine)))
+    yield engine
+    engine.dispose()
+
+
+def test_scope_counts_statements_and_flags_repeats(engine: Engine) -> None:
+    flagged = DB_SCOPE_N_PLUS_ONE.labels(scope="test-repeats")._value.get()
+
+    with engine.connect() as conn, sql_scope("test-repeats", n_plus_one_threshold=3) as stats:
+        for _ in range(3):
+            conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+
+    assert stats.statements == 4
+    assert stats.repeated(3) == {"SELECT 1": 3}
+    assert stats.slowest_statement in {"SELECT 1", "SELECT 2"}
+    assert DB_SCOPE_N_PLUS_ONE.labels(scope="test-repeats")._value.get() == flagged + 1
+
+
+def test_failed_statement_does_not_skew_later_timings(engine: Engine) -> None:
+    with engine.connect() as conn, sql_scope("test-failed", n_plus_one_threshold=3) as stats:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing"))
+            conn.rollback()
+        conn.execute(text("SELECT 1"))
+        assert conn.info == {}
+
+    # Упавшие запросы не попадают в статистику и не оставляют времени начала на соединении
+    assert stats.statements == 1
+    assert stats.repeats == {"SELECT 1": 1}
+    assert stats.total_time < 1.0
+    assert not stats.repeated(3)
+
+
+def test_statements_outside_scope_are_not_collected(engine: Engine) -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with sql_scope("test-empty", n_plus_one_threshold=3) as stats:
+            pass
+
+    assert stats.statements == 0
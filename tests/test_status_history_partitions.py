@@ -0,0 +1,58 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models.study import StudyStatusEnum
+from core.models.study_status_history import StudyStatusHistory
+from core.repositories.study_status_history_repo import StudyStatusHistorySQLAlchemyRepository
+from tests.conftest import MakeStudy, load_migration, run_upgrade
+
+# Месяц далеко в прошлом: старше любого срока хранения, который задаётся в тесте
+OLD_MONTH = datetime(2024, 1, 15, tzinfo=UTC)
+OLD_PARTITION = "study_status_history_y2024m01"
+
+
+async def _partitions(session: AsyncSession) -> dict[int, str]:
+    res = await session.execute(text("SELECT id, tableoid::regclass::text FROM study_status_history"))
+    return dict(res.tuples().all())
+
+
+async def _exists(session: AsyncSession, relation: str) -> bool:
+    return await session.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": relation}) is True
+
+
+async def test_default_rows_move_to_their_month_and_expire(pg_session: AsyncSession, make_study: MakeStudy) -> None:
+    # Как до миграции 5a7d2c9e4b18: партиций месяцев нет, и строки накопились в DEFAULT
+    await pg_session.execute(
+        text("CREATE TABLE study_status_history_default PARTITION OF study_status_history DEFAULT"),
+    )
+    study = await make_study(status=StudyStatusEnum.APPROVED)
+    now = datetime.now(UTC)
+    current_partition = f"study_status_history_y{now:%Y}m{now:%m}"
+    old, recent = (
+        StudyStatusHistory(study_id=study.id, to_status=to_status, changed_at=changed_at, iteration_count=1)
+        for to_status, changed_at in ((StudyStatusEnum.ASSIGNED, OLD_MONTH), (StudyStatusEnum.APPROVED, now))
+    )
+    pg_session.add_all([old, recent])
+    await pg_session.flush()
+    assert set((await _partitions(pg_session)).values()) == {"study_status_history_default"}
+
+    await run_upgrade(pg_session, load_migration("2025-11-20_study_status_history_default_partition"))
+
+    assert await _partitions(pg_session) == {
+        old.id: OLD_PARTITION,
+        recent.id: current_partition,
+    }
+
+    repo = StudyStatusHistorySQLAlchemyRepository(pg_session)
+    assert await repo.maintain_partitions(1, retention_months=6, archive=True) == 1
+    assert await _partitions(pg_session) == {recent.id: current_partition}
+    assert await _exists(pg_session, f"archived_{OLD_PARTITION}")
+    assert not await _exists(pg_session, OLD_PARTITION)
+    # Партиция на месяц вперёд создана заранее, повторный вызов ничего не меняет
+    attached = await pg_session.scalar(
+        text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'study_status_history'::regclass"),
+    )
+    assert attached == 3
+    assert await repo.maintain_partitions(1, retention_months=6, archive=True) == 0
@@ -0,0 +1,68 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models import Batch, Project, Study
+from core.models.project import ProductEnum
+from core.models.study import StudyStatusEnum
+from core.models.study_category import StudyCategory
+from core.models.user import User, UserRoleEnum
+from core.repositories.study_repo import StudySQLAlchemyRepository
+
+
+async def test_missing_study_has_no_context() -> None:
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(**{"unique.return_value.one_or_none.return_value": None}))
+
+    assert await StudySQLAlchemyRepository(session).get_context(7) is None
+    assert session.execute.await_args.args[1] == {"study_id": 7}
+
+
+async def test_context_is_loaded_in_one_select(pg_session: AsyncSession) -> None:
+    # Сценарий ревью: исследование с двумя категориями, разметчиком и экспертом; эксперта в проекте нет
+    annotator = User(tg_id=101, role=UserRoleEnum.ANNOTATOR, name="Разметчик")
+    expert = User(tg_id=202, role=UserRoleEnum.VALIDATOR, name="Эксперт")
+    project = Project(id=40, name="mammography", tg_group_id=-40, product=ProductEnum.DX, users=[annotator])
+    pg_session.add_all([expert, project])
+    await pg_session.flush()
+    batch = Batch(name="2025-11", project_id=project.id)
+    pg_session.add(batch)
+    await pg_session.flush()
+    study = Study(
+        study_iuid="1.2.826.0.1",
+        batch_id=batch.id,
+        project_id=project.id,
+        study_path="projects/mg/1-original-data/0001",
+        status=StudyStatusEnum.IN_REVIEW,
+        annotator_id=annotator.tg_id,
+        expert_id=expert.tg_id,
+        categories=[StudyCategory(name="calcification"), StudyCategory(name="mass")],
+    )
+    pg_session.add(study)
+    await pg_session.flush()
+    study_id = study.id
+    pg_session.expunge_all()
+
+    statements: list[str] = []
+
+    def record(*args: object) -> None:
+        statements.append(str(args[2]))
+
+    sync_engine = pg_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        context = await StudySQLAlchemyRepository(pg_session).get_context(study_id)
+        assert context is not None
+        names = (context.project.name, context.batch.name, context.annotator, context.expert)
+        categories = sorted(category.name for category in context.categories)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+
+    assert len(statements) == 1
+    assert names[:2] == ("mammography", "2025-11")
+    assert names[2] is not None
+    assert names[2].name == "Разметчик"
+    assert names[3] is not None
+    assert names[3].tg_id == expert.tg_id
+    assert categories == ["calcification", "mass"]
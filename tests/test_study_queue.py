@@ -0,0 +1,99 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models.study import Study, StudyStatusEnum
+from core.repositories.study_repo import StudySQLAlchemyRepository
+from core.utils.study_queue import StudyReadyQueue
+from tests.conftest import MakeStudy
+
+PROJECT_ID = 3
+USER_ID = 10
+
+
+def _uow() -> MagicMock:
+    uow = MagicMock()
+    uow.studies.assign_by_id = AsyncMock(return_value=None)
+    uow.studies.get_new_ids_by_project = AsyncMock(return_value={})
+    return uow
+
+
+async def test_reset_study_goes_to_the_front() -> None:
+    queue = StudyReadyQueue(FakeRedis(decode_responses=True))
+    await queue.push(PROJECT_ID, [5, 6])
+    await queue.push(PROJECT_ID, [])
+    await queue.push_front(PROJECT_ID, 2)
+
+    assert [await queue.pop(PROJECT_ID) for _ in range(4)] == [2, 5, 6, None]
+
+
+async def test_assign_skips_stale_ids_until_one_is_confirmed() -> None:
+    queue = StudyReadyQueue(FakeRedis(decode_responses=True))
+    await queue.push(PROJECT_ID, [1, 2, 3])
+    study = Study(id=2)
+    uow = _uow()
+    # Исследование 1 уже забрали: условный UPDATE его не находит
+    uow.studies.assign_by_id.side_effect = [None, study]
+
+    async with queue.assign(uow, PROJECT_ID, USER_ID) as assigned:
+        assert assigned is study
+
+    assert [call.kwargs["study_id"] for call in uow.studies.assign_by_id.await_args_list] == [1, 2]
+    assert uow.studies.assign_by_id.await_args.kwargs == {"study_id": 2, "project_id": PROJECT_ID, "user_id": USER_ID}
+    assert await queue.pop(PROJECT_ID) == 3
+
+
+async def test_assign_from_empty_queue_does_not_touch_postgres() -> None:
+    queue = StudyReadyQueue(FakeRedis(decode_responses=True))
+    uow = _uow()
+
+    async with queue.assign(uow, PROJECT_ID, USER_ID) as assigned:
+        assert assigned is None
+
+    uow.studies.assign_by_id.assert_not_awaited()
+
+
+async def test_assignment_that_does_not_commit_returns_id_to_the_front() -> None:
+    queue = StudyReadyQueue(FakeRedis(decode_responses=True))
+    await queue.push(PROJECT_ID, [1, 2])
+    uow = _uow()
+    uow.studies.assign_by_id.return_value = Study(id=1)
+
+    # Например, Nextcloud не ответил: транзакция откатится, исследование осталось NEW
+    with pytest.raises(ConnectionError):
+        async with queue.assign(uow, PROJECT_ID, USER_ID):
+            raise ConnectionError
+
+    assert [await queue.pop(PROJECT_ID) for _ in range(3)] == [1, 2, None]
+
+
+async def test_reconcile_rebuilds_lists_from_postgres_and_drops_stale_projects() -> None:
+    redis = FakeRedis(decode_responses=True)
+    queue = StudyReadyQueue(redis)
+    # Лишний id, потерянные id и проект, в котором больше нет NEW исследований
+    await queue.push(1, [9, 3])
+    await queue.push(2, [5])
+    await redis.set("other:1", "kept")
+    uow = _uow()
+    uow.studies.get_new_ids_by_project.return_value = {1: [3, 4], 3: [7]}
+
+    await queue.reconcile(uow)
+
+    assert [await queue.pop(1) for _ in range(3)] == [3, 4, None]
+    assert [await queue.pop(3) for _ in range(2)] == [7, None]
+    assert await redis.exists("study_ready:2") == 0
+    assert await redis.get("other:1") == "kept"
+    uow.__aenter__.assert_awaited_once()
+
+
+async def test_new_ids_are_grouped_by_project_in_id_order(pg_session: AsyncSession, make_study: MakeStudy) -> None:
+    first = await make_study(project_id=1)
+    await make_study(project_id=1, status=StudyStatusEnum.ASSIGNED)
+    other = await make_study(project_id=2)
+    last = await make_study(project_id=1)
+
+    ids_by_project = await StudySQLAlchemyRepository(pg_session).get_new_ids_by_project()
+
+    assert ids_by_project == {1: [first.id, last.id], 2: [other.id]}
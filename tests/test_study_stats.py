@@ -0,0 +1,91 @@
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models.study import StudyStatusEnum
+from core.models.study_stats import StudyTransitionDaily
+from core.models.user import User, UserRoleEnum
+from core.repositories.study_repo import StudySQLAlchemyRepository
+from core.repositories.study_stats_repo import StudyStatsSQLAlchemyRepository, ThroughputStats
+from tests.conftest import MakeStudy, load_migration
+
+ANNOTATOR_ID = 301
+
+
+def test_throughput_ratios() -> None:
+    stats = ThroughputStats(
+        key=1,
+        name="ct",
+        days=7,
+        transitions={
+            StudyStatusEnum.WAITING_REVIEW: 8,
+            StudyStatusEnum.WAITING_REWORK: 2,
+            StudyStatusEnum.APPROVED: 5,
+            StudyStatusEnum.CLOSED_N: 2,
+        },
+        state_seconds={StudyStatusEnum.WAITING_REVIEW: (600.0, 4), StudyStatusEnum.IN_REVIEW: (300.0, 3)},
+    )
+
+    assert stats.done == 7
+    assert stats.done_per_day == 1
+    assert stats.rework_rate == 0.25
+    assert stats.review_turnaround == 250
+    assert ThroughputStats(key=1, name="ct", days=7).rework_rate is None
+    assert ThroughputStats(key=1, name="ct", days=7).review_turnaround is None
+
+
+async def test_refresh_attributes_transitions_to_the_annotator_at_that_time(
+    pg_session: AsyncSession,
+    make_study: MakeStudy,
+) -> None:
+    # Функции и триггер - как после 3c8e5a2d9f71; таблицы уже созданы metadata.create_all
+    migration = load_migration("2025-11-19_study_status_history_annotator")
+    for statement in (
+        "CREATE TABLE study_status_history_default PARTITION OF study_status_history DEFAULT",
+        migration._STATS_REFRESH.replace("__ANNOTATOR__", "coalesce(h.annotator_id, 0)"),
+        migration._LOG_STUDY_STATUS.replace("__ANNOTATOR_COLUMN__", ", annotator_id").replace(
+            "__ANNOTATOR_VALUE__",
+            ", coalesce(NEW.annotator_id, OLD.annotator_id)",
+        ),
+        """
+        CREATE TRIGGER tr_study_status_history
+        AFTER UPDATE OF status ON study
+        FOR EACH ROW
+        WHEN (OLD.status IS DISTINCT FROM NEW.status)
+        EXECUTE FUNCTION trg_log_study_status()
+        """,
+        """
+        INSERT INTO study_stats_watermark (name, last_changed_at, last_id)
+        VALUES ('study_status_history', '-infinity', 0)
+        """,
+    ):
+        await pg_session.execute(text(statement))
+    pg_session.add(User(tg_id=ANNOTATOR_ID, role=UserRoleEnum.ANNOTATOR, name="Разметчик"))
+    study = await make_study(project_id=5, status=StudyStatusEnum.ASSIGNED, annotator_id=ANNOTATOR_ID)
+    studies = StudySQLAlchemyRepository(pg_session)
+    stats = StudyStatsSQLAlchemyRepository(pg_session)
+
+    await studies.transition(study.id, StudyStatusEnum.WAITING_REVIEW)
+    # Администратор снимает задачу: разметчика у исследования больше нет, но переход - его
+    await studies.transition(study.id, StudyStatusEnum.NEW, {"annotator_id": None})
+
+    assert await stats.refresh(lag_seconds=0) == 2
+    assert await stats.refresh(lag_seconds=0) == 0
+    rows = await pg_session.execute(select(StudyTransitionDaily.annotator_id, StudyTransitionDaily.to_status))
+    assert sorted(rows.tuples().all(), key=lambda row: row[1].value) == [
+        (ANNOTATOR_ID, StudyStatusEnum.NEW),
+        (ANNOTATOR_ID, StudyStatusEnum.WAITING_REVIEW),
+    ]
+
+    [by_annotator] = await stats.get_by_annotator(days=1, project_id=5)
+    assert by_annotator.name == "Разметчик"
+    assert by_annotator.transitions == {StudyStatusEnum.WAITING_REVIEW: 1, StudyStatusEnum.NEW: 1}
+    # Обе строки истории из одной транзакции: время в WAITING_REVIEW нулевое, но выход учтён
+    assert by_annotator.state_seconds == {StudyStatusEnum.WAITING_REVIEW: (0.0, 1)}
+
+    # Строки моложе лага ждут следующего обновления
+    await studies.transition(study.id, StudyStatusEnum.ASSIGNED, {"annotator_id": ANNOTATOR_ID})
+    assert await stats.refresh(lag_seconds=3600) == 0
+    assert await stats.refresh(lag_seconds=0) == 1
+    [by_project] = await stats.get_by_project(days=1)
+    assert (by_project.key, by_project.name) == (5, "project-5")
+    assert sum(by_project.transitions.values()) == 3
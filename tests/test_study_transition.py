@@ -0,0 +1,80 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models.study import STUDY_TRANSITIONS, Study, StudyStatusEnum
+from core.models.user import User, UserRoleEnum
+from core.repositories.study_repo import StudySQLAlchemyRepository
+from tests.conftest import MakeStudy
+
+EXPERT_ID = 500
+
+
+def _session(updated: Study | None, current_status: StudyStatusEnum | None = None) -> MagicMock:
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(**{"scalar_one_or_none.return_value": updated}))
+    session.scalar = AsyncMock(return_value=current_status)
+    return session
+
+
+async def test_applied_transition_is_one_conditional_update() -> None:
+    study = Study(id=4, status=StudyStatusEnum.APPROVED)
+    session = _session(study)
+
+    result = await StudySQLAlchemyRepository(session).transition(4, StudyStatusEnum.APPROVED)
+
+    assert result.applied
+    assert result.study is study
+    session.scalar.assert_not_awaited()
+    stmt = session.execute.await_args.args[0]
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "WHERE study.id = %(id_1)s AND study.status IN (__[POSTCOMPILE_status_1])" in sql
+    assert "RETURNING" in sql
+    assert set(stmt.compile().params["status_1"]) == STUDY_TRANSITIONS[StudyStatusEnum.APPROVED]
+
+
+async def test_conflict_reports_the_current_status() -> None:
+    result = await StudySQLAlchemyRepository(_session(None, StudyStatusEnum.CLOSED_N)).transition(
+        4,
+        StudyStatusEnum.APPROVED,
+    )
+
+    assert not result.applied
+    assert not result.not_found
+    assert result.current_status is StudyStatusEnum.CLOSED_N
+
+
+async def test_missing_study_is_not_found() -> None:
+    result = await StudySQLAlchemyRepository(_session(None)).transition(4, StudyStatusEnum.APPROVED)
+
+    assert result.not_found
+    assert result.current_status is None
+
+
+async def test_second_of_two_identical_transitions_conflicts(pg_session: AsyncSession, make_study: MakeStudy) -> None:
+    pg_session.add(User(tg_id=EXPERT_ID, role=UserRoleEnum.VALIDATOR, name="Эксперт"))
+    study = await make_study(status=StudyStatusEnum.IN_REVIEW, expert_id=EXPERT_ID, iteration_count=2)
+    repo = StudySQLAlchemyRepository(pg_session)
+
+    # Одобряет только эксперт, взявший исследование на ревью
+    foreign = await repo.transition(study.id, StudyStatusEnum.APPROVED, conditions=[Study.expert_id == EXPERT_ID + 1])
+    assert foreign.current_status is StudyStatusEnum.IN_REVIEW
+
+    first = await repo.transition(study.id, StudyStatusEnum.APPROVED, conditions=[Study.expert_id == EXPERT_ID])
+    second = await repo.transition(study.id, StudyStatusEnum.CLOSED_N, {"expert_id": None})
+
+    assert first.study is study
+    assert study.status is StudyStatusEnum.APPROVED
+    assert second.current_status is StudyStatusEnum.APPROVED
+    assert study.expert_id == EXPERT_ID
+    assert (await repo.transition(study.id + 1000, StudyStatusEnum.APPROVED)).not_found
+
+
+async def test_iteration_advances_once_per_expected_value(pg_session: AsyncSession, make_study: MakeStudy) -> None:
+    study = await make_study(status=StudyStatusEnum.REWORK, iteration_count=1)
+    repo = StudySQLAlchemyRepository(pg_session)
+
+    assert await repo.advance_iteration(study.id, expected_iteration=1) is study
+    assert await repo.advance_iteration(study.id, expected_iteration=1) is None
+    assert study.iteration_count == 2
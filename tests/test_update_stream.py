@@ -0,0 +1,78 @@
+import asyncio
+from datetime import UTC, datetime
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from aiogram import Bot
+from aiogram.types import Chat, Message, Update, User
+from fakeredis.aioredis import FakeRedis
+
+from bot import update_stream
+from bot.update_stream import UpdateStreamPublisher, UpdateStreamWorker
+
+
+def _update(update_id: int, user_id: int) -> dict[str, Any]:
+    message = Message(
+        message_id=update_id,
+        date=datetime.now(UTC),
+        chat=Chat(id=user_id, type="private"),
+        from_user=User(id=user_id, is_bot=False, first_name="user"),
+        text="text",
+    )
+    return Update(update_id=update_id, message=message).model_dump(mode="json", exclude_none=True, by_alias=True)
+
+
+async def test_ownership_is_refreshed_while_waiting_for_slot_and_loss_cancels_processing(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(update_stream, "_OWNER_REFRESH_INTERVAL", 0.01)
+    redis = FakeRedis(decode_responses=True)
+    publisher = UpdateStreamPublisher(redis, shards=1, maxlen=100)
+    await publisher.publish(_update(1, 10), _update(2, 20))
+
+    started = asyncio.Event()
+    cancelled: list[int] = []
+
+    async def feed_update(_: Bot, update: Update, **__: Any) -> None:  # noqa: ANN401
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(update.update_id)
+            raise
+
+    dp = MagicMock()
+    dp.feed_update = feed_update
+    worker = UpdateStreamWorker(redis, publisher, dp, Bot("123:abc"), 0, concurrency=1)
+
+    # Продлением владения управляет тест: owned = False изображает шард, перехваченный другим процессом
+    refreshes = 0
+    owned = True
+
+    async def refresh_owner(**_: Any) -> int:  # noqa: ANN401
+        nonlocal refreshes
+        refreshes += 1
+        return int(owned)
+
+    async def release_owner(keys: list[str], **_: Any) -> int:  # noqa: ANN401
+        worker.stop()
+        return await redis.delete(*keys)
+
+    monkeypatch.setattr(worker, "_refresh_owner", refresh_owner)
+    monkeypatch.setattr(worker, "_release_owner", release_owner)
+
+    run = asyncio.create_task(worker.run())
+    await asyncio.wait_for(started.wait(), 1)
+    # Первый апдейт обрабатывается, чтение второго стоит на свободном слоте, а владение продлевается
+    await asyncio.sleep(0.1)
+    assert refreshes >= 3
+    assert not run.done()
+
+    owned = False
+    await asyncio.wait_for(run, 1)
+
+    assert cancelled == [1]
+    # Ни один апдейт не подтверждён: их повторит новый владелец шарда
+    pending = await redis.xpending(publisher.stream(0), "bot_workers")
+    assert pending["pending"] == 2
@@ -0,0 +1,97 @@
+import asyncio
+from typing import Any
+
+import pytest
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import CallbackQuery, TelegramObject, Update, User
+from loguru import logger
+from prometheus_client import REGISTRY
+
+from bot.middleware.update_timing import HandlerTimingMiddleware, UpdateTimingMiddleware
+from core.utils.update_timing import current_timing, record_time, timed
+
+
+def _update(data: str) -> tuple[Update, CallbackQuery]:
+    query = CallbackQuery(
+        id="1",
+        from_user=User(id=7, is_bot=False, first_name="Анна"),
+        chat_instance="instance",
+        data=data,
+    )
+    return Update(update_id=42, callback_query=query), query
+
+
+async def _dispatch(
+    outer: UpdateTimingMiddleware,
+    data: str,
+    callback: Any,  # noqa: ANN401
+) -> Any:  # noqa: ANN401
+    """Прогоняет апдейт через обе middleware, как Dispatcher: outer на update, inner перед обработчиком."""
+    update, query = _update(data)
+    inner = HandlerTimingMiddleware()
+
+    async def call_handler(event: TelegramObject, _: dict[str, Any]) -> Any:  # noqa: ANN401
+        return await callback(event)
+
+    async def route(_: TelegramObject, update_data: dict[str, Any]) -> Any:  # noqa: ANN401
+        return await inner(call_handler, query, {**update_data, "handler": HandlerObject(callback=callback)})
+
+    return await outer(route, update, {})
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def test_update_is_labelled_by_handler_and_prefix() -> None:
+    async def timing_labels_handler(_: TelegramObject) -> str:
+        with timed("db"):
+            await asyncio.sleep(0.01)
+        record_time("telegram", 0.5)
+        return "handled"
+
+    result = await _dispatch(UpdateTimingMiddleware(slow_threshold=0), "approve-anno:5", timing_labels_handler)
+
+    assert result == "handled"
+
+    assert current_timing() is None
+    assert _sample("bot_update_duration_seconds_count", handler="timing_labels_handler", prefix="approve-anno") == 1
+    labels = {"handler": "timing_labels_handler"}
+    assert _sample("bot_update_component_seconds_sum", **labels, component="db") > 0
+    assert _sample("bot_update_component_seconds_sum", **labels, component="telegram") == 0.5
+    assert _sample("bot_update_component_seconds_count", **labels, component="nextcloud") == 1
+
+
+async def test_slow_update_is_logged_with_breakdown_even_on_error() -> None:
+    async def timing_slow_handler(_: TelegramObject) -> None:
+        record_time("lock_wait", 0.2)
+        record_time("db", 0.1)
+        record_time("db", 0.1)
+        await asyncio.sleep(0.02)
+        raise LookupError
+
+    records: list[dict[str, Any]] = []
+    sink = logger.add(lambda message: records.append(message.record["extra"]), level="WARNING")
+    try:
+        with pytest.raises(LookupError):
+            await _dispatch(UpdateTimingMiddleware(slow_threshold=0.01), "expert-anno-v2:5:1", timing_slow_handler)
+    finally:
+        logger.remove(sink)
+
+    [fields] = records
+    assert fields["update_id"] == 42
+    assert fields["handler"] == "timing_slow_handler"
+    assert fields["callback_prefix"] == "expert-anno-v2"
+    assert (fields["db_ms"], fields["db_calls"]) == (200.0, 2)
+    assert (fields["lock_wait_ms"], fields["lock_wait_calls"]) == (200.0, 1)
+    # Зависимости заявлены больше, чем длился апдейт: "прочее" не уходит в минус
+    assert fields["other_ms"] == 0
+    assert _sample("bot_update_duration_seconds_count", handler="timing_slow_handler", prefix="expert-anno-v2") == 1
+
+
+def test_time_outside_an_update_is_dropped() -> None:
+    record_time("db", 1.0)
+    with timed("nextcloud"):
+        pass
+
+    assert current_timing() is None
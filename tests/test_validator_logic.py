@@ -0,0 +1,180 @@
+from contextlib import nullcontext
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.utils.callback_answer import CallbackAnswer
+
+from bot.handlers.annotate.utils import (
+    ApproveAnno,
+    ApproveWithSelfAnno,
+    CheckCategories,
+    ExpertAnno,
+    LegacyApproveWithSelfAnno,
+    LegacyExpertAnno,
+    PreExpertAnno,
+)
+from bot.handlers.annotate.validator_logic import check_categories, conslusion_for_annotator_writen, expert_annotate
+from bot.states.check_categories import CheckCategoriesView
+from bot.states.expert_pre_anno import ExpertPreAnno
+from core.models.outbox import OutboxKind
+from core.models.study import Study, StudyStatusEnum
+
+EXPERT_ID = 20
+ANNOTATOR_ID = 10
+
+
+def _study() -> Study:
+    return Study(
+        id=1,
+        study_iuid="1.2.840.1",
+        batch_id=5,
+        project_id=3,
+        study_path="projects/ct/1-original-data/0001",
+        iteration_count=2,
+        annotator_id=ANNOTATOR_ID,
+        nc_share_link="https://nextcloud.test/s/share",
+        nc_upload_link="https://nextcloud.test/s/upload",
+    )
+
+
+def _uow(study: Study) -> MagicMock:
+    uow = MagicMock()
+    uow.studies.get_with_categories = AsyncMock(return_value=SimpleNamespace(batch_id=study.batch_id, categories=[]))
+    uow.batches.get_with_categories = AsyncMock(return_value=SimpleNamespace(categories=[]))
+    context = MagicMock(study=study)
+    context.user.return_value = SimpleNamespace(name="Эксперт", tg_id=EXPERT_ID)
+    uow.studies.get_context = AsyncMock(return_value=context)
+    uow.studies.transition = AsyncMock(return_value=SimpleNamespace(applied=True))
+    uow.outbox.add = AsyncMock(return_value=True)
+    uow.commit = AsyncMock()
+    return uow
+
+
+async def test_default_approve_without_batch_categories_approves_study() -> None:
+    study = _study()
+    uow = _uow(study)
+    nc_util = MagicMock()
+    cq = MagicMock(id="cq-1")
+    cq.from_user.id = EXPERT_ID
+    cq.message.edit_text = AsyncMock()
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=EXPERT_ID, user_id=EXPERT_ID))
+    await state.set_state(CheckCategoriesView.from_default_approve)
+    callback_answer = CallbackAnswer(answered=False)
+
+    await check_categories(
+        cq=cq,
+        callback_data=CheckCategories(study_id=study.id),
+        callback_answer=callback_answer,
+        state=state,
+        uow=uow,
+        nc_util=nc_util,
+    )
+
+    uow.studies.transition.assert_awaited_once_with(study.id, StudyStatusEnum.APPROVED)
+    kinds = [call.args[0] for call in uow.outbox.add.await_args_list]
+    assert kinds == [OutboxKind.TELEGRAM, OutboxKind.NEXTCLOUD_COPY]
+    copy_payload = uow.outbox.add.await_args_list[1].args[2]
+    assert copy_payload == {
+        "src_dir": "projects/ct/2-check/0001/version_2",
+        "dst_dir": "projects/ct/3-research/0001",
+    }
+    uow.commit.assert_awaited_once()
+    cq.message.edit_text.assert_awaited_once()
+    assert callback_answer.text is None
+    assert await state.get_state() is None
+    # Копирование уходит через outbox, обработчик Nextcloud не трогает
+    assert not nc_util.mock_calls
+
+
+async def test_repeated_expert_annotate_tap_creates_one_version() -> None:
+    study = _study()
+    uow = _uow(study)
+    uow.studies.get_by_id = AsyncMock(return_value=study)
+
+    async def advance_iteration(study_id: int, expected_iteration: int, **_: object) -> Study | None:
+        # Как условный UPDATE: итерация поднимается, только пока она равна ожидаемой
+        if study_id != study.id or study.iteration_count != expected_iteration:
+            return None
+        study.iteration_count += 1
+        return study
+
+    uow.studies.advance_iteration = AsyncMock(side_effect=advance_iteration)
+    nc_util = MagicMock()
+    nc_util.create_folder = AsyncMock()
+    nc_util.create_public_link = AsyncMock(return_value="https://nextcloud.test/s/upload-3")
+    locks = MagicMock()
+    locks.lock.return_value = nullcontext()
+    cq = MagicMock(id="cq-1")
+    cq.from_user.id = EXPERT_ID
+    cq.message.edit_text = AsyncMock()
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=EXPERT_ID, user_id=EXPERT_ID))
+    callback_data = ApproveWithSelfAnno(study_id=study.id, iteration=2)
+
+    answers = [CallbackAnswer(answered=False), CallbackAnswer(answered=False)]
+    for callback_answer in answers:
+        await expert_annotate(
+            cq=cq,
+            callback_data=callback_data,
+            callback_answer=callback_answer,
+            state=state,
+            uow=uow,
+            nc_util=nc_util,
+            locks=locks,
+        )
+
+    assert study.iteration_count == 3
+    nc_util.create_folder.assert_awaited_once_with(path="projects/ct/2-check/0001", new_folder="version_3")
+    assert study.nc_upload_link == "https://nextcloud.test/s/upload-3"
+    uow.commit.assert_awaited_once()
+    assert answers[0].text is None
+    assert answers[1].text == "Исследование уже взято на доразметку"
+
+
+def test_buttons_sent_before_iteration_still_parse() -> None:
+    assert ApproveAnno.unpack("approve-anno:1") == ApproveAnno(study_id=1)
+    assert PreExpertAnno.unpack("pre-expert-anno:1") == PreExpertAnno(study_id=1)
+    assert LegacyExpertAnno.unpack("expert-anno:1") == LegacyExpertAnno(study_id=1)
+    assert LegacyApproveWithSelfAnno.unpack("approve-with-self-anno:1") == LegacyApproveWithSelfAnno(study_id=1)
+    assert ExpertAnno.unpack(ExpertAnno(study_id=1).pack()) == ExpertAnno(study_id=1, iteration=None)
+
+
+async def test_expert_session_without_iteration_gets_button_without_it() -> None:
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=EXPERT_ID, user_id=EXPERT_ID))
+    # Данные сессии, начатой до появления итерации
+    await state.set_data({"study_id": 1})
+    msg = MagicMock(text="Нет разметки")
+    msg.answer = AsyncMock()
+
+    await conslusion_for_annotator_writen(msg, state)
+
+    buttons = msg.answer.await_args.kwargs["reply_markup"].inline_keyboard
+    assert buttons[0][0].callback_data == ExpertAnno(study_id=1).pack()
+    assert await state.get_state() == ExpertPreAnno.waiting_for_confirmation
+
+
+async def test_expert_annotate_without_iteration_uses_current_one() -> None:
+    study = _study()
+    uow = _uow(study)
+    uow.studies.get_by_id = AsyncMock(return_value=study)
+    uow.studies.advance_iteration = AsyncMock(return_value=None)
+    locks = MagicMock()
+    locks.lock.return_value = nullcontext()
+    cq = MagicMock(id="cq-1")
+    cq.from_user.id = EXPERT_ID
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=EXPERT_ID, user_id=EXPERT_ID))
+
+    for callback_data in (LegacyExpertAnno(study_id=study.id), ExpertAnno(study_id=study.id)):
+        await expert_annotate(
+            cq=cq,
+            callback_data=callback_data,
+            callback_answer=CallbackAnswer(answered=False),
+            state=state,
+            uow=uow,
+            nc_util=MagicMock(),
+            locks=locks,
+        )
+
+    assert [call.args for call in uow.studies.advance_iteration.await_args_list] == [(study.id, 2), (study.id, 2)]
@@ -0,0 +1,81 @@
+from typing import TYPE_CHECKING, cast
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.asyncio import Redis
+
+from core.config import Settings
+from core.database import DatabaseManager
+from core.utils import warmup
+from core.utils.nextcloud import NextcloudUtils
+from web_api import health
+
+if TYPE_CHECKING:
+    from dishka import AsyncContainer
+
+
+def _container(*, replica: bool, nextcloud_error: Exception | None = None) -> tuple[MagicMock, dict[type, MagicMock]]:
+    db_manager = MagicMock(replica_engine=MagicMock() if replica else None)
+    nextcloud = MagicMock(warm_up=AsyncMock(side_effect=nextcloud_error))
+    redis = MagicMock(ping=AsyncMock())
+    dependencies: dict[type, MagicMock] = {DatabaseManager: db_manager, NextcloudUtils: nextcloud, Redis: redis}
+    container = MagicMock()
+    container.get = AsyncMock(side_effect=lambda dependency: dependencies.get(dependency, MagicMock()))
+    return container, dependencies
+
+
+@pytest.fixture
+def prefill(monkeypatch: pytest.MonkeyPatch) -> AsyncMock:
+    prefill = AsyncMock()
+    monkeypatch.setattr(warmup, "_prefill_pool", prefill)
+    return prefill
+
+
+async def test_pools_are_prefilled_up_to_pool_size(prefill: AsyncMock) -> None:
+    container, dependencies = _container(replica=True)
+    settings = Settings(DATABASE_USER="test", DATABASE_WARMUP_CONNECTIONS=10, DATABASE_POOL_SIZE=3)
+
+    await warmup.warm_up(cast("AsyncContainer", container), settings)
+
+    db_manager = dependencies[DatabaseManager]
+    assert [(call.args, call.kwargs) for call in prefill.await_args_list] == [
+        ((db_manager.engine, 3), {}),
+        ((db_manager.replica_engine, 3), {"readonly": True}),
+    ]
+    dependencies[Redis].ping.assert_awaited_once()
+    dependencies[NextcloudUtils].warm_up.assert_awaited_once()
+
+
+async def test_zero_warmup_connections_skip_the_database(prefill: AsyncMock) -> None:
+    container, _ = _container(replica=False)
+    settings = Settings(DATABASE_USER="test", DATABASE_WARMUP_CONNECTIONS=0)
+
+    await warmup.warm_up(cast("AsyncContainer", container), settings)
+
+    prefill.assert_not_awaited()
+
+
+async def test_unavailable_nextcloud_does_not_stop_startup(prefill: AsyncMock) -> None:
+    container, dependencies = _container(replica=False, nextcloud_error=ConnectionError("nextcloud is down"))
+
+    await warmup.warm_up(cast("AsyncContainer", container), Settings(DATABASE_USER="test"))
+
+    prefill.assert_awaited_once()
+    # Redis же обязателен: без него бот не стартует
+    dependencies[Redis].ping.side_effect = ConnectionError("redis is down")
+    with pytest.raises(ConnectionError, match="redis"):
+        await warmup.warm_up(cast("AsyncContainer", container), Settings(DATABASE_USER="test"))
+
+
+def test_ready_only_between_warmup_and_shutdown() -> None:
+    app = FastAPI()
+    app.include_router(health.router)
+    client = TestClient(app)
+
+    assert client.get("/ready").status_code == 503
+    app.state.ready = True
+    assert client.get("/ready").status_code == 200
+    app.state.ready = False
+    assert client.get("/ready").status_code == 503
@@ -0,0 +1,62 @@
+import secrets
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Annotated
+
+from dishka.integrations.fastapi import DishkaRoute, FromDishka
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from core.config import Settings
+from core.repositories.study_repo import StudyExportFilter
+from core.unit_of_work import IReadOnlyUnitOfWork
+from core.utils.export import ExportFormat, encode_export
+
+router = APIRouter(tags=["export"], route_class=DishkaRoute)
+
+
+async def _stream_export(
+    uow: IReadOnlyUnitOfWork,
+    export_filter: StudyExportFilter,
+    export_format: ExportFormat,
+    after_id: int | None,
+    fetch_size: int,
+) -> AsyncIterator[bytes]:
+    # UoW открывается внутри генератора: курсор живёт, пока отдаётся тело ответа
+    async with uow:
+        rows = uow.studies.iter_export(export_filter, after_id=after_id, fetch_size=fetch_size)
+        async for chunk in encode_export(rows, export_format):
+            yield chunk
+
+
+@router.get("/export/studies")
+async def export_studies(
+    uow: FromDishka[IReadOnlyUnitOfWork],
+    settings: FromDishka[Settings],
+    export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON,
+    project_id: int | None = None,
+    batch_id: int | None = None,
+    finished_from: datetime | None = None,
+    finished_to: datetime | None = None,
+    after_id: Annotated[int | None, Query(description="Продолжить выгрузку после исследования с этим id")] = None,
+    x_export_token: Annotated[str | None, Header(alias="X-Export-Token")] = None,
+) -> StreamingResponse:
+    """Выгрузка завершённых исследований (approved/closed) в порядке id."""
+    if settings.EXPORT_API_TOKEN is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    # Заголовок проверяется вручную: при выключенной выгрузке его отсутствие даёт 404, а не 422
+    if x_export_token is None or not secrets.compare_digest(
+        x_export_token, settings.EXPORT_API_TOKEN.get_secret_value()
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    export_filter = StudyExportFilter(
+        project_id=project_id,
+        batch_id=batch_id,
+        finished_from=finished_from,
+        finished_to=finished_to,
+    )
+    return StreamingResponse(
+        _stream_export(uow, export_filter, export_format, after_id, settings.EXPORT_FETCH_SIZE),
+        media_type=export_format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="studies.{export_format.value}"'},
+    )
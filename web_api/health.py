@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Request, Response, status
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/ready", include_in_schema=False)
+async def ready(request: Request) -> Response:
+    """200 после прогрева и до начала остановки, иначе 503: балансировщик не шлёт трафик раньше времени."""
+    if getattr(request.app.state, "ready", False):
+        return Response(status_code=status.HTTP_200_OK)
+    return Response(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -1,12 +1,15 @@
 from typing import Annotated
 
+from dishka import FromComponent
 from dishka.integrations.fastapi import DishkaRoute, FromDishka
 from fastapi import APIRouter, Depends, Header, HTTPException, status
 from loguru import logger
 
 from core.config import Settings
+from core.database import DatabaseWorkload
 from core.unit_of_work import IUnitOfWork
 from core.utils.nextcloud import NextcloudUtils
+from core.utils.study_queue import StudyReadyQueue
 from web_api.schemas import IncomingPayload
 from web_api.services.exceptions import WebhookServiceError
 from web_api.services.webhook_service import WebhookService
@@ -14,6 +17,8 @@ from web_api.utils.path_filter import PathFilter
 
 router = APIRouter(tags=["webhooks"], route_class=DishkaRoute)
 
+WebhookUnitOfWork = Annotated[IUnitOfWork, FromComponent(DatabaseWorkload.WEBHOOK)]
+
 
 @router.post(
     "/webhook/nextcloud",
@@ -23,15 +28,16 @@ async def receive_nextcloud_webhook(
     webhook_payload: IncomingPayload,
     x_webhook_token: Annotated[str, Header(alias="X-Webhook-Token")],
     path_filter: Annotated[PathFilter, Depends(PathFilter)],
-    uow: FromDishka[IUnitOfWork],
+    uow: WebhookUnitOfWork,
     nc_util: FromDishka[NextcloudUtils],
     settings: FromDishka[Settings],
+    ready_queue: FromDishka[StudyReadyQueue],
 ) -> None:
     if x_webhook_token != settings.NEXTCLOUD_WEBHOOK_TOKEN:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
     if not path_filter.should_process_event(webhook_payload, settings.NEXTCLOUD_DIRECTORIES):
         return
-    webhook_service = WebhookService(uow, nc_util, settings)
+    webhook_service = WebhookService(uow, nc_util, settings, ready_queue)
     logger.debug("Process webhook: {}", webhook_payload)
     try:
         await webhook_service.process_nextcloud_webhook(webhook_payload)
@@ -50,11 +56,12 @@ async def receive_nextcloud_webhook(
 @router.get("/webhook/test")
 async def webhook_status(
     path_filter: Annotated[PathFilter, Depends(PathFilter)],
-    uow: FromDishka[IUnitOfWork],
+    uow: WebhookUnitOfWork,
     nc_util: FromDishka[NextcloudUtils],
     settings: FromDishka[Settings],
+    ready_queue: FromDishka[StudyReadyQueue],
 ) -> None:
-    webhook_service = WebhookService(uow, nc_util, settings)
+    webhook_service = WebhookService(uow, nc_util, settings, ready_queue)
     webhook_payload = IncomingPayload(
         **{
             "event": {
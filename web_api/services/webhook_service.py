@@ -11,6 +11,7 @@ from core.config import Settings
 from core.models.study import StudyStatusEnum
 from core.unit_of_work import IUnitOfWork
 from core.utils.nextcloud import NextcloudUtils
+from core.utils.study_queue import StudyReadyQueue
 from web_api.schemas import IncomingPayload
 from web_api.services.exceptions import (
     ConfigStructureError,
@@ -24,10 +25,17 @@ from web_api.services.exceptions import (
 
 
 class WebhookService:
-    def __init__(self, uow: IUnitOfWork, nc_util: NextcloudUtils, settings: Settings) -> None:
+    def __init__(
+        self,
+        uow: IUnitOfWork,
+        nc_util: NextcloudUtils,
+        settings: Settings,
+        ready_queue: StudyReadyQueue,
+    ) -> None:
         self.uow = uow
         self.nc_util = nc_util
         self.settings = settings
+        self.ready_queue = ready_queue
 
     async def process_nextcloud_webhook(self, webhook_payload: IncomingPayload) -> None:
         if webhook_payload.event.class_.endswith("NodeCreatedEvent"):
@@ -60,23 +68,26 @@ class WebhookService:
                 logger.debug(error_text)
                 raise ProjectNotFountError(error_text)
             batch = self.uow.batches.create({"name": path.name, "project_id": project.id})
-            batch.studies.extend(
-                self.uow.studies.bulk_create(
-                    [
-                        {
-                            "study_iuid": study_data[1],
-                            "study_path": study_data[0],
-                            "status": StudyStatusEnum.NEW,
-                        }
-                        for study_data in parsed_mapping
-                    ],
-                ),
+            studies = self.uow.studies.bulk_create(
+                [
+                    {
+                        "study_iuid": study_data[1],
+                        "study_path": study_data[0],
+                        "status": StudyStatusEnum.NEW,
+                        "project_id": project.id,
+                    }
+                    for study_data in parsed_mapping
+                ],
             )
+            batch.studies.extend(studies)
             batch.categories.extend(
                 await self.uow.categories.get_or_create_many(parsed_config["categories"]),
             )
             await self.uow.commit()
 
+        if self.settings.ASSIGNMENT_ENGINE == "redis":
+            await self.ready_queue.push(project.id, (study.id for study in studies))
+
         logger.info("Batch {} succesfully processed", path.name)
 
     async def _download_metadata_files(self, path: PurePosixPath) -> dict[str, bytes]:
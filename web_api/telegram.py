@@ -0,0 +1,26 @@
+from typing import TYPE_CHECKING, Annotated, Any
+
+from fastapi import APIRouter, Body, Header, HTTPException, Request, Response, status
+
+if TYPE_CHECKING:
+    from bot.webhook import WebhookUpdateFeeder
+
+router = APIRouter(tags=["telegram"])
+
+
+@router.post("/telegram/webhook", include_in_schema=False)
+async def telegram_webhook(
+    request: Request,
+    payload: Annotated[dict[str, Any], Body()],
+    x_telegram_bot_api_secret_token: Annotated[str | None, Header()] = None,
+) -> Response:
+    feeder: WebhookUpdateFeeder | None = getattr(request.app.state, "webhook_feeder", None)
+    if feeder is None:
+        # Бот работает в режиме polling
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not feeder.check_secret(x_telegram_bot_api_secret_token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    if not await feeder.submit(payload):
+        # Telegram повторит доставку; апдейт не теряется
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response(status_code=status.HTTP_200_OK)
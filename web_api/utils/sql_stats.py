@@ -0,0 +1,22 @@
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.types import ASGIApp
+
+from core.utils.sql_instrumentation import sql_scope
+
+
+class SqlStatsMiddleware(BaseHTTPMiddleware):
+    """Привязывает SQL-статистику к шаблону пути маршрута FastAPI."""
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int) -> None:
+        super().__init__(app)
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        with sql_scope("api:unmatched", n_plus_one_threshold=self.n_plus_one_threshold) as stats:
+            response = await call_next(request)
+            # Маршрут известен только после роутинга; шаблон пути, а не сам путь - чтобы не плодить метки
+            route = request.scope.get("route")
+            if route is not None:
+                stats.scope = f"api:{request.method} {route.path}"
+        return response